@@ -0,0 +1,48 @@
+"""Circuit breaker for calls to optional external services (e.g. Meilisearch).
+
+After ``failures`` consecutive errors or over-budget calls the breaker opens
+and callers skip the service for ``reset_after`` seconds. Then one probe call
+is let through: success closes the breaker, failure opens it again.
+"""
+import threading
+import time
+
+
+class CircuitBreaker:
+    def __init__(self, failures: int, reset_after: float):
+        self.failures = failures
+        self.reset_after = reset_after
+        self.consecutive = 0
+        self.opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if self._probing or time.monotonic() - self.opened_at >= self.reset_after:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if self._probing or time.monotonic() - self.opened_at < self.reset_after:
+                return False
+            self._probing = True
+            return True
+
+    def success(self) -> None:
+        with self._lock:
+            self.consecutive = 0
+            self.opened_at = None
+            self._probing = False
+
+    def failure(self) -> None:
+        with self._lock:
+            self.consecutive += 1
+            if self._probing or self.consecutive >= self.failures:
+                self.opened_at = time.monotonic()
+            self._probing = False
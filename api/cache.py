@@ -0,0 +1,90 @@
+"""Bounded in-process caches for pre-serialized responses.
+
+Entries are JSON bytes keyed by a tuple that starts with the dataset version
+(see api/dataset.py), so an import makes old entries unreachable; they then
+age out through the LRU and TTL bounds.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Hashable, Optional, Tuple
+
+from .config import settings
+
+
+def make_etag(version: int, key: str) -> str:
+    digest = hashlib.sha1(f"{version}:{key}".encode("utf-8")).hexdigest()[:24]
+    return f'"{version}-{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    return any(tag.strip() in (etag, "*") for tag in if_none_match.split(","))
+
+
+class ByteCache:
+    """LRU of bytes values bounded by entry count, total size and age."""
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl: float):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, Tuple[float, bytes]]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or time.monotonic() - entry[0] > self.ttl:
+                if entry is not None:
+                    self._pop(key)
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Hashable, value: bytes) -> None:
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._data:
+                self._pop(key)
+            self._data[key] = (time.monotonic(), value)
+            self._size += len(value)
+            while len(self._data) > self.max_entries or self._size > self.max_bytes:
+                self._pop(next(iter(self._data)))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._size = 0
+
+    def _pop(self, key: Hashable) -> None:
+        _, value = self._data.pop(key)
+        self._size -= len(value)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+
+search_cache = ByteCache(
+    settings.search_cache_max_entries,
+    settings.search_cache_max_bytes,
+    settings.search_cache_ttl,
+)
+# one encoded CardOut per (version, card id)
+card_cache = ByteCache(
+    settings.card_cache_max_entries,
+    settings.card_cache_max_bytes,
+    settings.card_cache_ttl,
+)
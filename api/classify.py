@@ -0,0 +1,155 @@
+"""Keyword classification for search.
+
+Most searches are card numbers (``B01-001``) or their prefixes (``E53-``,
+``SD07``), which an index on ``card_number`` answers with an equality or
+range scan instead of ``LIKE '%kw%'`` over every searchable field. A keyword
+ending in ``*`` asks for a name prefix (``命运*``). Everything else is a
+genuine substring search for the n-gram / full-text / LIKE path.
+
+Prefixes become ``col >= kw AND col < kw'`` on SQLite, whose ``LIKE`` is
+case-insensitive and so cannot use a BINARY index, and ``LIKE 'kw%'`` on
+MySQL, which turns it into an index range itself.
+
+A card-number keyword must still return what the substring search did:
+``C01-001`` also matches ``MC01-001`` and ``AC01-001``. The ``card_series``
+snapshot lists every series (the card number before its ``-``), so the
+keyword becomes one range per series ending in its prefix (or containing
+it, for a bare ``C01``). Keywords that also occur in a name, or in a card
+number of another shape, and any keyword before the snapshot is built, stay
+substring searches. Like the n-gram index, the snapshot is SQLite only: the
+check compares plain upper-case text, while MySQL's ``utf8mb4_unicode_ci``
+LIKE would also match full-width forms of the keyword, so on MySQL card
+numbers are substring searches too.
+
+    python -m api.cli explain --keyword B01-001
+"""
+import re
+from typing import NamedTuple, Optional, Tuple
+
+from sqlalchemy import and_, false, or_, select
+from sqlalchemy.orm import Session
+
+from . import dataset
+from .config import settings
+from .models import Card
+
+SUBSTRING = "substring"
+CARD_NUMBER = "card_number"
+CARD_PREFIX = "card_number_prefix"
+NAME_PREFIX = "name_prefix"
+
+# the card number shape zx2.py scrapes, e.g. B01-001, SD07-003; numbers in
+# the set are always three digits, so shorter tails (B01-00) are prefixes
+_CARD_NUMBER = re.compile(r"^[A-Z]{1,3}\d{2,}-\d{3,}$")
+_CARD_PREFIX = re.compile(r"^[A-Z]{1,3}\d{2,}(-\d*)?$")
+PREFIX_MARK = "*"
+
+# card numbers in the B01-001 shape contribute their series; any other
+# number-like run of text is kept whole for the substring check
+_RUN = re.compile(r"[A-Z0-9-]+")
+_REGULAR = re.compile(r"^[A-Z0-9]+-\d+$")
+
+
+class Keyword(NamedTuple):
+    kind: str
+    value: str
+    # card-number classes: card_number prefixes, one per matching series
+    prefixes: Tuple[str, ...] = ()
+
+
+class Series(NamedTuple):
+    series: Tuple[str, ...]  # distinct card number parts before the "-"
+    runs: Tuple[str, ...]  # number-like text a substring search would also hit
+
+
+def _build(db: Session) -> Optional[Series]:
+    from .ngram import keyword_fields
+
+    if db.bind.dialect.name != "sqlite":
+        return None
+
+    series, runs = set(), set()
+    fields = [getattr(Card, f) for f in keyword_fields() if f != "card_number"]
+    for row in db.query(Card.card_number, *fields).yield_per(5000):
+        number = row[0] or ""
+        if _REGULAR.match(number):
+            series.add(number.split("-", 1)[0])
+        elif number:
+            runs.add(number)
+        for text in row[1:]:
+            if text:
+                # only runs with a letter and a digit can contain a card-number keyword
+                runs.update(r for r in _RUN.findall(text.upper())
+                            if any(c.isdigit() for c in r) and any(c.isalpha() for c in r))
+    return Series(tuple(sorted(series)), tuple(sorted(runs)))
+
+
+dataset.register("card_series", _build)
+
+
+def _prefixes(number: str, snapshot: Series) -> Optional[Tuple[str, ...]]:
+    """card_number prefixes equal to a substring match of ``number``; None
+    if that match could also hit a name or an irregular card number."""
+    if any(number in run for run in snapshot.runs):
+        return None
+    head, dash, tail = number.partition("-")
+    if dash:
+        return tuple(s + "-" + tail for s in snapshot.series if s.endswith(head))
+    return tuple(s for s in snapshot.series if head in s)
+
+
+def classify(keyword: str, snapshot: Optional[Series] = None) -> Keyword:
+    # the keyword is taken as typed: "%kw%" does not strip it either, so a
+    # padded " B01 " stays a substring search
+    if "%" in keyword or "_" in keyword:
+        # explicit LIKE wildcards keep their SQL meaning
+        return Keyword(SUBSTRING, keyword)
+    if keyword.endswith(PREFIX_MARK) and keyword.rstrip(PREFIX_MARK):
+        return Keyword(NAME_PREFIX, keyword.rstrip(PREFIX_MARK))
+    # LIKE folds ASCII case only; str.upper() would also turn e.g. "ſ" into "S"
+    number = keyword.upper() if keyword.isascii() else ""
+    kind = CARD_NUMBER if _CARD_NUMBER.match(number) else CARD_PREFIX if _CARD_PREFIX.match(number) else None
+    snapshot = snapshot or dataset.get("card_series")
+    if kind is None or snapshot is None:
+        return Keyword(SUBSTRING, keyword)
+    prefixes = _prefixes(number, snapshot)
+    if prefixes is None:
+        return Keyword(SUBSTRING, keyword)
+    return Keyword(kind, number, prefixes)
+
+
+def key_ranges(kw: Keyword) -> Tuple[Tuple[str, str], ...]:
+    """Half-open ``[lo, hi)`` card_number ranges matching a card-number class."""
+    return tuple((p, p[:-1] + chr(ord(p[-1]) + 1)) for p in kw.prefixes)
+
+
+def _prefix(col, value: str):
+    if settings.use_sqlite:
+        hi = value[:-1] + chr(ord(value[-1]) + 1)
+        return and_(col >= value, col < hi)
+    return col.like(value + "%")
+
+
+def sql_clause(kw: Keyword):
+    """Index-backed WHERE clause for a non-substring keyword."""
+    if kw.kind in (CARD_NUMBER, CARD_PREFIX):
+        if len(kw.prefixes) == 1:
+            return _prefix(Card.card_number, kw.prefixes[0])
+        return or_(false(), *(_prefix(Card.card_number, p) for p in kw.prefixes))
+    if kw.kind == NAME_PREFIX:
+        return or_(_prefix(Card.cn_name, kw.value), _prefix(Card.jp_name, kw.value))
+    raise ValueError(f"no index clause for {kw.kind} keywords")
+
+
+def explain(db, keyword: str, fields) -> Tuple[Keyword, str, list]:
+    """(class, SQL, plan rows) of a first result page for ``keyword`` alone;
+    substring keywords are shown with the plain LIKE fallback."""
+    kw = classify(keyword, dataset.get("card_series") or _build(db))
+    if kw.kind == SUBSTRING:
+        clause = or_(*(getattr(Card, f).like(f"%{keyword}%") for f in fields))
+    else:
+        clause = sql_clause(kw)
+    stmt = select(Card.id).where(clause).order_by(Card.id).limit(50)
+    sql = str(stmt.compile(dialect=db.bind.dialect, compile_kwargs={"literal_binds": True}))
+    prefix = "EXPLAIN QUERY PLAN " if db.bind.dialect.name == "sqlite" else "EXPLAIN "
+    return kw, " ".join(sql.split()), [tuple(r) for r in db.connection().exec_driver_sql(prefix + sql)]
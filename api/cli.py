@@ -1,34 +1,127 @@
 import argparse
-from .db import Base, engine, SessionLocal
-from .importer import import_csv
-from .tasks import reindex_all, celery_app
+import os
+from .db import engine, SessionLocal
+from .importer import KEY_STRATEGIES, import_csv, upsert_csv
+from .migrate import backfill_numeric, upgrade_schema
+from .config import settings
+from .dataset import bump_version
+from .fts import create_fts, create_mysql_fulltext, rebuild_fts
+
+# one keyword per class in api/classify.py
+EXPLAIN_SAMPLES = ["B01-001", "E53-", "SD07", "命运*", "猎犬"]
 
 
 def main():
     parser = argparse.ArgumentParser()
-    parser.add_argument("cmd", choices=["initdb", "import", "reindex"])
+    parser.add_argument("cmd", choices=["initdb", "migrate", "import", "reindex", "fts", "explain"])
     parser.add_argument("--csv", dest="csv_path")
+    parser.add_argument("--full", action="store_true", help="reindex: re-send every card")
+    parser.add_argument("--keyword", action="append", help="explain: keyword to plan (repeatable)")
+    parser.add_argument("--chunk", type=int, default=5000, help="import: rows per transaction")
+    parser.add_argument(
+        "--workers", type=int, default=min(4, os.cpu_count() or 1), help="import: processes parsing the CSV"
+    )
+    parser.add_argument("--upsert", action="store_true", help="import: update cards by natural key instead of appending")
+    parser.add_argument("--key", choices=KEY_STRATEGIES, default="auto", help="import --upsert: natural key")
+    parser.add_argument("--delete-missing", action="store_true", help="import --upsert: delete cards not in the CSV")
     args = parser.parse_args()
 
     if args.cmd == "initdb":
-        Base.metadata.create_all(bind=engine)
+        upgrade_schema(engine)
+        if settings.use_sqlite and settings.sqlite_fts_enabled:
+            create_fts(engine)
+        elif not settings.use_sqlite and settings.mysql_fulltext_enabled:
+            create_mysql_fulltext(engine)
         print("DB initialized")
+    elif args.cmd == "migrate":
+        for change in upgrade_schema(engine):
+            print(f"Added {change}")
+        if not settings.use_sqlite and settings.mysql_fulltext_enabled:
+            for name in create_mysql_fulltext(engine):
+                print(f"Added FULLTEXT index {name}")
+        db = SessionLocal()
+        try:
+            n = backfill_numeric(db)
+            print(f"Backfilled cost/power numbers for {n} rows")
+        finally:
+            db.close()
     elif args.cmd == "import":
         if not args.csv_path:
             raise SystemExit("--csv required")
         db = SessionLocal()
         try:
-            n = import_csv(args.csv_path, db)
-            print(f"Imported {n} rows")
+            if args.upsert:
+                stats = upsert_csv(args.csv_path, db, args.chunk, args.key, args.delete_missing, args.workers)
+                print(
+                    f"Upserted in {stats['seconds']:.1f}s: {stats['inserted']} inserted, "
+                    f"{stats['updated']} updated, {stats['unchanged']} unchanged, "
+                    f"{stats['deleted']} deleted, {stats['duplicates']} duplicate keys skipped"
+                )
+                if not (stats["inserted"] or stats["updated"] or stats["deleted"]):
+                    # indexes and caches of running processes stay valid
+                    print("No changes; dataset version kept")
+                    return
+            else:
+                stats = import_csv(args.csv_path, db, args.chunk, args.workers)
+                rate = stats["rows"] / stats["seconds"] if stats["seconds"] else 0
+                print(f"Imported {stats['rows']} rows in {stats['seconds']:.1f}s ({rate:.0f} rows/s, {stats['method']})")
+            if settings.similar_index_enabled:
+                from .similar import index_path, update_index
+
+                _, signed = update_index(db)
+                print(f"Similar-effect index: {signed} cards signed -> {index_path()}")
+            # running API processes rebuild indexes and drop caches on the new version
+            print(f"Dataset version {bump_version(db)}")
+            from .constants import constants_path, update
+
+            update(db)
+            print(f"Constants -> {constants_path()}")
+        finally:
+            db.close()
+    elif args.cmd == "fts":
+        if not settings.use_sqlite:
+            raise SystemExit("fts is for SQLite; on MySQL `migrate` adds the FULLTEXT indexes")
+        create_fts(engine)
+        rebuild_fts(engine)
+        print("FTS index rebuilt")
+    elif args.cmd == "explain":
+        from .classify import explain
+        from .ngram import keyword_fields
+
+        db = SessionLocal()
+        try:
+            for keyword in args.keyword or EXPLAIN_SAMPLES:
+                kw, sql, plan = explain(db, keyword, keyword_fields())
+                print(f"{keyword!r} -> {kw.kind}: {sql}")
+                for row in plan:
+                    print("  | " + " | ".join(str(v) for v in row))
         finally:
             db.close()
     elif args.cmd == "reindex":
+        from .tasks import celery_app, reindex_all
+
+        db = SessionLocal()
+        try:
+            print(f"Dataset version {bump_version(db)}")
+        finally:
+            db.close()
         if celery_app is None:
             # synchronous fallback
-            reindex_all()
-            print("Reindex completed (sync fallback)")
+            stats = reindex_all(full=args.full)
+            if stats is None:
+                print("Meilisearch disabled; nothing to reindex")
+                return
+            rate = stats["scanned"] / stats["seconds"] if stats["seconds"] else 0
+            print(
+                f"Reindex completed (sync fallback): {stats['pushed']} pushed, "
+                f"{stats['skipped']} unchanged skipped, {stats['deleted']} deleted, "
+                f"{stats['failed']} failed; {stats['scanned']} docs in {stats['seconds']:.1f}s "
+                f"({rate:.0f} docs/s)"
+            )
         else:
-            reindex_all.delay()
+            from .tasks import reindex_task
+
+            reindex_task.delay(full=args.full)
             print("Reindex task enqueued")
 
 
@@ -1,5 +1,8 @@
 from pydantic_settings import BaseSettings
 
+# placeholder cursor secret; the API refuses it outside local SQLite (api/cursor.py)
+DEFAULT_CURSOR_SECRET = "change-me"
+
 
 class Settings(BaseSettings):
     # MySQL
@@ -12,12 +15,70 @@ class Settings(BaseSettings):
     # Optional SQLite fallback for local dev
     use_sqlite: bool = True
     sqlite_path: str = "./zxcard.db"
+    sqlite_fts_enabled: bool = True  # FTS5 trigram keyword backend (api/fts.py)
+    mysql_fulltext_enabled: bool = True  # FULLTEXT ngram keyword backend on MySQL (api/fts.py)
+    mysql_local_infile: bool = False  # `cli import` via LOAD DATA LOCAL INFILE (server needs local_infile=ON)
 
     # Meilisearch
     meili_host: str = "http://127.0.0.1:7700"
     meili_api_key: str = "masterKey"
     meili_index: str = "cards"
     meili_disabled: bool = True  # disable by default for local MVP
+    meili_timeout: float = 0.3  # latency budget per search, seconds
+    meili_breaker_failures: int = 5  # consecutive errors/slow searches before failing over to SQL
+    meili_breaker_reset: float = 30.0  # seconds before probing Meili again
+    meili_max_total_hits: int = 10000  # deeper pages are served by SQL
+    meili_task_timeout: float = 120.0  # seconds `cli reindex` waits for each indexing task
+
+    # In-process keyword index (api/ngram.py); SQLite only, see its docstring
+    ngram_index_enabled: bool = True
+    ngram_index_text_full: bool = False  # also match keywords in effect text
+    ngram_max_ids: int = 5000  # larger candidate sets go through SQL LIKE
+
+    # In-process bitmap filter engine (api/filters.py)
+    filter_index_enabled: bool = True
+
+    # In-process prefix index for /api/suggest (api/suggest.py)
+    suggest_index_enabled: bool = True
+    suggest_max_results: int = 20
+
+    # MinHash/LSH similar-effect index (api/similar.py), persisted next to the DB
+    similar_index_enabled: bool = True
+    similar_index_path: str = ""  # default: <sqlite_path>.minhash
+    similar_num_perm: int = 64
+    similar_bands: int = 16  # 4 rows per band: candidates from ~0.5 similarity
+    similar_shingle: int = 3
+
+    # Search response cache (api/cache.py), keyed by dataset version + query
+    search_cache_enabled: bool = True
+    search_cache_max_entries: int = 2048
+    search_cache_max_bytes: int = 64 * 1024 * 1024
+    search_cache_ttl: float = 600.0
+
+    # Encoded /api/cards/{id} bodies, keyed by dataset version
+    card_cache_enabled: bool = True
+    card_cache_max_entries: int = 50000
+    card_cache_max_bytes: int = 128 * 1024 * 1024
+    card_cache_ttl: float = 3600.0
+    card_cache_warm: bool = False  # encode every card at startup instead of lazily
+    batch_max_ids: int = 500  # per /api/cards/batch request
+    constants_max_age: int = 3600  # Cache-Control for /api/constants; revalidated by ETag after that
+
+    # Startup warm-up before /health/ready reports ready (api/warmup.py)
+    warmup_background: bool = True  # serve (slower) requests while warming up
+    warmup_connections: int = 4  # pooled connections opened up front
+    warmup_requests: bool = True  # replay representative requests to compile statements
+
+    # Prometheus /metrics and SQL statement timing (api/metrics.py)
+    metrics_enabled: bool = True
+    slow_query_ms: float = 200.0  # statements at or above this are printed with their parameters
+    metrics_max_statements: int = 200  # distinct SQL fingerprints before the rest share "other"
+
+    # seconds between checks for a changed cards table (api/dataset.py)
+    index_refresh_interval: float = 30.0
+
+    # Signs search pagination cursors; required (CURSOR_SECRET) on MySQL
+    cursor_secret: str = DEFAULT_CURSOR_SECRET
 
     # Celery/Redis
     redis_url: str = "redis://127.0.0.1:6379/0"
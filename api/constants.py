@@ -1,15 +1,150 @@
-from typing import Dict, Any
+"""Filter options for /api/constants, derived from the cards table.
 
+One pass over the table counts every color, rarity, type, cost and power
+value and groups card numbers by series (the ``series`` column, or the card
+number prefix ``B01`` when the scraper left it empty) into first/last/count
+ranges; a range's ``B01-`` prefix is a card-number keyword for search.
+Known values keep their display order, values only found in the data follow
+by count. ``mark`` and ``tags`` have no column yet and stay fixed.
 
-def load_constants_from_readme() -> Dict[str, Any]:
-    # MVP: hardcode minimal set; real impl could parse __NUXT__ dumps
+The result is encoded once per dataset version: ``cli import`` writes it next
+to the database (``<db>.constants``), startup reads that file back when its
+dataset signature still matches, and the ETag is a hash of the bytes, so
+clients keep their copy across imports that do not change the options.
+"""
+import hashlib
+import json
+import os
+import tempfile
+from collections import Counter
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from sqlalchemy.orm import Session
+
+from . import dataset
+from .config import settings
+from .importer import derive_series
+from .models import Card
+
+COLOR_ORDER = ["无", "红", "蓝", "白", "黑", "绿"]
+RARITY_ORDER = ["R", "SR", "UR", "WR", "BR", "OBR"]
+TYPE_ORDER = ["玩家", "玩家EX", "Z/X", "Z/X EX", "Z/X OB", "Z/X TOKEN", "事件", "事件EX", "升格", "升格EX", "剑临", "标记", "链结"]
+MARKS = [["", "无"], ["ES", "觉醒之种"], ["IG", "点燃"]]
+TAGS = ["生命恢复", "起始卡", "门扉卡", "超限驱动"]
+
+
+class Constants(NamedTuple):
+    signature: Tuple[int, int, int]
+    payload: bytes
+    etag: str
+
+
+def _ordered(counts: Counter, known: Sequence[str]) -> List[str]:
+    rank = {v: i for i, v in enumerate(known)}
+    values = [v for v in counts if v]
+    return sorted(values, key=lambda v: (rank.get(v, len(rank)), -counts[v], v))
+
+
+def compute(rows: Iterable[Sequence]) -> Dict[str, Any]:
+    """Constants from ``(color, rarity, type, series, card_number, cost_num, power_num)`` rows."""
+    counts = {k: Counter() for k in ("color", "rarity", "type", "cost", "power")}
+    ranges: Dict[str, List] = {}  # series -> [first, last, count]
+    for color, rarity, type_, series, number, cost, power in rows:
+        counts["color"][color or ""] += 1
+        counts["rarity"][rarity or ""] += 1
+        counts["type"][type_ or ""] += 1
+        if cost is not None:
+            counts["cost"][cost] += 1
+        if power is not None:
+            counts["power"][power] += 1
+        key = derive_series(series or "", number or "")
+        if not key:
+            continue
+        r = ranges.get(key)
+        if r is None:
+            ranges[key] = [number, number, 1]
+        else:
+            r[0], r[1], r[2] = min(r[0], number), max(r[1], number), r[2] + 1
+    rarities = _ordered(counts["rarity"], RARITY_ORDER)
     return {
-        "color": ["无", "红", "蓝", "白", "黑", "绿"],
-        "rarity": [["R", "R"], ["SR", "SR"], ["UR", "UR"], ["WR", "WR"], ["BR", "BR"], ["OBR", "OBR"]],
-        "type": ["玩家", "玩家EX", "Z/X", "Z/X EX", "Z/X OB", "Z/X TOKEN", "事件", "事件EX", "升格", "升格EX", "剑临", "标记", "链结"],
-        "mark": [["", "无"], ["ES", "觉醒之种"], ["IG", "点燃"]],
-        "tags": ["生命恢复", "起始卡", "门扉卡", "超限驱动"],
-        "series": {},
+        "color": _ordered(counts["color"], COLOR_ORDER),
+        "rarity": [[v, v] for v in rarities],
+        "type": _ordered(counts["type"], TYPE_ORDER),
+        "mark": MARKS,
+        "tags": TAGS,
+        "series": {k: {"first": r[0], "last": r[1], "count": r[2]} for k, r in sorted(ranges.items())},
+        "cost": sorted(counts["cost"]),
+        "power": sorted(counts["power"]),
+        "counts": {
+            k: {str(v): n for v, n in sorted(c.items(), key=lambda kv: (-kv[1], str(kv[0]))) if v != ""}
+            for k, c in counts.items()
+        },
     }
 
 
+def constants_path() -> str:
+    if settings.use_sqlite:
+        return settings.sqlite_path + ".constants"
+    return "./zxcard.constants"
+
+
+def _encode(signature: Tuple[int, int, int], payload: bytes) -> Constants:
+    etag = '"c-' + hashlib.sha1(payload).hexdigest()[:24] + '"'
+    return Constants(signature, payload, etag)
+
+
+def _load(path: str, signature: Tuple[int, int, int]) -> Optional[Constants]:
+    """The saved constants if they were computed for ``signature``."""
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        try:
+            saved = tuple(json.loads(f.readline()))
+        except ValueError:
+            return None
+        if saved != tuple(signature):
+            return None
+        return _encode(signature, f.read())
+
+
+def _save(path: str, constants: Constants) -> None:
+    # unique name: several workers may save at the same time
+    with tempfile.NamedTemporaryFile(
+        "wb", dir=os.path.dirname(path) or ".", prefix=os.path.basename(path) + ".", suffix=".tmp", delete=False
+    ) as f:
+        try:
+            f.write(json.dumps(list(constants.signature)).encode("ascii") + b"\n")
+            f.write(constants.payload)
+        except BaseException:
+            f.close()
+            os.unlink(f.name)
+            raise
+    os.replace(f.name, path)
+
+
+def update(db: Session) -> Constants:
+    """Constants for the current dataset, from disk when up to date, else computed and saved."""
+    signature = dataset.signature(db)
+    path = constants_path()
+    cached = _load(path, signature)
+    if cached is not None:
+        return cached
+    rows = db.query(
+        Card.color, Card.rarity, Card.type, Card.series, Card.card_number, Card.cost_num, Card.power_num
+    ).yield_per(5000)
+    payload = json.dumps(compute(rows), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    constants = _encode(signature, payload)
+    try:
+        _save(path, constants)
+    except OSError as e:
+        # read-only image: keep serving from memory
+        print(f"Constants not saved to {path}: {e}")
+    return constants
+
+
+dataset.register("constants", update)
+
+
+def get(db: Session) -> Constants:
+    """The current snapshot, or a fresh computation before the first build."""
+    return dataset.get("constants") or update(db)
@@ -0,0 +1,79 @@
+"""Opaque, signed keyset cursors for paged search.
+
+A cursor carries the sort name, the (sort key, id) of the last row served and
+a fingerprint of the filters it was issued for, signed with
+``settings.cursor_secret`` so clients cannot forge positions. Pages served by
+Meilisearch also carry their hit offset ``o``.
+"""
+import base64
+import hashlib
+import hmac
+import json
+from typing import Any, Dict, Optional
+
+from .config import DEFAULT_CURSOR_SECRET, settings
+from .schemas import SearchBody
+
+
+class CursorError(ValueError):
+    pass
+
+
+def check_secret() -> None:
+    """Refuse to serve with the public default (or an empty) secret, except on
+    local SQLite: anyone could sign cursors with it."""
+    if settings.cursor_secret in ("", DEFAULT_CURSOR_SECRET) and not settings.use_sqlite:
+        raise RuntimeError("CURSOR_SECRET is not set; generate one, e.g. `openssl rand -hex 32`, and put it in .env")
+
+
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _unb64(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _sign(payload: str) -> str:
+    mac = hmac.new(settings.cursor_secret.encode("utf-8"), payload.encode("ascii"), hashlib.sha256)
+    return _b64(mac.digest()[:16])
+
+
+def canonical_query(body: SearchBody, exclude=()) -> str:
+    """``body`` as canonical JSON: unset fields dropped, list filters sorted."""
+    data = {}
+    for k, v in body.model_dump(exclude=set(exclude)).items():
+        if v is None or v == [] or v == {}:
+            continue
+        data[k] = sorted(v) if isinstance(v, list) else v
+    return json.dumps(data, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+
+
+def query_fingerprint(body: SearchBody) -> str:
+    """Stable hash of everything in ``body`` that selects or orders rows."""
+    raw = canonical_query(body, exclude=("cursor", "page_size"))
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def encode_cursor(body: SearchBody, sort: str, key: Any, last_id: int, offset: Optional[int] = None) -> str:
+    data = {"s": sort, "k": key, "i": last_id, "q": query_fingerprint(body)}
+    if offset is not None:
+        data["o"] = offset
+    payload = _b64(json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+    return f"{payload}.{_sign(payload)}"
+
+
+def decode_cursor(body: SearchBody, sort: str, cursor: str) -> Dict[str, Any]:
+    try:
+        payload, sig = cursor.split(".", 1)
+    except ValueError:
+        raise CursorError("malformed cursor")
+    if not hmac.compare_digest(sig, _sign(payload)):
+        raise CursorError("bad cursor signature")
+    try:
+        data = json.loads(_unb64(payload))
+    except Exception:
+        raise CursorError("malformed cursor")
+    if data.get("s") != sort or data.get("q") != query_fingerprint(body):
+        raise CursorError("cursor does not belong to this query")
+    return data
@@ -0,0 +1,99 @@
+"""In-process snapshots derived from the whole cards table.
+
+Indexes such as the keyword n-grams and the filter bitmaps register a builder
+here. All of them are built together at startup and rebuilt when the table
+changes underneath a running API (e.g. ``python -m api.cli import`` in another
+process); requests keep using the previous snapshot while a rebuild runs.
+
+The dataset version is an integer in the ``meta`` table, bumped by ``cli
+import`` and ``cli reindex``. Response caches key on it, so they read the
+in-memory copy from the last refresh instead of asking the database.
+"""
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from .config import settings
+from .models import Card, Meta
+
+VERSION_KEY = "dataset_version"
+
+_builders: Dict[str, Callable[[Session], Any]] = {}
+_snapshots: Dict[str, Any] = {}
+_signature: Optional[Tuple[int, int, int]] = None
+_checked_at = 0.0
+_lock = threading.Lock()
+
+
+def register(name: str, builder: Callable[[Session], Any]) -> None:
+    _builders[name] = builder
+
+
+def get(name: str) -> Any:
+    return _snapshots.get(name)
+
+
+def read_version(db: Session) -> int:
+    try:
+        row = db.get(Meta, VERSION_KEY)
+    except SQLAlchemyError:
+        # meta table not created yet (run `python -m api.cli migrate`)
+        db.rollback()
+        return 0
+    return int(row.value) if row is not None else 0
+
+
+def bump_version(db: Session) -> int:
+    row = db.get(Meta, VERSION_KEY)
+    if row is None:
+        row = Meta(key=VERSION_KEY, value="0")
+        db.add(row)
+    row.value = str(int(row.value) + 1)
+    db.commit()
+    return int(row.value)
+
+
+def version() -> int:
+    """Dataset version as of the last refresh; no database access."""
+    return _signature[0] if _signature is not None else 0
+
+
+def signature(db: Session) -> Tuple[int, int, int]:
+    count, max_id = db.query(func.count(Card.id), func.max(Card.id)).one()
+    return read_version(db), count or 0, max_id or 0
+
+
+def rebuild(db: Session) -> Dict[str, Any]:
+    """Build every snapshot now; waits for a rebuild already running in ``refresh``."""
+    with _lock:
+        return _rebuild(db)
+
+
+def _rebuild(db: Session) -> Dict[str, Any]:
+    global _snapshots, _signature, _checked_at
+    sig = signature(db)
+    snapshots = {name: build(db) for name, build in _builders.items()}
+    _snapshots = snapshots
+    _signature = sig
+    _checked_at = time.monotonic()
+    return snapshots
+
+
+def refresh(db: Session) -> None:
+    """Rebuild if the table changed; probes at most every ``index_refresh_interval`` s."""
+    global _checked_at
+    now = time.monotonic()
+    if _signature is not None and now - _checked_at < settings.index_refresh_interval:
+        return
+    if not _lock.acquire(blocking=False):
+        return
+    try:
+        _checked_at = now
+        if signature(db) != _signature:
+            _rebuild(db)
+    finally:
+        _lock.release()
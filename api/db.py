@@ -2,12 +2,14 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 from urllib.parse import quote_plus
 from .config import settings
+from . import metrics
 
 
 if getattr(settings, "use_sqlite", False):
     DATABASE_URL = f"sqlite:///{settings.sqlite_path}"
     engine = create_engine(
-        DATABASE_URL, connect_args={"check_same_thread": False}
+        DATABASE_URL, connect_args={"check_same_thread": False},
+        poolclass=metrics.TimedQueuePool if settings.metrics_enabled else None,
     )
 else:
     # URL encode password to handle special characters like @
@@ -16,7 +18,13 @@ else:
         f"mysql+pymysql://{settings.mysql_user}:{encoded_password}"
         f"@{settings.mysql_host}:{settings.mysql_port}/{settings.mysql_db}?charset=utf8mb4"
     )
-    engine = create_engine(DATABASE_URL, pool_pre_ping=True, pool_recycle=3600)
+    engine = create_engine(
+        DATABASE_URL, pool_pre_ping=True, pool_recycle=3600,
+        poolclass=metrics.TimedQueuePool if settings.metrics_enabled else None,
+    )
+
+if settings.metrics_enabled:
+    metrics.instrument_engine(engine)
 
 SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
 Base = declarative_base()
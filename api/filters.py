@@ -0,0 +1,235 @@
+"""In-memory bitmap filter engine for card search.
+
+Cards are numbered by position (0..n-1, ascending id). Every distinct color,
+rarity, type and series value, and every distinct cost/power number, owns a
+bitset of the positions carrying it, stored as a Python int so AND/OR run in
+C. A search resolves ``SearchBody`` filters to one bitset (OR within a facet,
+AND across facets) and walks it in sort order to pick the next page of ids;
+only those ids are loaded from the database.
+"""
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy.orm import Session
+
+from . import dataset
+from .config import settings
+from .models import Card
+from .schemas import SearchBody
+
+# facet name -> (Card column, SearchBody field)
+FACETS = {
+    "color": ("color", "colors"),
+    "rarity": ("rarity", "rarities"),
+    "type": ("type", "types"),
+    "series": ("series", "series"),
+}
+# numeric column -> SearchBody field
+RANGES = {
+    "cost_num": "cost",
+    "power_num": "power",
+}
+SORT_KEYS = ("card_number", "rarity")
+# sparse results are sorted directly instead of walking the full sort order
+_SPARSE = 4096
+
+
+def to_bits(positions: Iterable[int], size: int) -> int:
+    buf = bytearray((size + 7) // 8)
+    for p in positions:
+        buf[p >> 3] |= 1 << (p & 7)
+    return int.from_bytes(buf, "little")
+
+
+def iter_positions(bits: int, desc: bool = False) -> Iterable[int]:
+    """Positions of set bits, ascending (or descending)."""
+    digits = bin(bits)[2:]
+    top = len(digits) - 1
+    if desc:
+        i = digits.find("1")
+        while i != -1:
+            yield top - i
+            i = digits.find("1", i + 1)
+    else:
+        digits = digits[::-1]
+        i = digits.find("1")
+        while i != -1:
+            yield i
+            i = digits.find("1", i + 1)
+
+
+class FilterIndex:
+    def __init__(self):
+        self.ids = array("I")
+        self.pos: Dict[int, int] = {}
+        self.all = 0
+        self.bitmaps: Dict[str, Dict[Any, int]] = {}
+        self.ranges: Dict[str, Tuple[List[int], List[int]]] = {}
+        # sort name -> key per position; positions in (key, id) order and their keys
+        self.sort_keys: Dict[str, List[str]] = {}
+        self.orders: Dict[str, array] = {}
+        self.order_keys: Dict[str, List[Tuple[str, int]]] = {}
+
+    def build(self, rows: Iterable[Sequence]) -> "FilterIndex":
+        """Index ``(id, color, rarity, type, series, cost_num, power_num,
+        card_number)`` rows given in ascending id order."""
+        ids = array("I")
+        values: Dict[str, Dict[Any, List[int]]] = {f: {} for f in list(FACETS) + list(RANGES)}
+        sort_cols: Dict[str, List[str]] = {s: [] for s in SORT_KEYS}
+        names = list(FACETS) + list(RANGES)
+        for p, row in enumerate(rows):
+            ids.append(row[0])
+            for name, v in zip(names, row[1:7]):
+                values[name].setdefault(v, []).append(p)
+            sort_cols["rarity"].append(row[2] or "")
+            sort_cols["card_number"].append(row[7] or "")
+        n = len(ids)
+        self.ids = ids
+        self.pos = {card_id: p for p, card_id in enumerate(ids)}
+        self.all = (1 << n) - 1
+        self.bitmaps = {
+            f: {v: to_bits(ps, n) for v, ps in values[f].items()} for f in FACETS
+        }
+        for col in RANGES:
+            nums = sorted(v for v in values[col] if v is not None)
+            self.ranges[col] = (nums, [to_bits(values[col][v], n) for v in nums])
+        self.sort_keys = sort_cols
+        for s, keys in sort_cols.items():
+            order = sorted(range(n), key=lambda p: (keys[p], ids[p]))
+            self.orders[s] = array("I", order)
+            self.order_keys[s] = [(keys[p], ids[p]) for p in order]
+        return self
+
+    @classmethod
+    def from_db(cls, db: Session) -> "FilterIndex":
+        rows = (
+            db.query(
+                Card.id, Card.color, Card.rarity, Card.type, Card.series,
+                Card.cost_num, Card.power_num, Card.card_number,
+            )
+            .order_by(Card.id)
+            .yield_per(2000)
+        )
+        return cls().build(rows)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def ids_to_bits(self, card_ids: Iterable[int]) -> int:
+        pos = self.pos
+        return to_bits((pos[i] for i in card_ids if i in pos), len(self.ids))
+
+    def range_bits(self, col: str, bounds: Optional[Dict[str, Optional[int]]]) -> Optional[int]:
+        if not bounds or (bounds.get("min") is None and bounds.get("max") is None):
+            return None
+        nums, bitmaps = self.ranges[col]
+        lo = 0 if bounds.get("min") is None else bisect_left(nums, bounds["min"])
+        hi = len(nums) if bounds.get("max") is None else bisect_right(nums, bounds["max"])
+        bits = 0
+        for b in bitmaps[lo:hi]:
+            bits |= b
+        return bits
+
+    def key_range_bits(self, sort: str, lo: str, hi: str) -> int:
+        """Positions whose ``sort`` key lies in ``[lo, hi)``."""
+        keys = self.order_keys[sort]
+        start, end = bisect_left(keys, (lo,)), bisect_left(keys, (hi,))
+        return to_bits(self.orders[sort][start:end], len(self.ids))
+
+    def clauses(self, body: SearchBody) -> Dict[str, int]:
+        """One bitset per active filter of ``body`` (keyword excluded)."""
+        out = {}
+        for facet, (_, field) in FACETS.items():
+            wanted = getattr(body, field)
+            if wanted:
+                table = self.bitmaps[facet]
+                bits = 0
+                for v in wanted:
+                    bits |= table.get(v, 0)
+                out[facet] = bits
+        for col, field in RANGES.items():
+            bits = self.range_bits(col, getattr(body, field))
+            if bits is not None:
+                out[col] = bits
+        return out
+
+    def resolve(self, clauses: Dict[str, int], skip: Optional[str] = None) -> int:
+        bits = self.all
+        for name, b in clauses.items():
+            if name != skip:
+                bits &= b
+        return bits
+
+    def facet_counts(self, clauses: Dict[str, int]) -> Dict[str, Dict[str, int]]:
+        """Non-zero per-value counts of every facet under the *other* active filters."""
+        out = {}
+        for facet, table in self.bitmaps.items():
+            base = self.resolve(clauses, skip=facet)
+            counts = {}
+            for v, bits in table.items():
+                n = (base & bits).bit_count() if v else 0
+                if n:
+                    counts[v] = n
+            out[facet] = counts
+        return out
+
+    def page(
+        self,
+        bits: int,
+        sort: str,
+        desc: bool,
+        after: Optional[Tuple[Any, int]],
+        size: int,
+    ) -> List[int]:
+        """Up to ``size`` card ids from ``bits`` following ``after`` in sort order."""
+        ids = self.ids
+        if sort == "id":
+            if after is not None:
+                cut = bisect_left(ids, after[1]) if desc else bisect_right(ids, after[1])
+                bits = bits & ((1 << cut) - 1) if desc else bits >> cut << cut
+            out = []
+            for p in iter_positions(bits, desc):
+                out.append(ids[p])
+                if len(out) == size:
+                    break
+            return out
+
+        if bits.bit_count() <= _SPARSE:
+            col = self.sort_keys[sort]
+            ranked = sorted(((col[p], ids[p]) for p in iter_positions(bits)), reverse=desc)
+            if after is not None:
+                after = tuple(after)
+                ranked = [k for k in ranked if (k < after if desc else k > after)]
+            return [card_id for _, card_id in ranked[:size]]
+
+        keys = self.order_keys[sort]
+        order = self.orders[sort]
+        mask = bits.to_bytes((len(ids) + 7) // 8, "little")
+        if desc:
+            start = len(order) - 1 if after is None else bisect_left(keys, tuple(after)) - 1
+            seq = range(start, -1, -1)
+        else:
+            start = 0 if after is None else bisect_right(keys, tuple(after))
+            seq = range(start, len(order))
+        out = []
+        for i in seq:
+            p = order[i]
+            if mask[p >> 3] >> (p & 7) & 1:
+                out.append(ids[p])
+                if len(out) == size:
+                    break
+        return out
+
+
+def _build(db: Session) -> Optional[FilterIndex]:
+    if not settings.filter_index_enabled:
+        return None
+    return FilterIndex.from_db(db)
+
+
+dataset.register("filters", _build)
+
+
+def get_index() -> Optional[FilterIndex]:
+    return dataset.get("filters")
@@ -0,0 +1,178 @@
+"""Full-text keyword backends for the SQL search path.
+
+SQLite: ``cards_fts`` is an external-content FTS5 table over ``cards`` with
+the trigram tokenizer, so any CJK or ASCII substring of 3+ characters is a
+phrase query. Triggers keep it in sync with inserts, updates and deletes;
+``python -m api.cli fts`` creates it and rebuilds it from ``cards``.
+
+MySQL: ``FULLTEXT ... WITH PARSER ngram`` indexes on the name columns (and
+names + text_full) answer keywords of 2+ characters (``ngram_token_size``)
+with ``MATCH ... AGAINST`` in boolean mode. card_number is not in the
+FULLTEXT index; it is matched by a scan of its own (covering) index.
+
+Both backends expose a rank where smaller is more relevant.
+"""
+from typing import Any, Sequence, Tuple
+
+from sqlalchemy import column, literal, literal_column, select, table, text, union
+from sqlalchemy.dialects.mysql import match
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Query, Session
+
+from .config import settings
+from .models import Card
+
+FTS_TABLE = "cards_fts"
+FTS_COLUMNS = ("cn_name", "jp_name", "card_number", "text_full")
+# MySQL FULLTEXT indexes: the MATCH column list must equal one of them
+MYSQL_FULLTEXT = {
+    ("cn_name", "jp_name"): "ft_cards_names",
+    ("cn_name", "jp_name", "text_full"): "ft_cards_names_text",
+}
+# shortest keyword each backend can match: trigrams / default ngram_token_size
+MIN_LEN = {"sqlite": 3, "mysql": 2}
+
+fts_table = table(FTS_TABLE, column("rowid"), column("rank"))
+
+_available = False
+
+
+def _ddl() -> Sequence[str]:
+    cols = ", ".join(FTS_COLUMNS)
+    new = ", ".join(f"new.{c}" for c in FTS_COLUMNS)
+    old = ", ".join(f"old.{c}" for c in FTS_COLUMNS)
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+        f"{cols}, content='cards', content_rowid='id', tokenize='trigram')",
+        f"CREATE TRIGGER IF NOT EXISTS cards_fts_ai AFTER INSERT ON cards BEGIN "
+        f"INSERT INTO {FTS_TABLE}(rowid, {cols}) VALUES (new.id, {new}); END",
+        f"CREATE TRIGGER IF NOT EXISTS cards_fts_ad AFTER DELETE ON cards BEGIN "
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {cols}) VALUES ('delete', old.id, {old}); END",
+        # only when an indexed column changes, not e.g. content_hash backfills
+        "DROP TRIGGER IF EXISTS cards_fts_au",
+        f"CREATE TRIGGER cards_fts_au AFTER UPDATE OF {cols} ON cards BEGIN "
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {cols}) VALUES ('delete', old.id, {old}); "
+        f"INSERT INTO {FTS_TABLE}(rowid, {cols}) VALUES (new.id, {new}); END",
+    ]
+
+
+def create_fts(engine: Engine) -> None:
+    with engine.begin() as conn:
+        for stmt in _ddl():
+            conn.execute(text(stmt))
+
+
+def rebuild_fts(engine: Engine) -> None:
+    with engine.begin() as conn:
+        conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+
+
+def index_rows_after(conn, after_id: int) -> None:
+    """Add cards with ``id > after_id`` to cards_fts in one statement; for bulk
+    loads that ran with the insert trigger dropped."""
+    cols = ", ".join(FTS_COLUMNS)
+    conn.execute(
+        text(f"INSERT INTO {FTS_TABLE}(rowid, {cols}) SELECT id, {cols} FROM cards WHERE id > :after"),
+        {"after": after_id},
+    )
+
+
+def create_mysql_fulltext(engine: Engine) -> list:
+    """Add the missing ngram FULLTEXT indexes on MySQL; returns their names."""
+    created = []
+    with engine.begin() as conn:
+        existing = {
+            r[0]
+            for r in conn.execute(text(
+                "SELECT DISTINCT INDEX_NAME FROM information_schema.STATISTICS "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'cards'"
+            ))
+        }
+        for cols, name in MYSQL_FULLTEXT.items():
+            if name not in existing:
+                conn.execute(text(
+                    f"CREATE FULLTEXT INDEX {name} ON cards ({', '.join(cols)}) WITH PARSER ngram"
+                ))
+                created.append(name)
+    return created
+
+
+def _backend() -> str:
+    return "sqlite" if settings.use_sqlite else "mysql"
+
+
+def available(db: Session) -> bool:
+    global _available
+    if _backend() == "sqlite" and not settings.sqlite_fts_enabled:
+        return False
+    if _backend() == "mysql" and not settings.mysql_fulltext_enabled:
+        return False
+    if not _available:
+        if _backend() == "sqlite":
+            found = db.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :n"),
+                {"n": FTS_TABLE},
+            ).first()
+        else:
+            found = db.execute(
+                text(
+                    "SELECT 1 FROM information_schema.STATISTICS WHERE TABLE_SCHEMA = DATABASE() "
+                    "AND TABLE_NAME = 'cards' AND INDEX_NAME = :n LIMIT 1"
+                ),
+                {"n": MYSQL_FULLTEXT[("cn_name", "jp_name")]},
+            ).first()
+        _available = found is not None
+    return _available
+
+
+def usable(db: Session, keyword: str) -> bool:
+    if len(keyword) < MIN_LEN[_backend()] or "%" in keyword or "_" in keyword:
+        # too short for the tokenizer, or LIKE wildcards the caller relies on
+        return False
+    return available(db)
+
+
+def match_expr(keyword: str, fields: Sequence[str]) -> str:
+    """FTS5 phrase query for ``keyword`` limited to ``fields``."""
+    phrase = '"' + keyword.replace('"', '""') + '"'
+    return "{" + " ".join(fields) + "}: " + phrase
+
+
+def _mysql_match(keyword: str, fields: Sequence[str]):
+    cols = tuple(f for f in fields if f != "card_number")
+    if cols not in MYSQL_FULLTEXT:
+        raise ValueError(f"no FULLTEXT index over {cols}")
+    # boolean-mode phrase: the ngram sequence of the keyword, in order
+    phrase = '"' + keyword.replace('"', " ") + '"'
+    return match(*(getattr(Card, c) for c in cols), against=literal(phrase)).in_boolean_mode()
+
+
+def _sqlite_match(keyword: str, fields: Sequence[str]):
+    return literal_column(FTS_TABLE).op("MATCH")(literal(match_expr(keyword, fields)))
+
+
+def keyword_clause(keyword: str, fields: Sequence[str]):
+    """WHERE clause on ``cards`` for rows whose ``fields`` contain ``keyword``."""
+    if _backend() == "sqlite":
+        return Card.id.in_(select(fts_table.c.rowid).where(_sqlite_match(keyword, fields)))
+    ids = select(Card.id).where(_mysql_match(keyword, fields))
+    if "card_number" in fields:
+        ids = union(ids, select(Card.id).where(Card.card_number.like(f"%{keyword}%")))
+    return Card.id.in_(ids)
+
+
+def ranked(db: Session, keyword: str, fields: Sequence[str]) -> Tuple[Query, Any]:
+    """(query of (id, rank), rank expression) for matching cards.
+
+    Smaller rank is more relevant, so pages order by (rank, id) ascending.
+    """
+    if _backend() == "sqlite":
+        rank = fts_table.c.rank
+        q = (
+            db.query(Card.id, rank.label("rank"))
+            .join(fts_table, fts_table.c.rowid == Card.id)
+            .filter(_sqlite_match(keyword, fields))
+        )
+        return q, rank
+    rank = -_mysql_match(keyword, fields)
+    return db.query(Card.id, rank.label("rank")).filter(keyword_clause(keyword, fields)), rank
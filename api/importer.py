@@ -1,6 +1,20 @@
 import csv
+import hashlib
+import itertools
+import os
+import re
+import tempfile
+import time
+from contextlib import ExitStack, contextmanager
+from operator import itemgetter
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from sqlalchemy import bindparam, create_engine, delete, insert, select, update
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import Session
+from .config import settings
+from .fts import index_rows_after
 from .models import Card
+from .pipeline import parallel_chunks
 
 
 def normalize_int(value: str) -> str:
@@ -10,32 +24,366 @@ def normalize_int(value: str) -> str:
     return v
 
 
-def import_csv(path: str, db: Session) -> int:
-    count = 0
-    with open(path, "r", encoding="utf-8-sig") as f:
-        reader = csv.DictReader(f)
+def normalize_card_number(value: str) -> str:
+    return (value or "").strip().upper()
+
+
+def normalize_rarity(value: str) -> str:
+    return (value or "").strip().upper()
+
+
+def normalize_type(value: str) -> str:
+    # "Z/X  EX" -> "Z/X EX"
+    return " ".join((value or "").split())
+
+
+def derive_series(series: str, card_number: str) -> str:
+    """The ``series`` column, or the card number's pack prefix (B01-001 -> B01)."""
+    series = (series or "").strip()
+    if series or "-" not in card_number:
+        return series
+    return card_number.split("-", 1)[0]
+
+
+_INT_RE = re.compile(r"^-?\d+$")
+
+
+def parse_int(value: Optional[str]) -> Optional[int]:
+    v = normalize_int(value)
+    return int(v) if _INT_RE.match(v) else None
+
+
+# insert column order; every CSV row is normalized to a tuple in this order,
+# ending with the sha1 of the values before it
+COLUMNS = (
+    "color", "card_number", "series", "rarity", "type", "jp_name", "cn_name",
+    "cost", "power", "cost_num", "power_num", "race", "note", "text_full",
+    "image_url", "detail_url", "content_hash",
+)
+DATA_COLUMNS = COLUMNS[:-1]
+
+# natural key of a card, as in zx2.build_row_key
+KEY_STRATEGIES = ("auto", "detail_url", "image_url", "card")
+_KEY_POS = {c: COLUMNS.index(c) for c in ("detail_url", "image_url", "card_number", "rarity", "cn_name", "jp_name")}
+
+# load-time settings for the import connection, restored afterwards: no fsync
+# per commit (a crashed import is simply re-run) and a 256 MB page cache
+SQLITE_LOAD_PRAGMAS = {"synchronous": "OFF", "temp_store": "MEMORY", "cache_size": "-262144"}
+
+
+def content_hash(values: Iterable) -> str:
+    """sha1 of a card's ``DATA_COLUMNS`` values."""
+    text = "\x1f".join("" if v is None else str(v) for v in values)
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def row_key(row: Sequence, strategy: str = "auto") -> str:
+    """Natural key of an insert tuple (or a row selected in ``COLUMNS`` order)."""
+    detail, image = row[_KEY_POS["detail_url"]] or "", row[_KEY_POS["image_url"]] or ""
+    if strategy in ("auto", "detail_url") and detail:
+        return "detail_url:" + detail
+    if strategy in ("auto", "image_url") and image:
+        return "image_url:" + image
+    return "card:" + "|".join(row[_KEY_POS[c]] or "" for c in ("card_number", "rarity", "cn_name", "jp_name"))
+
+
+def normalizer(header: List[str]) -> Callable[[List[str]], Tuple]:
+    """Function turning a ``csv.reader`` row (columns as in ``header``) into
+    an insert tuple in ``COLUMNS`` order; missing columns read as ''."""
+    pos = {name: i for i, name in enumerate(header)}
+    width = len(header)  # index of the '' padding for absent columns
+    plain = [pos.get(c, width) for c in ("color", "series", "rarity", "type", "jp_name", "cn_name")]
+    tail = [pos.get(c, width) for c in ("race", "note", "text_full", "image_url", "detail_url")]
+    i_number, i_cost, i_power = (pos.get(c, width) for c in ("card_number", "cost", "power"))
+    need = max(plain + tail + [i_number, i_cost, i_power]) + 1
+
+    get_plain, get_tail = itemgetter(*plain), itemgetter(*tail)
+
+    def normalize(row: List[str]) -> Tuple:
+        if len(row) < need:
+            row = row + [""] * (need - len(row))
+        color, series, rarity, type_, jp_name, cn_name = get_plain(row)
+        number = normalize_card_number(row[i_number])
+        cost = normalize_int(row[i_cost])
+        power = normalize_int(row[i_power])
+        values = (
+            color, number, derive_series(series, number), normalize_rarity(rarity), normalize_type(type_),
+            jp_name, cn_name, cost, power, parse_int(cost), parse_int(power),
+        ) + get_tail(row)
+        return values + (content_hash(values),)
+
+    return normalize
+
+
+def parse_rows(header: List[str], rows: List[List[str]]) -> List[Tuple]:
+    """Insert tuples of ``csv.reader`` rows, skipping blank lines (as
+    ``csv.DictReader`` does); the pipeline's worker step."""
+    normalize = normalizer(header)
+    return [normalize(row) for row in rows if any(row)]
+
+
+def read_chunks(path: str, size: int, workers: int = 1) -> Iterator[List[Tuple]]:
+    """Normalized rows of the CSV at ``path``, ``size`` at a time.
+
+    With ``workers`` > 1 the file is parsed by that many processes
+    (``pipeline.parallel_chunks``) and the rows arrive in file order.
+    """
+    if workers > 1:
+        for rows in parallel_chunks(path, parse_rows, workers):
+            for i in range(0, len(rows), size):
+                yield rows[i:i + size]
+        return
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        reader = csv.reader(f)
+        normalize = normalizer(next(reader, []))
+        chunk = []
         for row in reader:
-            obj = Card(
-                color=row.get("color") or "",
-                card_number=row.get("card_number") or "",
-                series=row.get("series") or "",
-                rarity=row.get("rarity") or "",
-                type=row.get("type") or "",
-                jp_name=row.get("jp_name") or "",
-                cn_name=row.get("cn_name") or "",
-                cost=normalize_int(row.get("cost")),
-                power=normalize_int(row.get("power")),
-                race=row.get("race") or "",
-                note=row.get("note") or "",
-                text_full=row.get("text_full") or "",
-                image_url=row.get("image_url") or "",
-                detail_url=row.get("detail_url") or "",
-            )
-            db.add(obj)
-            count += 1
-            if count % 1000 == 0:
-                db.commit()
-        db.commit()
+            if not any(row):
+                continue  # blank line
+            chunk.append(normalize(row))
+            if len(chunk) >= size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
+@contextmanager
+def _sqlite_load_pragmas(conn):
+    saved = {name: conn.exec_driver_sql(f"PRAGMA {name}").scalar() for name in SQLITE_LOAD_PRAGMAS}
+    for name, value in SQLITE_LOAD_PRAGMAS.items():
+        conn.exec_driver_sql(f"PRAGMA {name}={value}")
+    conn.commit()
+    try:
+        yield
+    finally:
+        conn.rollback()
+        for name, value in saved.items():
+            conn.exec_driver_sql(f"PRAGMA {name}={value}")
+        conn.commit()
+
+
+@contextmanager
+def _sqlite_deferred_indexes(conn):
+    """Load into an empty ``cards`` without its secondary indexes and FTS
+    triggers, then build them once: per-row maintenance of ~15 indexes and
+    the trigram FTS costs far more than creating them over the loaded table."""
+    schema = conn.exec_driver_sql(
+        "SELECT type, name, sql FROM sqlite_master WHERE tbl_name = 'cards' "
+        "AND type IN ('index', 'trigger') AND sql IS NOT NULL"
+    ).all()
+    fts_synced = any(name == "cards_fts_ai" for _, name, _ in schema)
+    for kind, name, _ in schema:
+        conn.exec_driver_sql(f'DROP {kind.upper()} "{name}"')
+    conn.commit()
+    try:
+        yield
+    finally:
+        conn.rollback()
+        for kind, _, sql in sorted(schema, key=lambda s: s[0]):  # indexes before triggers
+            conn.exec_driver_sql(sql)
+        if fts_synced:
+            index_rows_after(conn, 0)
+        conn.commit()
+
+
+def _insert_statement(engine) -> Tuple[str, Callable[[List[Tuple]], List]]:
+    """The insert compiled once, plus the function turning a chunk into its params.
+
+    With a positional driver (sqlite3) the row tuples are passed straight
+    through, otherwise as dicts.
+    """
+    compiled = insert(Card.__table__).compile(dialect=engine.dialect, column_keys=list(COLUMNS))
+    order = [COLUMNS.index(k) for k in compiled.positiontup] if compiled.positional else None
+    if order is None:
+        return str(compiled), lambda chunk: [dict(zip(COLUMNS, row)) for row in chunk]
+    if order == list(range(len(COLUMNS))):
+        return str(compiled), lambda chunk: chunk
+    return str(compiled), lambda chunk: [tuple(row[i] for i in order) for row in chunk]
+
+
+def _insert_chunks(engine, chunks: Iterable[List[Tuple]]) -> int:
+    """Core executemany, one transaction per chunk."""
+    sql, params = _insert_statement(engine)
+    count = 0
+    with engine.connect() as conn, ExitStack() as stack:
+        if engine.dialect.name == "sqlite":
+            stack.enter_context(_sqlite_load_pragmas(conn))
+            empty = conn.exec_driver_sql("SELECT 1 FROM cards LIMIT 1").first() is None
+            conn.commit()
+            if empty:
+                stack.enter_context(_sqlite_deferred_indexes(conn))
+        for chunk in chunks:
+            with conn.begin():
+                conn.exec_driver_sql(sql, params(chunk))
+            count += len(chunk)
+    return count
+
+
+def _tsv_field(value) -> str:
+    if value is None:
+        return "\\N"
+    return str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+
+def _load_data_local(engine, chunks: Iterable[List[Tuple]]) -> int:
+    """MySQL ``LOAD DATA LOCAL INFILE`` of each chunk via a temporary TSV file."""
+    loader = create_engine(engine.url, connect_args={"local_infile": True})
+    sql = (
+        "LOAD DATA LOCAL INFILE '{path}' INTO TABLE cards CHARACTER SET utf8mb4 "
+        "FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' LINES TERMINATED BY '\\n' "
+        f"({', '.join(COLUMNS)})"
+    )
+    count = 0
+    try:
+        with loader.connect() as conn:
+            for chunk in chunks:
+                with tempfile.NamedTemporaryFile("w", encoding="utf-8", suffix=".tsv", delete=False) as tmp:
+                    for row in chunk:
+                        tmp.write("\t".join(_tsv_field(v) for v in row) + "\n")
+                try:
+                    with conn.begin():
+                        conn.exec_driver_sql(sql.format(path=tmp.name.replace("\\", "/")))
+                finally:
+                    os.unlink(tmp.name)
+                count += len(chunk)
+    finally:
+        loader.dispose()
     return count
 
 
+def import_csv(path: str, db: Session, chunk_size: int = 5000, workers: int = 1) -> Dict[str, Any]:
+    """Append the CSV's rows to ``cards``; returns rows, seconds and the load method.
+
+    Rows are streamed and normalized in chunks and written with Core
+    executemany (no ORM objects), one transaction per chunk. On MySQL with
+    ``mysql_local_infile`` each chunk is sent with ``LOAD DATA LOCAL INFILE``
+    instead, falling back to executemany if the server refuses it. With
+    ``workers`` > 1 parsing runs in worker processes and this process only
+    writes.
+    """
+    engine = db.get_bind()
+    db.commit()
+    start = time.perf_counter()
+    chunks = read_chunks(path, chunk_size, workers)
+    method = "executemany"
+    count = 0
+    if engine.dialect.name == "mysql" and settings.mysql_local_infile:
+        first = next(chunks, None)
+        try:
+            count = _load_data_local(engine, [first] if first else [])
+            method = "load_data"
+        except OperationalError as e:
+            # local_infile disabled on the server (or client): plain inserts
+            print(f"LOAD DATA LOCAL INFILE not allowed, using executemany: {e.orig}")
+            chunks = itertools.chain([first], chunks)
+        else:
+            count += _load_data_local(engine, chunks)
+    if method == "executemany":
+        count = _insert_chunks(engine, chunks)
+    seconds = time.perf_counter() - start
+    return {"rows": count, "seconds": seconds, "method": method}
+
+
+# bind names of the UPDATE ... SET values (column names are reserved)
+_SET_KEYS = tuple("v_" + c for c in COLUMNS)
+
+
+def _existing(conn, key: str) -> Tuple[Dict[str, Tuple[int, str, bool]], List[int]]:
+    """``key -> (id, content hash, hash stored)`` for the rows in ``cards``, plus
+    the ids of later rows repeating a key. Rows imported before the hash
+    column existed get it computed from their values."""
+    table = Card.__table__
+    rows = conn.execute(
+        select(table.c.id, *(table.c[c] for c in COLUMNS)).order_by(table.c.id)
+        .execution_options(yield_per=10000)
+    )
+    found: Dict[str, Tuple[int, str, bool]] = {}
+    repeated = []
+    for row in rows:
+        values = row[1:]
+        k = row_key(values, key)
+        if k in found:
+            repeated.append(row[0])
+            continue
+        stored = values[-1]
+        found[k] = (row[0], stored or content_hash(values[:-1]), bool(stored))
+    rows.close()
+    return found, repeated
+
+
+def upsert_csv(
+    path: str, db: Session, chunk_size: int = 5000, key: str = "auto", delete_missing: bool = False,
+    workers: int = 1,
+) -> Dict[str, Any]:
+    """Make ``cards`` match the CSV by natural key (``row_key``) instead of appending.
+
+    New keys are inserted, rows whose content hash differs are updated, and
+    equal rows are not written at all; with ``delete_missing`` rows whose key
+    is not in the CSV (or that repeat another row's key) are deleted. A key
+    repeated within the CSV keeps its first row. Returns the inserted,
+    updated, unchanged, deleted and duplicate counts, and seconds.
+    """
+    engine = db.get_bind()
+    db.commit()
+    start = time.perf_counter()
+    table = Card.__table__
+    stats = {"inserted": 0, "updated": 0, "unchanged": 0, "deleted": 0, "duplicates": 0}
+    seen = set()
+
+    def classify(chunks: Iterable[List[Tuple]]) -> Iterator[Tuple[List[Tuple], List[Dict], List[Dict]]]:
+        """(new rows, changed rows, hash backfills) per chunk."""
+        for chunk in chunks:
+            new, changed, backfill = [], [], []
+            for row in chunk:
+                k = row_key(row, key)
+                if k in seen:
+                    stats["duplicates"] += 1
+                    continue
+                seen.add(k)
+                current = existing.pop(k, None)
+                if current is None:
+                    new.append(row)
+                elif current[1] != row[-1]:
+                    changed.append(dict(zip(_SET_KEYS, row), _id=current[0]))
+                else:
+                    stats["unchanged"] += 1
+                    if not current[2]:
+                        backfill.append({"_id": current[0], _SET_KEYS[-1]: row[-1]})
+            stats["inserted"] += len(new)
+            stats["updated"] += len(changed)
+            yield new, changed, backfill
+
+    with engine.connect() as conn:
+        existing, repeated = _existing(conn, key)
+        conn.commit()
+    chunks = read_chunks(path, chunk_size, workers)
+    if not existing:
+        # empty table: the plain bulk load, minus repeated keys
+        _insert_chunks(engine, (new for new, _, _ in classify(chunks) if new))
+        return dict(stats, seconds=time.perf_counter() - start)
+
+    sql, params = _insert_statement(engine)
+    by_id = table.c.id == bindparam("_id")
+    update_row = update(table).where(by_id).values({c: bindparam(k) for c, k in zip(COLUMNS, _SET_KEYS)})
+    update_hash = update(table).where(by_id).values(content_hash=bindparam(_SET_KEYS[-1]))
+    with engine.connect() as conn, ExitStack() as stack:
+        if engine.dialect.name == "sqlite":
+            stack.enter_context(_sqlite_load_pragmas(conn))
+        for new, changed, backfill in classify(chunks):
+            if not (new or changed or backfill):
+                continue
+            with conn.begin():
+                if new:
+                    conn.exec_driver_sql(sql, params(new))
+                if changed:
+                    conn.execute(update_row, changed)
+                if backfill:
+                    conn.execute(update_hash, backfill)
+        if delete_missing:
+            ids = [current[0] for current in existing.values()] + repeated
+            for i in range(0, len(ids), 500):
+                with conn.begin():
+                    conn.execute(delete(table).where(table.c.id.in_(ids[i:i + 500])))
+            stats["deleted"] = len(ids)
+    return dict(stats, seconds=time.perf_counter() - start)
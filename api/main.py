@@ -1,9 +1,31 @@
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from sqlalchemy.orm import Session
+from . import constants, dataset, metrics, warmup
+from .cursor import check_secret
+from .cache import etag_matches
+from .config import settings
+from .db import get_db
 from .routers import router
-from .constants import load_constants_from_readme
 
-app = FastAPI(title="ZX Card Search API", version="0.1.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    check_secret()
+    if settings.warmup_background:
+        task = asyncio.create_task(warmup.run(app))
+    else:
+        await warmup.run(app)
+        task = None
+    yield
+    if task is not None and not task.done():
+        task.cancel()
+
+
+app = FastAPI(title="ZX Card Search API", version="0.1.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -12,15 +34,38 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+if settings.metrics_enabled:
+    app.add_middleware(metrics.MetricsMiddleware)
 
 @app.get("/health")
+@app.get("/health/live")
 def health():
+    """Liveness: the process serves HTTP."""
     return {"ok": True}
 
 
+@app.get("/health/ready")
+def ready():
+    """Readiness: 503 until the startup warm-up has finished."""
+    state = warmup.status()
+    return JSONResponse(state, status_code=200 if state["ready"] else 503)
+
+
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    if not settings.metrics_enabled:
+        return Response(status_code=404)
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
 @app.get("/api/constants")
-def get_constants():
-    return load_constants_from_readme()
+def get_constants(request: Request, db: Session = Depends(get_db)):
+    dataset.refresh(db)
+    snapshot = constants.get(db)
+    headers = {"ETag": snapshot.etag, "Cache-Control": f"public, max-age={settings.constants_max_age}"}
+    if etag_matches(request.headers.get("if-none-match"), snapshot.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(snapshot.payload, media_type="application/json", headers=headers)
 
 
 app.include_router(router, prefix="/api")
@@ -0,0 +1,237 @@
+"""Process metrics in Prometheus text format, served on ``/metrics``.
+
+- SQL: every statement is timed by engine events and recorded under a
+  fingerprint (literals and bind markers replaced by ``?``, ``IN`` lists
+  collapsed), so ``WHERE id IN (?, ?, ?)`` and a 50-id version share a series.
+  Statements slower than ``slow_query_ms`` are printed with their parameters.
+- Pool: time spent in ``pool.connect()`` (waiting for, or opening, a connection)
+  plus the current pool occupancy.
+- HTTP: latency per route template (``/api/cards/{card_id}``), not per URL.
+- Caches: hits/misses/entries/bytes of the ByteCaches in api/cache.py.
+
+Everything is kept in memory per process; with several uvicorn workers each
+worker reports its own numbers.
+"""
+import re
+import threading
+import time
+from bisect import bisect_left
+from functools import lru_cache
+from typing import Callable, Dict, List, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+
+from .cache import card_cache, search_cache
+from .config import settings
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+HTTP_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+SQL_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+OTHER = "other"
+_LE = 'le="%g"'
+_INF = 'le="+Inf"'
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        out.extend(f"{self.name}{_labels(self.labels, k)} {v:g}" for k, v in items)
+        return out
+
+
+class Histogram:
+    """Cumulative-bucket histogram; at most ``max_series`` label sets, the
+    rest are folded into one series labelled ``other``."""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets=HTTP_BUCKETS,
+                 max_series: int = 0):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self.buckets = tuple(buckets)
+        self.max_series = max_series
+        self._series: Dict[Tuple, List] = {}  # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float, *labels) -> None:
+        i = bisect_left(self.buckets, seconds)
+        with self._lock:
+            s = self._series.get(labels)
+            if s is None:
+                if self.max_series and len(self._series) >= self.max_series:
+                    labels = (OTHER,) * len(self.labels)
+                    s = self._series.get(labels)
+                if s is None:
+                    s = self._series[labels] = [0] * (len(self.buckets) + 2)
+            if i < len(self.buckets):
+                s[i] += 1
+            s[-2] += seconds
+            s[-1] += 1
+
+    def render(self) -> List[str]:
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+        for key, s in items:
+            cumulative = 0
+            for le, n in zip(self.buckets, s):
+                cumulative += n
+                out.append(f"{self.name}_bucket{_labels(self.labels, key, _LE % le)} {cumulative}")
+            out.append(f"{self.name}_bucket{_labels(self.labels, key, _INF)} {s[-1]}")
+            out.append(f"{self.name}_sum{_labels(self.labels, key)} {s[-2]:.6f}")
+            out.append(f"{self.name}_count{_labels(self.labels, key)} {s[-1]}")
+        return out
+
+
+http_seconds = Histogram(
+    "zxcard_http_request_duration_seconds", "HTTP request latency by route template.",
+    ("method", "route", "status"),
+)
+sql_seconds = Histogram(
+    "zxcard_sql_statement_duration_seconds", "SQL statement latency by normalized fingerprint.",
+    ("statement",), SQL_BUCKETS, max_series=settings.metrics_max_statements,
+)
+sql_slow = Counter("zxcard_sql_slow_statements_total", "Statements slower than SLOW_QUERY_MS.", ("statement",))
+pool_wait_seconds = Histogram(
+    "zxcard_db_pool_checkout_seconds", "Time to check a connection out of the pool.", (), SQL_BUCKETS,
+)
+search_errors = Counter("zxcard_search_errors_total", "Unhandled errors in /api/cards/search.")
+
+_gauges: List[Tuple[str, str, Callable[[], Dict[Tuple, float]], Sequence[str]]] = []
+
+
+def gauge(name: str, help: str, fn: Callable[[], Dict[Tuple, float]], labels: Sequence[str] = ()) -> None:
+    """Register a gauge read at scrape time; ``fn`` returns {label values: value}."""
+    _gauges.append((name, help, fn, tuple(labels)))
+
+
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b|%\(\w+\)s|%s|:\w+")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(statement: str) -> str:
+    fp = _LITERAL.sub("?", statement)
+    fp = _IN_LIST.sub("(?...)", fp)
+    return " ".join(fp.split())
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            pool_wait_seconds.observe(time.perf_counter() - start)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._metrics_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._metrics_start
+    fp = fingerprint(statement)
+    sql_seconds.observe(elapsed, fp)
+    # bulk writes (cli import) are slow by design; they still land in the histogram
+    if elapsed * 1000 >= settings.slow_query_ms and not executemany:
+        sql_slow.inc(fp)
+        params = repr(parameters)
+        if len(params) > 300:
+            params = params[:300] + "..."
+        print(f"Slow query ({elapsed * 1000:.1f} ms): {' '.join(statement.split())} {params}")
+
+
+def instrument_engine(engine) -> None:
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+    def pool_state():
+        pool = engine.pool
+        if not isinstance(pool, QueuePool):
+            return {}
+        return {("size",): pool.size(), ("checked_out",): pool.checkedout(), ("overflow",): max(pool.overflow(), 0)}
+
+    gauge("zxcard_db_pool_connections", "Connection pool occupancy.", pool_state, ("state",))
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing each HTTP request by its matched route."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope.get("warmup"):
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            http_seconds.observe(time.perf_counter() - start, scope["method"], path, f"{status[0] // 100}xx")
+
+
+def _render_gauge(name: str, help: str, values: Dict[Tuple, float], labels: Sequence[str]) -> List[str]:
+    out = [f"# HELP {name} {help}", f"# TYPE {name} gauge"]
+    out.extend(f"{name}{_labels(labels, k)} {v:g}" for k, v in sorted(values.items()))
+    return out
+
+
+def _cache_lines() -> List[str]:
+    caches = {"search": search_cache, "card": card_cache}
+    out = []
+    for name, kind, help, read in (
+        ("zxcard_cache_hits_total", "counter", "Cache hits.", lambda c: c.hits),
+        ("zxcard_cache_misses_total", "counter", "Cache misses.", lambda c: c.misses),
+        ("zxcard_cache_hit_ratio", "gauge", "Hits / lookups since start.",
+         lambda c: c.hits / (c.hits + c.misses) if c.hits + c.misses else 0.0),
+        ("zxcard_cache_entries", "gauge", "Entries held.", len),
+        ("zxcard_cache_bytes", "gauge", "Bytes held.", lambda c: c.size),
+    ):
+        out += [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+        out.extend(f'{name}{{cache="{c}"}} {read(cache):g}' for c, cache in caches.items())
+    return out
+
+
+def render() -> bytes:
+    lines: List[str] = []
+    for metric in (http_seconds, sql_seconds, sql_slow, pool_wait_seconds, search_errors):
+        lines += metric.render()
+    for name, help, fn, labels in _gauges:
+        lines += _render_gauge(name, help, fn(), labels)
+    lines += _cache_lines()
+    return ("\n".join(lines) + "\n").encode("utf-8")
@@ -0,0 +1,66 @@
+"""Bring an existing database up to the current models.
+
+``create_all`` only creates missing tables; this also adds columns and
+indexes that were introduced after a table was first created, then fills
+derived columns for rows imported before they existed.
+"""
+from typing import List
+
+from sqlalchemy import inspect, or_, select, text, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from .db import Base
+from .importer import parse_int
+from .models import Card
+
+
+def upgrade_schema(engine: Engine) -> List[str]:
+    Base.metadata.create_all(bind=engine)
+    changes = []
+    insp = inspect(engine)
+    for table in Base.metadata.sorted_tables:
+        existing_cols = {c["name"] for c in insp.get_columns(table.name)}
+        for col in table.columns:
+            if col.name in existing_cols:
+                continue
+            ddl = f"ALTER TABLE {table.name} ADD COLUMN {col.name} {col.type.compile(dialect=engine.dialect)}"
+            with engine.begin() as conn:
+                conn.execute(text(ddl))
+            changes.append(f"column {table.name}.{col.name}")
+        existing_idx = {i["name"] for i in insp.get_indexes(table.name)}
+        for idx in table.indexes:
+            if idx.name not in existing_idx:
+                idx.create(bind=engine)
+                changes.append(f"index {idx.name}")
+    return changes
+
+
+def backfill_numeric(db: Session, batch: int = 1000) -> int:
+    """Fill cost_num/power_num for rows that still only have the strings;
+    returns the number of rows that got a number. Rows whose cost and power
+    are both non-numeric ("-", "∞") stay NULL and are not counted."""
+    last_id = 0
+    filled = 0
+    while True:
+        rows = db.execute(
+            select(Card.id, Card.cost, Card.power)
+            .where(Card.id > last_id)
+            .where(Card.cost_num.is_(None), Card.power_num.is_(None))
+            .where(or_(Card.cost != "", Card.power != ""))
+            .order_by(Card.id)
+            .limit(batch)
+        ).all()
+        if not rows:
+            break
+        params = [
+            {"id": r.id, "cost_num": parse_int(r.cost), "power_num": parse_int(r.power)}
+            for r in rows
+        ]
+        params = [p for p in params if p["cost_num"] is not None or p["power_num"] is not None]
+        if params:
+            db.execute(update(Card), params)
+            db.commit()
+        filled += len(params)
+        last_id = rows[-1].id
+    return filled
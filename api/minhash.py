@@ -0,0 +1,124 @@
+"""MinHash signatures and an LSH banding index for near-duplicate text.
+
+Pure Python with no database imports. api/similar.py builds the card index
+on top, and signs the rows of a CSV for ``zx2.py --mode dedupe`` with the
+same parameters.
+
+A text is reduced to its character k-shingles (whitespace dropped, which
+suits CJK effect text). Signatures use one-permutation hashing: every shingle
+is hashed once, the top bits pick one of ``num_perm`` bins and each bin keeps
+its minimum; empty bins borrow from the next filled bin (rotation
+densification). That costs one hash per shingle instead of ``num_perm``,
+and the fraction of equal positions in two signatures still estimates the
+Jaccard similarity of the shingle sets. Signatures are cut into ``bands``
+bands; texts sharing any band are candidates, which finds pairs above
+roughly (1/bands)^(1/rows) similarity without comparing every pair.
+"""
+import zlib
+from array import array
+from typing import Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+_EMPTY = 0xFFFFFFFF
+
+
+def shingles(text: str, k: int = 3) -> Set[str]:
+    t = "".join((text or "").split())
+    if not t or t in ("-", "—"):
+        return set()
+    if len(t) <= k:
+        return {t}
+    return {t[i:i + k] for i in range(len(t) - k + 1)}
+
+
+def text_crc(text: str) -> int:
+    return zlib.crc32((text or "").encode("utf-8"))
+
+
+class MinHasher:
+    def __init__(self, num_perm: int = 64, seed: int = 1):
+        if num_perm & (num_perm - 1) or num_perm > 256:
+            raise ValueError("num_perm must be a power of two <= 256")
+        self.num_perm = num_perm
+        self.bin_bits = num_perm.bit_length() - 1
+        self.value_bits = 32 - self.bin_bits
+        self.seed = seed * 0x9E3779B1 & _EMPTY | 1
+
+    def signature(self, grams: Iterable[str]) -> Optional[array]:
+        shift, low = self.value_bits, (1 << self.value_bits) - 1
+        sig = [_EMPTY] * self.num_perm
+        for g in grams:
+            h = zlib.crc32(g.encode("utf-8")) * self.seed & _EMPTY
+            b, v = h >> shift, h & low
+            if v < sig[b]:
+                sig[b] = v
+        empty = sig.count(_EMPTY)
+        if empty == self.num_perm:
+            return None
+        if empty:
+            # rotation densification: an empty bin copies the next filled one,
+            # tagged with the distance so it cannot equal a genuine minimum
+            n, src = self.num_perm, sig[:]
+            for i in range(n):
+                if src[i] == _EMPTY:
+                    d = 1
+                    while src[(i + d) % n] == _EMPTY:
+                        d += 1
+                    sig[i] = src[(i + d) % n] + (d << shift)
+        return array("I", sig)
+
+
+def similarity(a: array, b: array) -> float:
+    return sum(1 for x, y in zip(a, b) if x == y) / len(a)
+
+
+class LSHIndex:
+    def __init__(self, num_perm: int = 64, bands: int = 16):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.rows = num_perm // bands
+        self.buckets: List[Dict[bytes, List[Hashable]]] = [{} for _ in range(bands)]
+        self.sigs: Dict[Hashable, array] = {}
+
+    def _bands(self, sig: array) -> Iterable[Tuple[int, bytes]]:
+        r = self.rows
+        for b in range(len(self.buckets)):
+            yield b, sig[b * r:(b + 1) * r].tobytes()
+
+    def add(self, key: Hashable, sig: array) -> None:
+        self.sigs[key] = sig
+        for b, band in self._bands(sig):
+            self.buckets[b].setdefault(band, []).append(key)
+
+    def candidates(self, sig: array) -> Set[Hashable]:
+        out: Set[Hashable] = set()
+        for b, band in self._bands(sig):
+            out.update(self.buckets[b].get(band, ()))
+        return out
+
+    def query(self, sig: array, limit: int, threshold: float = 0.0, exclude: Hashable = None) -> List[Tuple[Hashable, float]]:
+        """Top ``limit`` (key, estimated Jaccard) among the candidates of ``sig``."""
+        scored = []
+        for key in self.candidates(sig):
+            if key == exclude:
+                continue
+            s = similarity(sig, self.sigs[key])
+            if s >= threshold:
+                scored.append((key, s))
+        scored.sort(key=lambda kv: (-kv[1], kv[0]))
+        return scored[:limit]
+
+    def pairs(self, threshold: float) -> Iterable[Tuple[Hashable, Hashable, float]]:
+        """Every candidate pair (a < b in insertion order) at or above ``threshold``."""
+        order = {k: i for i, k in enumerate(self.sigs)}
+        seen = set()
+        for bucket in self.buckets:
+            for keys in bucket.values():
+                for i, a in enumerate(keys):
+                    for b in keys[i + 1:]:
+                        pair = (a, b) if order[a] < order[b] else (b, a)
+                        if pair in seen:
+                            continue
+                        seen.add(pair)
+                        s = similarity(self.sigs[a], self.sigs[b])
+                        if s >= threshold:
+                            yield pair[0], pair[1], s
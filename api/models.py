@@ -15,14 +15,39 @@ class Card(Base):
     cn_name = Column(String(256), index=True)
     cost = Column(String(16), index=True)
     power = Column(String(16), index=True)
+    # integer shadows of cost/power for range filters; NULL for "-", "—", "∞"
+    cost_num = Column(Integer, index=True)
+    power_num = Column(Integer, index=True)
     race = Column(String(128), index=True)
     note = Column(Text)
     text_full = Column(Text)
     image_url = Column(String(512))
     detail_url = Column(String(512), unique=False, index=True)
+    # sha1 of the imported values; upsert imports skip rows whose hash is unchanged
+    content_hash = Column(String(40))
 
     __table_args__ = (
         Index("ix_card_compound", "card_number", "rarity", "cn_name", "jp_name"),
+        Index("ix_card_color_cost", "color", "cost_num"),
+        Index("ix_card_color_power", "color", "power_num"),
+        Index("ix_card_type_cost", "type", "cost_num"),
+        Index("ix_card_type_power", "type", "power_num"),
     )
 
 
+class Meta(Base):
+    """Small key/value table, e.g. the dataset version bumped on import."""
+
+    __tablename__ = "meta"
+
+    key = Column(String(64), primary_key=True)
+    value = Column(String(256))
+
+
+class SearchSync(Base):
+    """Content hash of each card document as last accepted by Meilisearch."""
+
+    __tablename__ = "search_sync"
+
+    card_id = Column(Integer, primary_key=True, autoincrement=False)
+    doc_hash = Column(String(40))
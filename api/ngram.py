@@ -0,0 +1,139 @@
+"""In-memory character n-gram index for keyword search.
+
+Posting lists hold sorted card ids (``array('I')``) for every 1/2/3-gram of
+the searchable fields. A substring query intersects the postings of its own
+grams and verifies the survivors, so it returns exactly what
+``LIKE '%kw%'`` returns on SQLite (ASCII case-insensitive, no wildcards).
+
+It is only built on SQLite. MySQL's ``utf8mb4_unicode_ci`` LIKE also equates
+full-width and half-width letters and kana variants (ハ/パ/は), which
+``fold`` does not, so there keywords stay on the FULLTEXT / LIKE path.
+"""
+import string
+from array import array
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy.orm import Session
+
+from . import dataset
+from .config import settings
+from .models import Card
+
+MAX_N = 3
+BASE_FIELDS = ("cn_name", "jp_name", "card_number")
+# joins the fields of one card for verification; never part of a keyword
+FIELD_SEP = "\x1f"
+
+# SQLite's LIKE only folds ASCII letters
+_ASCII_FOLD = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+
+def fold(text: str) -> str:
+    return (text or "").translate(_ASCII_FOLD)
+
+
+def keyword_fields() -> Tuple[str, ...]:
+    if settings.ngram_index_text_full:
+        return BASE_FIELDS + ("text_full",)
+    return BASE_FIELDS
+
+
+def _grams(text: str, n: int) -> Iterable[str]:
+    return (text[i:i + n] for i in range(len(text) - n + 1))
+
+
+def _query_grams(kw: str) -> List[str]:
+    n = min(len(kw), MAX_N)
+    return list(dict.fromkeys(_grams(kw, n)))
+
+
+def _intersect(small: Sequence[int], large: Sequence[int]) -> List[int]:
+    out = []
+    hi = len(large)
+    lo = 0
+    for x in small:
+        lo = bisect_left(large, x, lo, hi)
+        if lo == hi:
+            break
+        if large[lo] == x:
+            out.append(x)
+    return out
+
+
+class NgramIndex:
+    def __init__(self, fields: Sequence[str] = BASE_FIELDS):
+        self.fields = tuple(fields)
+        self.postings: Dict[str, array] = {}
+        self.texts: Dict[int, str] = {}
+
+    def build(self, rows: Iterable[Sequence]) -> "NgramIndex":
+        """Index ``(id, *field_values)`` rows given in ascending id order."""
+        lists: Dict[str, List[int]] = {}
+        texts: Dict[int, str] = {}
+        for row in rows:
+            card_id = row[0]
+            values = [fold(v) for v in row[1:]]
+            grams = set()
+            for v in values:
+                for n in range(1, MAX_N + 1):
+                    grams.update(_grams(v, n))
+            for g in grams:
+                lists.setdefault(g, []).append(card_id)
+            texts[card_id] = FIELD_SEP.join(values)
+        self.postings = {g: array("I", ids) for g, ids in lists.items()}
+        self.texts = texts
+        return self
+
+    @classmethod
+    def from_db(cls, db: Session, fields: Sequence[str] = BASE_FIELDS) -> "NgramIndex":
+        cols = [getattr(Card, f) for f in fields]
+        rows = db.query(Card.id, *cols).order_by(Card.id).yield_per(2000)
+        return cls(fields).build(rows)
+
+    def search(self, keyword: str) -> List[int]:
+        """Return the sorted ids of cards whose fields contain ``keyword``."""
+        kw = fold(keyword)
+        if not kw:
+            return sorted(self.texts)
+        grams = _query_grams(kw)
+        postings = []
+        for g in grams:
+            p = self.postings.get(g)
+            if p is None:
+                return []
+            postings.append(p)
+        postings.sort(key=len)
+        ids: Sequence[int] = postings[0]
+        for p in postings[1:]:
+            ids = _intersect(ids, p)
+            if not ids:
+                return []
+        if len(kw) <= MAX_N:
+            # the single gram is the keyword itself
+            return list(ids)
+        texts = self.texts
+        return [i for i in ids if kw in texts[i]]
+
+
+def _build(db: Session) -> Optional[NgramIndex]:
+    if not settings.ngram_index_enabled or db.bind.dialect.name != "sqlite":
+        return None
+    return NgramIndex.from_db(db, keyword_fields())
+
+
+dataset.register("ngram", _build)
+
+
+def lookup(keyword: str, max_ids: Optional[int] = None) -> Optional[List[int]]:
+    """Ids matching ``keyword``, or None when the SQL LIKE path must answer."""
+    idx = dataset.get("ngram")
+    if idx is None:
+        return None
+    if "%" in keyword or "_" in keyword:
+        # LIKE wildcards; keep the SQL semantics
+        return None
+    ids = idx.search(keyword)
+    if max_ids is not None and len(ids) > max_ids:
+        return None
+    return ids
@@ -0,0 +1,85 @@
+"""Parallel CSV parsing for the importers.
+
+Three stages:
+
+1. ``split`` scans the file once and cuts it into byte ranges of about
+   ``chunk_bytes`` that end on row boundaries. A newline ends a row only
+   outside quotes, i.e. after an even number of ``"`` (an escaped ``""``
+   counts twice); that holds for files written by the csv module, where a
+   field containing a quote is always quoted.
+2. Worker processes read and parse their ranges and run the importer's
+   ``parse(header, rows)`` over them (normalization, mappings).
+3. The caller, the single writer, receives the parsed chunks in file order.
+   At most ``workers * prefetch`` chunks are in flight, so memory does not
+   grow with the file size.
+"""
+import csv
+import io
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Iterator, List, Tuple
+
+BLOCK = 1 << 20
+
+
+def split(path: str, chunk_bytes: int) -> Tuple[List[str], List[Tuple[int, int]]]:
+    """The header row and ``(start, end)`` byte ranges covering the rest of the file."""
+    with open(path, "rb") as f:
+        header = next(csv.reader([f.readline().decode("utf-8-sig")]), [])
+        size = os.fstat(f.fileno()).st_size
+        chunk_start = base = f.tell()
+        target = chunk_start + chunk_bytes
+        ranges = []
+        parity = 0  # quotes seen since the last row boundary, mod 2
+        block = f.read(BLOCK)
+        while block:
+            i = 0  # block[:i] is already counted into parity
+            while True:
+                j = block.find(b"\n", max(target - base, i))
+                if j < 0:
+                    break
+                parity = (parity + block.count(b'"', i, j)) & 1
+                i = j + 1
+                if parity == 0:
+                    ranges.append((chunk_start, base + i))
+                    chunk_start = base + i
+                    target = chunk_start + chunk_bytes
+            parity = (parity + block.count(b'"', i)) & 1
+            base += len(block)
+            block = f.read(BLOCK)
+    if chunk_start < size:
+        ranges.append((chunk_start, size))
+    return header, ranges
+
+
+def read_range(path: str, start: int, end: int) -> List[List[str]]:
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    return list(csv.reader(io.StringIO(data.decode("utf-8"), newline="")))
+
+
+def _work(parse: Callable, path: str, start: int, end: int, header: List[str]) -> Any:
+    return parse(header, read_range(path, start, end))
+
+
+def parallel_chunks(
+    path: str, parse: Callable[[List[str], List[List[str]]], Any], workers: int,
+    chunk_bytes: int = 4 << 20, prefetch: int = 2,
+) -> Iterator[Any]:
+    """``parse(header, rows)`` of each byte range, computed by ``workers``
+    processes and yielded in file order. ``parse`` must be picklable (a
+    module-level function or a ``functools.partial`` of one)."""
+    header, ranges = split(path, chunk_bytes)
+    pool = ProcessPoolExecutor(workers)
+    pending = deque()
+    try:
+        for start, end in ranges:
+            pending.append(pool.submit(_work, parse, path, start, end, header))
+            if len(pending) >= workers * prefetch:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        pool.shutdown(cancel_futures=True)
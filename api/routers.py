@@ -1,47 +1,419 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+import json
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import Session, load_only
 from typing import List
+from . import dataset, filters, fts, metrics, ngram, search, similar, suggest
+from .classify import CARD_NUMBER, CARD_PREFIX, SUBSTRING, classify, key_ranges, sql_clause
+from .cache import card_cache, etag_matches, make_etag, search_cache
+from .config import settings
+from .cursor import CursorError, canonical_query, decode_cursor, encode_cursor
 from .db import get_db
 from .models import Card
-from .schemas import CardOut, SearchBody, SearchResp
+from .schemas import (
+    SUMMARY_FIELDS, BatchBody, BatchResp, CardOut, FacetsResp, SearchBody, SearchResp, SimilarResp,
+    SuggestResp,
+)
 
 router = APIRouter()
 
+# sort name -> column; every page is ordered by (column, id)
+SORTS = {
+    "id": Card.id,
+    "card_number": Card.card_number,
+    "rarity": Card.rarity,
+}
+
+
+# keyword relevance from a full-text backend; id order when none can answer
+RELEVANCE = "relevance"
+
+
+def _parse_sort(sort):
+    name = sort or "id"
+    if name == RELEVANCE:
+        return name, None, False
+    desc = name.startswith("-")
+    col = SORTS.get(name.lstrip("-"))
+    if col is None:
+        raise HTTPException(status_code=400, detail=f"Unsupported sort: {sort}")
+    return name, col, desc
+
+
+def _projection(body: SearchBody, col):
+    """(output fields, ORM load options) for ``body``; all fields when None."""
+    if body.fields:
+        fields = list(body.fields)
+    elif body.view == "summary":
+        fields = list(SUMMARY_FIELDS)
+    elif body.view in (None, "full"):
+        return None, []
+    else:
+        raise HTTPException(status_code=400, detail=f"Unsupported view: {body.view}")
+    unknown = [f for f in fields if f not in CardOut.model_fields]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    if "id" not in fields:
+        fields.insert(0, "id")
+    # the sort column is needed for the cursor even when it is not returned
+    cols = {getattr(Card, f) for f in fields} | ({col} if col is not None else set())
+    return fields, [load_only(*cols)]
+
+
+def _apply_range(q, col, bounds):
+    if not bounds:
+        return q
+    lo, hi = bounds.get("min"), bounds.get("max")
+    if lo is not None:
+        q = q.filter(col >= lo)
+    if hi is not None:
+        q = q.filter(col <= hi)
+    return q
+
+
+def _apply_keyset(q, col, desc, position):
+    key, last_id = position["k"], position["i"]
+    if col is Card.id:
+        return q.filter(Card.id < last_id if desc else Card.id > last_id)
+    if desc:
+        return q.filter(or_(col < key, and_(col == key, Card.id < last_id)))
+    return q.filter(or_(col > key, and_(col == key, Card.id > last_id)))
+
+
+def encode_card(obj: Card) -> bytes:
+    return CardOut.model_validate(obj).model_dump_json().encode("utf-8")
+
+
+def warm_card_cache(db: Session) -> int:
+    """Encode every card into card_cache for the current dataset version."""
+    version = dataset.version()
+    n = 0
+    for obj in db.query(Card).order_by(Card.id).yield_per(1000):
+        card_cache.put((version, obj.id), encode_card(obj))
+        n += 1
+    return n
+
+
+def _batch_payload(ids: List[int], db: Session) -> bytes:
+    """Encoded BatchResp for ``ids`` in request order (duplicates kept).
+
+    Cards come from card_cache; the misses are loaded with one IN query.
+    """
+    if len(ids) > settings.batch_max_ids:
+        raise HTTPException(status_code=400, detail=f"At most {settings.batch_max_ids} ids per request")
+    version = dataset.version()
+    encoded = {}
+    if settings.card_cache_enabled:
+        for i in set(ids):
+            payload = card_cache.get((version, i))
+            if payload is not None:
+                encoded[i] = payload
+    todo = [i for i in set(ids) if i not in encoded]
+    if todo:
+        for obj in db.query(Card).filter(Card.id.in_(todo)):
+            encoded[obj.id] = encode_card(obj)
+            if settings.card_cache_enabled:
+                card_cache.put((version, obj.id), encoded[obj.id])
+    items = b",".join(encoded[i] for i in ids if i in encoded)
+    missing = json.dumps(list(dict.fromkeys(i for i in ids if i not in encoded)))
+    return b'{"items":[' + items + b'],"missing":' + missing.encode("ascii") + b"}"
+
+
+@router.post("/cards/batch", response_model=BatchResp)
+def batch_cards(body: BatchBody, db: Session = Depends(get_db)):
+    dataset.refresh(db)
+    return Response(_batch_payload(body.ids, db), media_type="application/json")
+
+
+@router.get("/cards", response_model=BatchResp)
+def list_cards(ids: str = Query(..., description="comma-separated card ids"), db: Session = Depends(get_db)):
+    try:
+        id_list = [int(x) for x in ids.split(",") if x.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be comma-separated integers")
+    dataset.refresh(db)
+    return Response(_batch_payload(id_list, db), media_type="application/json")
+
 
 @router.get("/cards/{card_id}", response_model=CardOut)
-def get_card(card_id: int, db: Session = Depends(get_db)):
-    obj = db.query(Card).get(card_id)
-    if not obj:
+def get_card(card_id: int, request: Request, db: Session = Depends(get_db)):
+    dataset.refresh(db)
+    version = dataset.version()
+    headers = {"ETag": make_etag(version, f"card:{card_id}")}
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    payload = card_cache.get((version, card_id)) if settings.card_cache_enabled else None
+    if payload is None:
+        obj = db.get(Card, card_id)
+        if not obj:
+            raise HTTPException(status_code=404, detail="Not found")
+        payload = encode_card(obj)
+        if settings.card_cache_enabled:
+            card_cache.put((version, card_id), payload)
+    return Response(payload, media_type="application/json", headers=headers)
+
+
+@router.get("/cards/{card_id}/similar", response_model=SimilarResp)
+def similar_cards(
+    card_id: int,
+    limit: int = Query(10, ge=1, le=50),
+    min_similarity: float = Query(0.0, ge=0.0, le=1.0),
+    db: Session = Depends(get_db),
+):
+    """Cards whose effect text is most alike, by MinHash-estimated Jaccard."""
+    dataset.refresh(db)
+    idx = similar.get_index()
+    if idx is None:
+        raise HTTPException(status_code=503, detail="Similar index not available")
+    hits = idx.similar(card_id, limit, min_similarity)
+    if hits is None:
         raise HTTPException(status_code=404, detail="Not found")
-    return obj
+    scores = dict(hits)
+    cols = [getattr(Card, f) for f in SUMMARY_FIELDS]
+    cards = _load_in_order(db, [i for i, _ in hits], [load_only(*cols)])
+    items = [dict({f: getattr(c, f) for f in SUMMARY_FIELDS}, similarity=scores[c.id]) for c in cards]
+    return {"items": items}
+
+
+def _filtered_query(body: SearchBody, db: Session, q=None, skip=None):
+    """Apply the filters of ``body`` to ``q``; None if the keyword matches nothing."""
+    q = db.query(Card) if q is None else q
+    kw = classify(body.keyword) if body.keyword else None
+    if kw is not None and kw.kind != SUBSTRING and skip != "keyword":
+        # card number / prefix: equality or range scan on an index
+        q = q.filter(sql_clause(kw))
+    elif body.keyword and skip != "keyword":
+        ids = ngram.lookup(body.keyword, max_ids=settings.ngram_max_ids)
+        if ids is not None:
+            if not ids:
+                return None
+            q = q.filter(Card.id.in_(ids))
+        elif fts.usable(db, body.keyword):
+            q = q.filter(fts.keyword_clause(body.keyword, ngram.keyword_fields()))
+        else:
+            pat = f"%{body.keyword}%"
+            q = q.filter(or_(*(getattr(Card, f).like(pat) for f in ngram.keyword_fields())))
+    for facet, (col, field) in filters.FACETS.items():
+        wanted = getattr(body, field)
+        if wanted and facet != skip:
+            q = q.filter(getattr(Card, col).in_(wanted))
+    q = _apply_range(q, Card.cost_num, body.cost)
+    q = _apply_range(q, Card.power_num, body.power)
+    return q
+
+
+def _load_in_order(db: Session, ids, options=()):
+    """Cards for ``ids`` in that order; ids no longer in the table are skipped."""
+    if not ids:
+        return []
+    rows = {c.id: c for c in db.query(Card).options(*options).filter(Card.id.in_(ids))}
+    return [rows[i] for i in ids if i in rows]
+
+
+def _search_sql(body: SearchBody, db: Session, col, desc, position, limit, options=()):
+    q = _filtered_query(body, db, q=db.query(Card).options(*options))
+    if q is None:
+        return []
+    if position is not None:
+        q = _apply_keyset(q, col, desc, position)
+    order = [Card.id] if col is Card.id else [col, Card.id]
+    q = q.order_by(*(c.desc() for c in order)) if desc else q.order_by(*order)
+    return q.limit(limit).all()
+
+
+def _search_ranked(body: SearchBody, db: Session, position, limit, options=()):
+    """Relevance-ordered page as (items, rank keys)."""
+    if body.keyword and classify(body.keyword).kind == SUBSTRING and fts.usable(db, body.keyword):
+        q, rank = fts.ranked(db, body.keyword, ngram.keyword_fields())
+        q = _filtered_query(body, db, q=q, skip="keyword")
+        if position is not None and "o" in position:
+            # cursor from a Meilisearch page: its ranking differs, resume by offset
+            q = q.offset(position["o"])
+        elif position is not None:
+            q = _apply_keyset(q, rank, False, position)
+        hits = q.order_by(rank, Card.id).limit(limit).all()
+        if not hits:
+            return [], []
+        rows = {c.id: c for c in db.query(Card).options(*options).filter(Card.id.in_([h.id for h in hits]))}
+        pairs = [(rows[h.id], h.rank) for h in hits if h.id in rows]
+        return [p[0] for p in pairs], [p[1] for p in pairs]
+    # no full-text backend for this keyword: constant rank, i.e. id order
+    items = _search_memory(body, db, Card.id, False, position, limit, options)
+    if items is None:
+        items = _search_sql(body, db, Card.id, False, position, limit, options)
+    return items, [0] * len(items)
+
+
+def _memory_clauses(body: SearchBody):
+    """(engine, clause bitsets) for ``body``; None when the bitmap engine cannot answer."""
+    fidx = filters.get_index()
+    if fidx is None:
+        return None
+    clauses = fidx.clauses(body)
+    kw = classify(body.keyword) if body.keyword else None
+    if kw is not None and kw.kind in (CARD_NUMBER, CARD_PREFIX):
+        bits = 0
+        for lo, hi in key_ranges(kw):
+            bits |= fidx.key_range_bits("card_number", lo, hi)
+        clauses["keyword"] = bits
+    elif kw is not None and kw.kind != SUBSTRING:
+        # name prefixes are left to the indexed SQL path
+        return None
+    elif body.keyword:
+        ids = ngram.lookup(body.keyword)
+        if ids is None:
+            return None
+        clauses["keyword"] = fidx.ids_to_bits(ids)
+    return fidx, clauses
+
+
+def _search_memory(body: SearchBody, db: Session, col, desc, position, limit, options=()):
+    resolved = _memory_clauses(body)
+    if resolved is None:
+        return None
+    fidx, clauses = resolved
+    after = (position["k"], position["i"]) if position is not None else None
+    page_ids = fidx.page(fidx.resolve(clauses), col.key, desc, after, limit)
+    return _load_in_order(db, page_ids, options)
+
+
+def _search_backend(body: SearchBody, db: Session, col, desc, position, size, options=()):
+    """(items, offset of the next page or None) from the external search
+    backend, or None to search locally.
+
+    Only substring keyword searches go out; filter-only and card-number
+    searches are faster in-process, and LIKE wildcards (``%``, ``_``) are
+    only understood locally.
+    A page can be resumed there only from a cursor it issued (one with ``o``).
+    """
+    backend = search.backend()
+    if backend is None or not body.keyword or classify(body.keyword).kind != SUBSTRING:
+        return None
+    if "%" in body.keyword or "_" in body.keyword:
+        return None
+    if position is not None and "o" not in position:
+        return None
+    offset = position["o"] if position is not None else 0
+    while True:
+        # one hit more than a page tells whether another page follows
+        ids = backend.page(
+            body, col.key if col is not None else None, desc, offset, size + 1, list(ngram.keyword_fields())
+        )
+        if ids is None:
+            return None
+        # offsets count backend hits, including any not (yet) in the table
+        more = len(ids) > size
+        items = _load_in_order(db, ids[:size], options)
+        if items or not more:
+            return items, offset + size if more else None
+        # every hit of this page is gone from the table: a cursor needs a row
+        offset += size
+
+
+def _facets_memory(body: SearchBody):
+    resolved = _memory_clauses(body)
+    if resolved is None:
+        return None
+    fidx, clauses = resolved
+    counts = fidx.facet_counts(clauses)
+    counts["total"] = fidx.resolve(clauses).bit_count()
+    return counts
+
+
+def _facets_sql(body: SearchBody, db: Session):
+    counts = {}
+    base = _filtered_query(body, db, q=db.query(func.count(Card.id)))
+    counts["total"] = base.scalar() if base is not None else 0
+    for facet, (col, _) in filters.FACETS.items():
+        column = getattr(Card, col)
+        q = _filtered_query(body, db, q=db.query(column, func.count(Card.id)), skip=facet)
+        rows = q.group_by(column).all() if q is not None else []
+        counts[facet] = {v: n for v, n in rows if v}
+    return counts
+
+
+@router.get("/suggest", response_model=SuggestResp)
+def suggest_cards(q: str = Query("", description="prefix typed so far"), limit: int = Query(10, ge=1)):
+    """Top names/card numbers starting with ``q``; served from memory only."""
+    idx = suggest.get_index()
+    if idx is None:
+        raise HTTPException(status_code=503, detail="Suggest index not available")
+    limit = min(limit, settings.suggest_max_results)
+    return Response(idx.payload(q, limit), media_type="application/json")
+
+
+@router.post("/cards/facets", response_model=FacetsResp)
+def card_facets(body: SearchBody, db: Session = Depends(get_db)):
+    """Counts per color/rarity/type/series value; each facet ignores its own filter."""
+    dataset.refresh(db)
+    counts = _facets_memory(body)
+    if counts is None:
+        counts = _facets_sql(body, db)
+    return counts
 
 
 @router.post("/cards/search", response_model=SearchResp)
-def search_cards(body: SearchBody, db: Session = Depends(get_db)):
+def search_cards(body: SearchBody, request: Request, db: Session = Depends(get_db)):
     try:
-        # MVP: simple SQL fallback; Meilisearch will be added in next step
-        q = db.query(Card)
-        
-        # Apply filters
-        if body.keyword:
-            kw = f"%{body.keyword}%"
-            q = q.filter(
-                (Card.cn_name.like(kw)) | (Card.jp_name.like(kw)) | (Card.card_number.like(kw))
-            )
-        if body.colors:
-            q = q.filter(Card.color.in_(body.colors))
-        if body.rarities:
-            q = q.filter(Card.rarity.in_(body.rarities))
-        if body.types:
-            q = q.filter(Card.type.in_(body.types))
-        if body.series:
-            q = q.filter(Card.series.in_(body.series))
+        dataset.refresh(db)
+        version = dataset.version()
+        key = canonical_query(body)
+        headers = {"ETag": make_etag(version, key)}
+        if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+        if settings.search_cache_enabled:
+            cached = search_cache.get((version, key))
+            if cached is not None:
+                return Response(cached, media_type="application/json", headers=headers)
+
+        sort, col, desc = _parse_sort(body.sort)
+        fields, options = _projection(body, col)
+        position = None
+        if body.cursor:
+            try:
+                position = decode_cursor(body, sort, body.cursor)
+            except CursorError as e:
+                raise HTTPException(status_code=400, detail=f"Invalid cursor: {e}")
 
+        # Meilisearch when enabled and healthy, else in-memory indexes, else SQL
         page_size = min(max(body.page_size or 50, 1), 200)
-        items = q.limit(page_size).all()
-        return {"items": items, "next_cursor": None}
+        offset = None
+        remote = _search_backend(body, db, col, desc, position, page_size, options)
+        if remote is not None:
+            # hits deleted from the table since indexing leave a short page,
+            # so whether more follow comes from the backend's hit count
+            items, offset = remote
+            more = offset is not None
+            keys = [getattr(c, col.key) if col is not None else None for c in items]
+        else:
+            if col is None:
+                items, keys = _search_ranked(body, db, position, page_size + 1, options)
+            else:
+                items = _search_memory(body, db, col, desc, position, page_size + 1, options)
+                if items is None:
+                    items = _search_sql(body, db, col, desc, position, page_size + 1, options)
+                keys = [getattr(c, col.key) for c in items]
+            more = len(items) > page_size
+            items, keys = items[:page_size], keys[:page_size]
+        next_cursor = None
+        if more and items:
+            next_cursor = encode_cursor(body, sort, keys[-1], items[-1].id, offset)
+        if fields is None:
+            resp = SearchResp.model_validate({"items": items, "next_cursor": next_cursor}, from_attributes=True)
+            payload = resp.model_dump_json().encode("utf-8")
+        else:
+            # only the projected attributes are read, so deferred columns stay unloaded
+            rows = [{f: getattr(c, f) for f in fields} for c in items]
+            resp = SearchResp.model_validate({"items": rows, "next_cursor": next_cursor})
+            payload = resp.model_dump_json(exclude_unset=True).encode("utf-8")
+        if settings.search_cache_enabled:
+            search_cache.put((version, key), payload)
+        return Response(payload, media_type="application/json", headers=headers)
+    except HTTPException:
+        raise
     except Exception as e:
         import traceback
+        metrics.search_errors.inc()
         print(f"Error in search_cards: {str(e)}")
         print(traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
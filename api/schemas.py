@@ -23,6 +23,10 @@ class CardOut(BaseModel):
         from_attributes = True
 
 
+# list-view columns returned by SearchBody.view == "summary"
+SUMMARY_FIELDS = ["id", "card_number", "cn_name", "jp_name", "rarity", "color", "image_url"]
+
+
 class SearchBody(BaseModel):
     keyword: Optional[str] = None
     colors: Optional[List[str]] = None
@@ -37,6 +41,9 @@ class SearchBody(BaseModel):
     sort: Optional[str] = None
     cursor: Optional[str] = None
     page_size: Optional[int] = 50
+    # projection: explicit CardOut field names, or view="summary"; default is every field
+    fields: Optional[List[str]] = None
+    view: Optional[str] = None
 
 
 class SearchResp(BaseModel):
@@ -44,6 +51,49 @@ class SearchResp(BaseModel):
     next_cursor: Optional[str] = None
 
 
+class BatchBody(BaseModel):
+    ids: List[int]
+
+
+class BatchResp(BaseModel):
+    items: List[CardOut]
+    missing: List[int] = []
+
+
+class FacetsResp(BaseModel):
+    total: int
+    color: Dict[str, int]
+    rarity: Dict[str, int]
+    type: Dict[str, int]
+    series: Dict[str, int]
+
+
+class SuggestItem(BaseModel):
+    text: str
+    field: str  # cn_name | jp_name | card_number
+    card_id: int  # first card carrying the text
+    count: int  # cards carrying the text
+
+
+class SuggestResp(BaseModel):
+    items: List[SuggestItem]
+
+
+class SimilarItem(BaseModel):
+    id: int
+    similarity: float  # estimated Jaccard similarity of text_full
+    card_number: Optional[str] = None
+    cn_name: Optional[str] = None
+    jp_name: Optional[str] = None
+    rarity: Optional[str] = None
+    color: Optional[str] = None
+    image_url: Optional[str] = None
+
+
+class SimilarResp(BaseModel):
+    items: List[SimilarItem]
+
+
 class ConstantsResp(BaseModel):
     color: List[str]
     rarity: List[List[str]]
@@ -1,15 +1,27 @@
-from typing import List, Dict, Any
+import json
+import time
+from typing import List, Dict, Any, Optional
+from . import metrics
+from .breaker import CircuitBreaker
 from .config import settings
+from .filters import FACETS, RANGES
+from .schemas import SearchBody
 
-try:
-    from meilisearch import Client
-except Exception:  # pragma: no cover
-    Client = None  # type: ignore
+
+def _client_class():
+    """meilisearch.Client, imported on first use: the package (and requests)
+    takes ~0.1 s to import, which a disabled backend should not pay at startup."""
+    try:
+        from meilisearch import Client
+    except Exception:  # pragma: no cover
+        return None
+    return Client
 
 
 def meili_client():
     if getattr(settings, "meili_disabled", False):
         return None
+    Client = _client_class()
     if Client is None:
         return None
     return Client(settings.meili_host, settings.meili_api_key)
@@ -21,18 +33,19 @@ def ensure_index():
         return
     idx = cl.index(settings.meili_index)
     try:
-        idx.get_raw_info()
+        cl.get_raw_index(settings.meili_index)
     except Exception:
         cl.create_index(settings.meili_index, {"primaryKey": "id"})
         idx = cl.index(settings.meili_index)
     idx.update_settings({
         "filterableAttributes": [
-            "color", "rarity", "type", "series", "card_number"
+            "id", "color", "rarity", "type", "series", "card_number", "cost_num", "power_num"
         ],
-        "sortableAttributes": ["card_number"],
+        "sortableAttributes": ["id", "card_number", "rarity"],
         "searchableAttributes": [
             "cn_name", "jp_name", "card_number", "text_full", "note"
         ],
+        "pagination": {"maxTotalHits": settings.meili_max_total_hits},
     })
 
 
@@ -44,3 +57,91 @@ def index_cards(cards: List[Dict[str, Any]]):
     idx.add_documents(cards)
 
 
+# Query side. Searches go through one client whose HTTP timeout is the
+# latency budget; errors and slow answers trip the breaker, and while it is
+# open search_cards answers from the in-memory indexes / SQL instead.
+breaker = CircuitBreaker(settings.meili_breaker_failures, settings.meili_breaker_reset)
+metrics.gauge(
+    "zxcard_meili_breaker_state", "Meilisearch circuit breaker: 0 closed, 1 half-open, 2 open.",
+    lambda: {(): {"closed": 0, "half-open": 1, "open": 2}[breaker.state]},
+)
+_search_client = None
+
+
+def _quote(value) -> str:
+    return json.dumps(value, ensure_ascii=False)
+
+
+def build_filter(body: SearchBody) -> List[str]:
+    """Meili filter expressions (ANDed) for the facet and range filters of ``body``."""
+    parts = []
+    for col, field in FACETS.values():
+        wanted = getattr(body, field)
+        if wanted:
+            parts.append(f"{col} IN [{', '.join(_quote(v) for v in wanted)}]")
+    for col, field in RANGES.items():
+        bounds = getattr(body, field) or {}
+        if bounds.get("min") is not None:
+            parts.append(f"{col} >= {int(bounds['min'])}")
+        if bounds.get("max") is not None:
+            parts.append(f"{col} <= {int(bounds['max'])}")
+    return parts
+
+
+class MeiliBackend:
+    """Answers keyword searches from Meilisearch as pages of card ids."""
+
+    name = "meili"
+
+    def __init__(self, client):
+        self.client = client
+
+    def page(
+        self,
+        body: SearchBody,
+        sort: Optional[str],
+        desc: bool,
+        offset: int,
+        limit: int,
+        fields: List[str],
+    ) -> Optional[List[int]]:
+        """Ids of hits ``offset``..``offset + limit`` in ``sort`` order (Meili
+        relevance when None); None when Meili cannot answer right now."""
+        if offset + limit > settings.meili_max_total_hits or not breaker.allow():
+            return None
+        params: Dict[str, Any] = {
+            "offset": offset,
+            "limit": limit,
+            "attributesToRetrieve": ["id"],
+            "attributesToSearchOn": fields,
+            "filter": build_filter(body),
+        }
+        if sort is not None:
+            direction = "desc" if desc else "asc"
+            params["sort"] = [f"{sort}:{direction}"] + ([] if sort == "id" else [f"id:{direction}"])
+        t0 = time.perf_counter()
+        try:
+            res = self.client.index(settings.meili_index).search(body.keyword or "", params)
+        except Exception as e:
+            breaker.failure()
+            print(f"Meilisearch search failed ({breaker.state}): {e}")
+            return None
+        if time.perf_counter() - t0 > settings.meili_timeout:
+            # the answer is still good, but repeated slowness should fail over
+            breaker.failure()
+        else:
+            breaker.success()
+        return [hit["id"] for hit in res["hits"]]
+
+
+def backend() -> Optional[MeiliBackend]:
+    """The external search backend, or None when search runs in-process/SQL only."""
+    global _search_client
+    if getattr(settings, "meili_disabled", False):
+        return None
+    if _search_client is None:
+        Client = _client_class()
+        if Client is None:
+            return None
+        _search_client = Client(settings.meili_host, settings.meili_api_key, timeout=settings.meili_timeout)
+    return MeiliBackend(_search_client)
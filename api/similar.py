@@ -0,0 +1,168 @@
+"""Similar-effect index over ``text_full`` (see api/minhash.py).
+
+Signatures are computed at import time (``cli import``) and persisted next to
+the database as ``<db>.minhash``; the API loads that file at startup, re-signs
+only cards whose text changed since it was written, and rebuilds the LSH
+bands in memory.
+"""
+import json
+import os
+import tempfile
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from . import dataset
+from .config import settings
+from .minhash import LSHIndex, MinHasher, shingles, text_crc
+from .models import Card
+
+MAGIC = b"ZXMINHASH1\n"
+
+
+def index_path() -> str:
+    if settings.similar_index_path:
+        return settings.similar_index_path
+    if settings.use_sqlite:
+        return settings.sqlite_path + ".minhash"
+    return "./zxcard.minhash"
+
+
+class SimilarIndex:
+    def __init__(self):
+        self.params = {
+            "num_perm": settings.similar_num_perm,
+            "bands": settings.similar_bands,
+            "shingle": settings.similar_shingle,
+        }
+        self.crcs: Dict[int, int] = {}  # every card id -> crc32 of its text_full
+        self.sigs: Dict[int, array] = {}  # cards with enough text to sign
+        self.lsh = LSHIndex(self.params["num_perm"], self.params["bands"])
+
+    def __len__(self) -> int:
+        return len(self.sigs)
+
+    def update(self, db: Session) -> int:
+        """Sync with the cards table; returns the number of cards (re)signed or removed."""
+        hasher = MinHasher(self.params["num_perm"])
+        k = self.params["shingle"]
+        crcs, sigs, signed = {}, {}, 0
+        for card_id, text in db.query(Card.id, Card.text_full).order_by(Card.id).yield_per(2000):
+            crc = text_crc(text)
+            crcs[card_id] = crc
+            if self.crcs.get(card_id) == crc:
+                if card_id in self.sigs:
+                    sigs[card_id] = self.sigs[card_id]
+                continue
+            sig = hasher.signature(shingles(text, k))
+            signed += 1
+            if sig is not None:
+                sigs[card_id] = sig
+        removed = len(self.crcs.keys() - crcs.keys())
+        self.crcs, self.sigs = crcs, sigs
+        self._index()
+        return signed + removed
+
+    def _index(self) -> None:
+        self.lsh = LSHIndex(self.params["num_perm"], self.params["bands"])
+        for card_id, sig in self.sigs.items():
+            self.lsh.add(card_id, sig)
+
+    def similar(self, card_id: int, limit: int, threshold: float = 0.0) -> Optional[List[Tuple[int, float]]]:
+        """Top (id, estimated Jaccard) for ``card_id``; None for an unknown id."""
+        if card_id not in self.crcs:
+            return None
+        sig = self.sigs.get(card_id)
+        if sig is None:
+            return []
+        return self.lsh.query(sig, limit, threshold, exclude=card_id)
+
+    def sign_texts(self, texts: Iterable[str]) -> LSHIndex:
+        """LSH index of ``texts`` keyed by position, with this index's
+        parameters; a text already signed here (same crc32) reuses its
+        signature. ``zx2.py --mode dedupe`` runs on a CSV through this."""
+        by_crc = {self.crcs[card_id]: sig for card_id, sig in self.sigs.items()}
+        hasher = MinHasher(self.params["num_perm"])
+        lsh = LSHIndex(self.params["num_perm"], self.params["bands"])
+        for n, text in enumerate(texts):
+            sig = by_crc.get(text_crc(text))
+            if sig is None:
+                sig = hasher.signature(shingles(text, self.params["shingle"]))
+            if sig is not None:
+                lsh.add(n, sig)
+        return lsh
+
+    def save(self, path: str) -> None:
+        ids = array("I", self.crcs)
+        crcs = array("I", self.crcs.values())
+        signed = array("I", self.sigs)
+        flat = array("I")
+        for sig in self.sigs.values():
+            flat.extend(sig)
+        header = dict(self.params, cards=len(ids), signed=len(signed))
+        # unique name: several workers may rebuild at the same time
+        with tempfile.NamedTemporaryFile(
+            "wb", dir=os.path.dirname(path) or ".", prefix=os.path.basename(path) + ".", suffix=".tmp", delete=False
+        ) as f:
+            try:
+                f.write(MAGIC)
+                f.write(json.dumps(header).encode("ascii") + b"\n")
+                for arr in (ids, crcs, signed, flat):
+                    arr.tofile(f)
+            except BaseException:
+                f.close()
+                os.unlink(f.name)
+                raise
+        os.replace(f.name, path)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["SimilarIndex"]:
+        """The saved index, or None if missing or built with other parameters."""
+        if not os.path.exists(path):
+            return None
+        idx = cls()
+        with open(path, "rb") as f:
+            if f.readline() != MAGIC:
+                return None
+            header = json.loads(f.readline())
+            if any(header.get(k) != v for k, v in idx.params.items()):
+                return None
+            arrays = []
+            for n in (header["cards"], header["cards"], header["signed"], header["signed"] * idx.params["num_perm"]):
+                arr = array("I")
+                arr.fromfile(f, n)
+                arrays.append(arr)
+        ids, crcs, signed, flat = arrays
+        m = idx.params["num_perm"]
+        idx.crcs = dict(zip(ids, crcs))
+        idx.sigs = {card_id: flat[i * m:(i + 1) * m] for i, card_id in enumerate(signed)}
+        idx._index()
+        return idx
+
+
+def update_index(db: Session) -> Tuple[SimilarIndex, int]:
+    """Load the persisted index, bring it up to date and save it if it changed."""
+    path = index_path()
+    idx = SimilarIndex.load(path) or SimilarIndex()
+    changed = idx.update(db)
+    if changed or not os.path.exists(path):
+        try:
+            idx.save(path)
+        except OSError as e:
+            # read-only image or full disk: keep serving from memory
+            print(f"Similar index not saved to {path}: {e}")
+    return idx, changed
+
+
+def _build(db: Session) -> Optional[SimilarIndex]:
+    if not settings.similar_index_enabled:
+        return None
+    return update_index(db)[0]
+
+
+dataset.register("similar", _build)
+
+
+def get_index() -> Optional[SimilarIndex]:
+    return dataset.get("similar")
@@ -0,0 +1,110 @@
+"""In-memory prefix index for type-ahead suggestions.
+
+Every distinct cn_name, jp_name and card_number becomes an entry; names are
+also reachable from each word after a space ("莱拉" finds "命运的猎犬 莱拉普斯").
+Keys are ASCII-folded and kept in one sorted list, so a prefix is a
+``bisect`` range. Entries are ranked once at build time: values shared by more
+cards (reprints) first, then by card number. Top-k for one- and two-character
+prefixes, whose ranges are large, is precomputed; longer prefixes rank their
+(short) range on the fly. Each entry is stored pre-encoded as JSON.
+"""
+import heapq
+import json
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from sqlalchemy.orm import Session
+
+from . import dataset
+from .config import settings
+from .models import Card
+from .ngram import fold
+
+FIELDS = ("cn_name", "jp_name", "card_number")
+_PRECOMPUTED = 2
+
+
+class SuggestIndex:
+    def __init__(self, k: int = 20):
+        self.k = k
+        self.keys: List[str] = []
+        self.ranks: List[int] = []  # entry rank per key, smaller is better
+        self.encoded: List[bytes] = []  # per entry
+        self.top: Dict[str, List[int]] = {}
+
+    def build(self, rows: Iterable[Sequence]) -> "SuggestIndex":
+        """Index ``(id, cn_name, jp_name, card_number)`` rows."""
+        seen: Dict[Tuple[str, str], List] = {}  # (field, text) -> [count, min card_number, first id]
+        for row in rows:
+            card_id, number = row[0], row[3] or ""
+            for field, text in zip(FIELDS, row[1:]):
+                text = (text or "").strip()
+                if not text:
+                    continue
+                entry = seen.get((field, text))
+                if entry is None:
+                    seen[(field, text)] = [1, number, card_id]
+                else:
+                    entry[0] += 1
+                    if (number, card_id) < (entry[1], entry[2]):
+                        entry[1], entry[2] = number, card_id
+        ordered = sorted(seen.items(), key=lambda kv: (-kv[1][0], kv[1][1], kv[1][2]))
+        self.encoded = [
+            json.dumps(
+                {"text": text, "field": field, "card_id": first_id, "count": count},
+                ensure_ascii=False, separators=(",", ":"),
+            ).encode("utf-8")
+            for (field, text), (count, _, first_id) in ordered
+        ]
+        pairs = []
+        for rank, ((field, text), _) in enumerate(ordered):
+            folded = fold(text)
+            keys = {folded}
+            if field != "card_number":
+                keys.update(folded[i + 1:] for i, ch in enumerate(folded) if ch == " ")
+            pairs.extend((key, rank) for key in keys if key)
+        pairs.sort()
+        self.keys = [key for key, _ in pairs]
+        self.ranks = [rank for _, rank in pairs]
+        top: Dict[str, List[int]] = {}
+        for key, rank in pairs:
+            for n in range(1, min(len(key), _PRECOMPUTED) + 1):
+                top.setdefault(key[:n], []).append(rank)
+        self.top = {p: sorted(set(ranks))[: self.k] for p, ranks in top.items()}
+        return self
+
+    @classmethod
+    def from_db(cls, db: Session) -> "SuggestIndex":
+        rows = db.query(Card.id, Card.cn_name, Card.jp_name, Card.card_number).yield_per(2000)
+        return cls(settings.suggest_max_results).build(rows)
+
+    def __len__(self) -> int:
+        return len(self.encoded)
+
+    def search(self, prefix: str, limit: int) -> List[int]:
+        """Entry ranks for ``prefix``, best first, at most ``limit`` (<= k)."""
+        p = fold(prefix.strip())
+        if not p:
+            return []
+        if len(p) <= _PRECOMPUTED:
+            return self.top.get(p, [])[:limit]
+        lo = bisect_left(self.keys, p)
+        hi = bisect_left(self.keys, p[:-1] + chr(ord(p[-1]) + 1), lo)
+        return heapq.nsmallest(limit, set(self.ranks[lo:hi]))
+
+    def payload(self, prefix: str, limit: int) -> bytes:
+        items = b",".join(self.encoded[r] for r in self.search(prefix, limit))
+        return b'{"items":[' + items + b"]}"
+
+
+def _build(db: Session):
+    if not settings.suggest_index_enabled:
+        return None
+    return SuggestIndex.from_db(db)
+
+
+dataset.register("suggest", _build)
+
+
+def get_index():
+    return dataset.get("suggest")
@@ -1,60 +1,124 @@
+import hashlib
+import json
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import delete, insert
 from sqlalchemy.orm import Session
 from .config import settings
 from .db import SessionLocal
-from .models import Card
-from .search import ensure_index, index_cards
+from .models import Card, SearchSync
+from .search import ensure_index, meili_client
+
+celery_app = None
+if not getattr(settings, "redis_disabled", False):
+    # only pay for importing celery when a broker is configured
+    try:
+        from celery import Celery
+    except Exception:  # pragma: no cover
+        Celery = None  # type: ignore
+    if Celery is not None:
+        celery_app = Celery("zxcard", broker=settings.redis_url, backend=settings.redis_url)
+
+
+DOC_FIELDS = (
+    "id", "color", "card_number", "series", "rarity", "type", "jp_name", "cn_name",
+    "cost", "power", "cost_num", "power_num", "race", "note", "text_full",
+    "image_url", "detail_url",
+)
+
+
+def card_doc(card: Card) -> Dict[str, Any]:
+    return {f: getattr(card, f) for f in DOC_FIELDS}
+
+
+def doc_hash(doc: Dict[str, Any]) -> str:
+    raw = json.dumps(doc, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+# (task uid, [(card id, new hash or None when deleted)])
+Pending = List[Tuple[int, List[Tuple[int, Optional[str]]]]]
+
+
+def _record(db: Session, marks: List[Tuple[int, Optional[str]]]) -> None:
+    ids = [card_id for card_id, _ in marks]
+    db.execute(delete(SearchSync).where(SearchSync.card_id.in_(ids)))
+    rows = [{"card_id": card_id, "doc_hash": h} for card_id, h in marks if h is not None]
+    if rows:
+        db.execute(insert(SearchSync), rows)
+    db.commit()
 
-try:
-    from celery import Celery
-except Exception:  # pragma: no cover
-    Celery = None  # type: ignore
 
+def _settle(cl, db: Session, pending: Pending, stats: Dict[str, Any]) -> None:
+    """Wait for every Meilisearch task; remember only what it accepted."""
+    timeout_ms = int(settings.meili_task_timeout * 1000)
+    for uid, marks in pending:
+        task = cl.wait_for_task(uid, timeout_in_ms=timeout_ms)
+        if task.status != "succeeded":
+            print(f"Meilisearch task {uid} {task.status}: {task.error}")
+            stats["failed"] += len(marks)
+            continue
+        if marks:
+            _record(db, marks)
+            stats["pushed"] += sum(1 for _, h in marks if h is not None)
+            stats["deleted"] += sum(1 for _, h in marks if h is None)
 
-if getattr(settings, "redis_disabled", False) or Celery is None:
-    celery_app = None
-else:
-    celery_app = Celery("zxcard", broker=settings.redis_url, backend=settings.redis_url)
 
+def reindex_all(full: bool = False, batch: int = 1000) -> Optional[Dict[str, Any]]:
+    """Push added/changed cards to Meilisearch and delete removed ones.
 
-def reindex_all():
+    ``search_sync`` holds the hash of every document Meilisearch has accepted,
+    so unchanged cards are skipped. ``full`` empties the index and the sync
+    state first and re-sends everything. Returns counts, or None when
+    Meilisearch is disabled.
+    """
+    cl = meili_client()
+    if cl is None:
+        return None
     ensure_index()
+    idx = cl.index(settings.meili_index)
+    stats: Dict[str, Any] = {"scanned": 0, "pushed": 0, "skipped": 0, "deleted": 0, "failed": 0}
+    t0 = time.perf_counter()
     db: Session = SessionLocal()
     try:
-        batch = 1000
-        offset = 0
+        pending: Pending = []
+        if full:
+            db.execute(delete(SearchSync))
+            db.commit()
+            pending.append((idx.delete_all_documents().task_uid, []))
+        synced = dict(db.query(SearchSync.card_id, SearchSync.doc_hash))
+        last_id = 0
         while True:
-            rows = (
-                db.query(Card)
-                .order_by(Card.id)
-                .offset(offset)
-                .limit(batch)
-                .all()
-            )
+            # keyset pages: no OFFSET rescans, and the connection stays free for writes
+            rows = db.query(Card).filter(Card.id > last_id).order_by(Card.id).limit(batch).all()
             if not rows:
                 break
-            docs = [
-                {
-                    "id": r.id,
-                    "color": r.color,
-                    "card_number": r.card_number,
-                    "series": r.series,
-                    "rarity": r.rarity,
-                    "type": r.type,
-                    "jp_name": r.jp_name,
-                    "cn_name": r.cn_name,
-                    "cost": r.cost,
-                    "power": r.power,
-                    "race": r.race,
-                    "note": r.note,
-                    "text_full": r.text_full,
-                    "image_url": r.image_url,
-                    "detail_url": r.detail_url,
-                }
-                for r in rows
-            ]
-            index_cards(docs)
-            offset += batch
+            last_id = rows[-1].id
+            docs, marks = [], []
+            for r in rows:
+                doc = card_doc(r)
+                h = doc_hash(doc)
+                if synced.pop(r.id, None) == h:
+                    stats["skipped"] += 1
+                    continue
+                docs.append(doc)
+                marks.append((r.id, h))
+            stats["scanned"] += len(rows)
+            if docs:
+                pending.append((idx.add_documents(docs).task_uid, marks))
+            db.expunge_all()
+        # whatever was synced but not seen again has left the cards table
+        removed = sorted(synced)
+        for i in range(0, len(removed), batch):
+            chunk = removed[i:i + batch]
+            task = idx.delete_documents(filter=f"id IN [{', '.join(map(str, chunk))}]")
+            pending.append((task.task_uid, [(card_id, None) for card_id in chunk]))
+        _settle(cl, db, pending, stats)
     finally:
         db.close()
+    stats["seconds"] = time.perf_counter() - t0
+    return stats
 
 
+if celery_app is not None:
+    reindex_task = celery_app.task(name="zxcard.reindex_all")(reindex_all)
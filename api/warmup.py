@@ -0,0 +1,153 @@
+"""Startup warm-up and readiness.
+
+The container is scaled to zero, so the first requests after a cold start
+used to open the pool's connections, compile the ORM statements, build the
+response serializers and fill the in-memory indexes themselves. Warm-up does
+that work before traffic is counted as ready:
+
+1. open ``warmup_connections`` pooled connections;
+2. build the dataset snapshots (n-grams, filter bitmaps, suggest, similar)
+   and optionally encode every card into the card cache;
+3. send a handful of representative requests (card number, prefix, keyword,
+   filter, facets, detail, batch, suggest) through the ASGI app itself, so
+   every common statement is compiled into the engine's statement cache.
+
+``/health/live`` answers as soon as the process serves HTTP; ``/health/ready``
+returns 503 until warm-up has finished; a failed warm-up (e.g. database
+unreachable) is retried with backoff and stays not ready meanwhile, only a
+database whose tables do not exist yet counts as ready. With
+``warmup_background`` (default) the server accepts requests meanwhile and
+those fall back to SQL.
+"""
+import asyncio
+import json
+import time
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+from .config import settings
+
+_state: Dict = {"ready": False, "phase": "starting"}
+
+
+def status() -> Dict:
+    return dict(_state)
+
+
+def _open_connections(engine, n: int) -> int:
+    conns = []
+    try:
+        for _ in range(n):
+            conn = engine.connect()
+            conns.append(conn)
+            conn.exec_driver_sql("SELECT 1")
+    finally:
+        for conn in conns:
+            conn.close()
+    return len(conns)
+
+
+def _prepare() -> List[Tuple[str, str, Optional[dict]]]:
+    """Blocking part: connections, snapshots, caches; returns the warm-up requests."""
+    from . import dataset
+    from .db import SessionLocal, engine
+    from .models import Card
+    from .routers import warm_card_cache
+
+    _state["phase"] = "connections"
+    _state["connections"] = _open_connections(engine, settings.warmup_connections)
+    db = SessionLocal()
+    try:
+        _state["phase"] = "indexes"
+        snapshots = dataset.rebuild(db)
+        print(f"In-memory indexes ready: {', '.join(k for k, v in snapshots.items() if v is not None)}")
+        if settings.card_cache_enabled and settings.card_cache_warm:
+            _state["phase"] = "card cache"
+            print(f"Card cache warmed: {warm_card_cache(db)} cards")
+        card = db.query(Card.id, Card.card_number, Card.cn_name, Card.color).order_by(Card.id).first()
+    finally:
+        db.close()
+    if card is None:
+        return [("GET", "/api/constants", None)]
+    name = (card.cn_name or "").replace(" ", "")[:2]
+    search = "/api/cards/search"
+    return [
+        ("GET", "/api/constants", None),
+        ("GET", f"/api/cards/{card.id}", None),
+        ("POST", "/api/cards/batch", {"ids": [card.id]}),
+        ("POST", search, {"keyword": card.card_number, "page_size": 20}),
+        ("POST", search, {"keyword": card.card_number.split("-")[0] + "-", "page_size": 20}),
+        ("POST", search, {"keyword": name, "page_size": 20}),
+        ("POST", search, {"colors": [card.color], "page_size": 20}),
+        ("POST", search, {"colors": [card.color], "sort": "card_number", "view": "summary"}),
+        ("POST", "/api/cards/facets", {"colors": [card.color]}),
+        ("GET", f"/api/suggest?q={quote(name)}", None),
+    ]
+
+
+async def _call(app, method: str, target: str, body: Optional[dict]) -> int:
+    """One request straight into the ASGI app; returns the status code."""
+    path, _, query = target.partition("?")
+    payload = json.dumps(body, ensure_ascii=False).encode("utf-8") if body is not None else b""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "scheme": "http",
+        "method": method, "path": path, "raw_path": path.encode("utf-8"), "root_path": "",
+        "query_string": query.encode("utf-8"),
+        "headers": [(b"host", b"warmup"), (b"content-type", b"application/json"),
+                    (b"content-length", str(len(payload)).encode("ascii"))],
+        "server": ("warmup", 80), "client": ("127.0.0.1", 0), "warmup": True,
+    }
+    messages = [{"type": "http.request", "body": payload, "more_body": False}]
+    status = [0]
+
+    async def receive():
+        return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status[0] = message["status"]
+
+    await app(scope, receive, send)
+    return status[0]
+
+
+def _missing_table(e: Exception) -> bool:
+    """Tables not created yet (fresh database before ``cli initdb``)."""
+    from sqlalchemy.exc import OperationalError, ProgrammingError
+
+    if not isinstance(e, (OperationalError, ProgrammingError)):
+        return False
+    args = getattr(e.orig, "args", ())
+    return "no such table" in str(e.orig) or (bool(args) and args[0] == 1146)
+
+
+async def run(app) -> None:
+    start = time.perf_counter()
+    delay = 1.0
+    while True:
+        try:
+            requests = await asyncio.to_thread(_prepare)
+            if settings.warmup_requests:
+                _state["phase"] = "requests"
+                failed = [t for m, t, b in requests if await _call(app, m, t, b) >= 400]
+                _state["requests"] = len(requests)
+                if failed:
+                    _state["failed"] = failed
+            _state.pop("error", None)
+            break
+        except Exception as e:
+            _state["error"] = str(e)
+            if _missing_table(e):
+                # nothing to warm; search falls back to SQL once tables exist
+                print(f"Warm-up skipped: {e}")
+                break
+            # e.g. database unreachable: stay not ready and try again
+            _state["attempts"] = _state.get("attempts", 0) + 1
+            _state["phase"] = "retrying"
+            print(f"Warm-up failed, retrying in {delay:.0f}s: {e}")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30.0)
+    _state["phase"] = "done"
+    _state["seconds"] = round(time.perf_counter() - start, 3)
+    _state["ready"] = True
+    print(f"Warm-up done in {_state['seconds']:.2f}s")
@@ -0,0 +1,89 @@
+"""Cold start: import time, time to first response and time to ready.
+
+Starts ``uvicorn api.main:app`` in a fresh process and polls it:
+
+- import: ``import api.main`` in a separate interpreter;
+- live: first 200 from /health/live after the process was spawned;
+- first: latency of one keyword search sent as soon as the server is live;
+- ready: /health/ready turns 200 (warm-up finished);
+- after: latency of a fresh keyword search once ready.
+
+    python -m bench.coldstart --db /tmp/zx50k.db
+    WARMUP_REQUESTS=false python -m bench.coldstart --db /tmp/zx50k.db
+"""
+import argparse
+import http.client
+import json
+import os
+import subprocess
+import sys
+import time
+
+
+def request(port, method, path, body=None):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    try:
+        payload = json.dumps(body).encode("utf-8") if body is not None else None
+        conn.request(method, path, payload, {"Content-Type": "application/json"})
+        resp = conn.getresponse()
+        resp.read()
+        return resp.status
+    finally:
+        conn.close()
+
+
+def wait_for(port, path, deadline):
+    while time.perf_counter() < deadline:
+        try:
+            if request(port, "GET", path) == 200:
+                return time.perf_counter()
+        except OSError:
+            pass
+        time.sleep(0.005)
+    raise SystemExit(f"{path} not 200 before timeout")
+
+
+def timed_search(port, keyword):
+    t0 = time.perf_counter()
+    status = request(port, "POST", "/api/cards/search", {"keyword": keyword, "page_size": 20})
+    return (time.perf_counter() - t0) * 1000, status
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--db", help="SQLite database to serve (sets SQLITE_PATH)")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    if args.db:
+        env["SQLITE_PATH"] = args.db
+    out = subprocess.run(
+        [sys.executable, "-c", "import time; t = time.perf_counter(); import api.main; print(time.perf_counter() - t)"],
+        env=env, capture_output=True, text=True, check=True,
+    )
+    print(f"import api.main: {float(out.stdout.strip().splitlines()[-1]) * 1000:.0f} ms")
+
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api.main:app", "--port", str(args.port), "--log-level", "warning"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        deadline = start + args.timeout
+        live = wait_for(args.port, "/health/live", deadline)
+        first_ms, first_status = timed_search(args.port, "猎犬")
+        ready = wait_for(args.port, "/health/ready", deadline)
+        after_ms, after_status = timed_search(args.port, "天使")
+    finally:
+        proc.terminate()
+        proc.wait()
+    print(f"live:  {(live - start) * 1000:.0f} ms after spawn")
+    print(f"first search: {first_ms:.1f} ms (HTTP {first_status})")
+    print(f"ready: {(ready - start) * 1000:.0f} ms after spawn")
+    print(f"search after ready: {after_ms:.1f} ms (HTTP {after_status})")
+
+
+if __name__ == "__main__":
+    main()
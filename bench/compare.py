@@ -0,0 +1,64 @@
+"""Compare two bench.loadtest result files and flag regressions.
+
+A profile regresses when a latency percentile grows, or requests/s drops, by
+more than ``--threshold`` percent. Latency changes smaller than
+``--min-delta-ms`` are treated as noise. Exits 1 if anything regressed, so
+it can gate a CI step.
+
+    python -m bench.compare before.json after.json --threshold 10
+"""
+import argparse
+import json
+import sys
+
+LATENCY = ("p50_ms", "p95_ms", "p99_ms")
+
+
+def compare(base: dict, new: dict, threshold: float, min_delta_ms: float):
+    """Yield (profile, metric, base, new, change %, regressed) per shared profile."""
+    for name, b in base["results"].items():
+        n = new["results"].get(name)
+        if n is None:
+            continue
+        for metric in LATENCY + ("rps",):
+            old, cur = b[metric], n[metric]
+            change = (cur - old) / old * 100 if old else 0.0
+            if metric == "rps":
+                regressed = change < -threshold
+            else:
+                regressed = change > threshold and cur - old >= min_delta_ms
+            yield name, metric, old, cur, change, regressed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("base")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=10.0, help="percent")
+    parser.add_argument("--min-delta-ms", type=float, default=0.5)
+    args = parser.parse_args()
+
+    with open(args.base, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(args.new, encoding="utf-8") as f:
+        new = json.load(f)
+    for label, report in (("base", base), ("new", new)):
+        m = report["meta"]
+        print(f"{label}: {m.get('revision') or '?'} cards={m.get('cards')} concurrency={m.get('concurrency')}")
+    if base["meta"].get("cards") != new["meta"].get("cards"):
+        print("warning: different datasets")
+
+    regressions = 0
+    print(f"{'profile':<12}{'metric':<8}{'base':>10}{'new':>10}{'change':>9}")
+    for name, metric, old, cur, change, regressed in compare(base, new, args.threshold, args.min_delta_ms):
+        mark = "  REGRESSION" if regressed else ""
+        regressions += regressed
+        print(f"{name:<12}{metric:<8}{old:>10.2f}{cur:>10.2f}{change:>+8.1f}%{mark}")
+    if regressions:
+        print(f"{regressions} regression(s) above {args.threshold:g}%")
+        sys.exit(1)
+    print("No regressions")
+
+
+if __name__ == "__main__":
+    main()
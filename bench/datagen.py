@@ -0,0 +1,91 @@
+"""Scale the scraped CSV up to a synthetic dataset of realistic cards.
+
+The source rows are kept as-is, then every source card is cloned once per
+"generation" in shuffled order so color/rarity/type/cost/power/race keep their joint
+distribution. Each clone gets a new set code (B01 -> B101, B201, ...) with
+the original number inside the set, a name whose title and name halves come
+from two different cards, and an effect text that is either the template's
+(a reprint) or spliced from two cards' sentences. Same seed, same file.
+
+    python -m bench.datagen --rows 50000 --out /tmp/zx50k.csv
+    SQLITE_PATH=/tmp/zx50k.db python -m api.cli initdb
+    SQLITE_PATH=/tmp/zx50k.db python -m api.cli import --csv /tmp/zx50k.csv
+"""
+import argparse
+import csv
+import random
+import re
+import time
+
+_SET = re.compile(r"^([A-Z]+)(\d+)-(.+)$")
+
+
+def _card_number(number: str, generation: int) -> str:
+    m = _SET.match(number)
+    if m is None:
+        return f"{number}-{generation}"
+    letters, digits, tail = m.groups()
+    return f"{letters}{int(digits) + 100 * generation:0{len(digits)}d}-{tail}"
+
+
+def _name(template: str, other: str) -> str:
+    # "title name" halves from two cards, e.g. 命运的猎犬 + 阿尔忒弥斯
+    if " " in template and " " in other:
+        return template.split(" ", 1)[0] + " " + other.split(" ", 1)[1]
+    return template
+
+
+def _text(rng: random.Random, template: str, other: str) -> str:
+    if rng.random() < 0.5 or not template or not other:
+        return template
+    a = [s for s in template.split("。") if s]
+    b = [s for s in other.split("。") if s]
+    return "。".join(a[: max(1, len(a) // 2)] + b[len(b) // 2:]) + "。"
+
+
+def generate(rows, n: int, seed: int = 1):
+    """Yield ``n`` rows: the source rows first, then synthetic clones."""
+    rng = random.Random(seed)
+    for row in rows[:n]:
+        yield row
+    order = list(rows)
+    for i in range(len(rows), n):
+        generation, j = divmod(i, len(rows))
+        if j == 0:
+            # every card is cloned once per generation, so numbers stay unique
+            rng.shuffle(order)
+        template, other = order[j], rng.choice(rows)
+        number = _card_number(template["card_number"], generation)
+        out = dict(template)
+        out["card_number"] = number
+        out["cn_name"] = _name(template["cn_name"], other["cn_name"])
+        out["jp_name"] = _name(template["jp_name"], other["jp_name"])
+        out["text_full"] = _text(rng, template["text_full"], other["text_full"])
+        prefix = number.split("-", 1)[0]
+        out["image_url"] = f"http://zximg-cdn.yimieji.com/card/{prefix}/{number}.png"
+        out["detail_url"] = f"https://zxcard.yimieji.com/Cards/{prefix}/{number}/{template['rarity']}"
+        yield out
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--csv", default="zx2_cards_full_deduped.csv", help="source rows")
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--out", required=True)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    with open(args.csv, "r", encoding="utf-8-sig") as f:
+        reader = csv.DictReader(f)
+        header = reader.fieldnames
+        rows = list(reader)
+    with open(args.out, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=header)
+        writer.writeheader()
+        writer.writerows(generate(rows, args.rows, args.seed))
+    print(f"{args.rows} rows ({len(rows)} source) -> {args.out} in {time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
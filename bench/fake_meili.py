@@ -0,0 +1,202 @@
+"""Minimal fake Meilisearch for exercising the search backend, its breaker
+and the incremental reindex.
+
+Serves ``POST /indexes/<uid>/search`` over the cards of a SQLite database
+(or an empty index with ``--empty``): substring match of ``q`` on
+``attributesToSearchOn``, the ``IN`` / ``>=`` / ``<=`` filters api/search.py
+emits, ``sort`` and offset/limit. Document adds/deletes are applied at once
+and reported as tasks that succeed (or end with ``task_status``). Latency and
+errors can be injected at start-up or while running:
+
+    python -m bench.fake_meili --db zxcard.db --port 7701
+    MEILI_DISABLED=false MEILI_HOST=http://127.0.0.1:7701 uvicorn api.main:app
+
+    curl -X POST localhost:7701/_fake -d '{"delay": 1.0}'     # slow
+    curl -X POST localhost:7701/_fake -d '{"status": 503}'    # down
+    curl -X POST localhost:7701/_fake -d '{"delay": 0, "status": 200}'
+    curl -X POST localhost:7701/_fake -d '{"task_status": "failed"}'
+"""
+import argparse
+import json
+import re
+import sqlite3
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FIELDS = (
+    "id", "color", "card_number", "series", "rarity", "type", "jp_name", "cn_name",
+    "cost_num", "power_num", "text_full", "note",
+)
+_IN = re.compile(r"^(\w+) IN \[(.*)\]$")
+_CMP = re.compile(r"^(\w+) (>=|<=) (-?\d+)$")
+
+docs = {}
+tasks = {}
+mode = {"delay": 0.0, "status": 200, "task_status": "succeeded"}
+calls = {"search": 0, "added": 0, "deleted": 0}
+
+
+def load(path):
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    try:
+        return {r["id"]: dict(r) for r in conn.execute(f"SELECT {', '.join(FIELDS)} FROM cards ORDER BY id")}
+    finally:
+        conn.close()
+
+
+def matches(doc, expr):
+    m = _IN.match(expr)
+    if m:
+        return doc.get(m.group(1)) in json.loads(f"[{m.group(2)}]")
+    m = _CMP.match(expr)
+    if m:
+        v = doc.get(m.group(1))
+        if v is None:
+            return False
+        return v >= int(m.group(3)) if m.group(2) == ">=" else v <= int(m.group(3))
+    raise ValueError(f"unsupported filter: {expr}")
+
+
+def search(params):
+    q = (params.get("q") or "").lower()
+    fields = params.get("attributesToSearchOn") or ["cn_name", "jp_name", "card_number"]
+    filters = params.get("filter") or []
+    if isinstance(filters, str):
+        filters = [filters]
+    hits = [
+        d for _, d in sorted(docs.items())
+        if (not q or any(q in (d.get(f) or "").lower() for f in fields))
+        and all(matches(d, f) for f in filters)
+    ]
+    # stable multi-key sort: apply the keys from last to first
+    for rule in reversed(params.get("sort") or []):
+        attr, direction = rule.split(":")
+        hits.sort(key=lambda d: (d.get(attr) is None, d.get(attr) or ""), reverse=direction == "desc")
+    offset, limit = params.get("offset", 0), params.get("limit", 20)
+    page = hits[offset:offset + limit]
+    return {
+        "hits": [{"id": d["id"]} for d in page],
+        "query": params.get("q") or "",
+        "offset": offset,
+        "limit": limit,
+        "estimatedTotalHits": len(hits),
+        "processingTimeMs": 0,
+    }
+
+
+def new_task(index_uid, kind):
+    uid = len(tasks)
+    now = datetime.now(timezone.utc).isoformat()
+    status = mode["task_status"]
+    tasks[uid] = {
+        "uid": uid, "indexUid": index_uid, "status": status, "type": kind, "enqueuedAt": now,
+        "error": None if status == "succeeded" else {"message": "injected task failure"},
+    }
+    return {"taskUid": uid, "indexUid": index_uid, "status": "enqueued", "type": kind, "enqueuedAt": now}
+
+
+def write(index_uid, path, method, data):
+    """Apply a document/index write; None for paths this fake does not know."""
+    if mode["task_status"] != "succeeded":
+        return new_task(index_uid, "documentAdditionOrUpdate")
+    if path == "documents" and method == "POST":
+        for d in data:
+            docs[d["id"]] = d
+        calls["added"] += len(data)
+        return new_task(index_uid, "documentAdditionOrUpdate")
+    if path == "documents/delete" and method == "POST":
+        doomed = [i for i, d in docs.items() if matches(d, data["filter"])]
+        for i in doomed:
+            del docs[i]
+        calls["deleted"] += len(doomed)
+        return new_task(index_uid, "documentDeletion")
+    if path == "documents" and method == "DELETE":
+        calls["deleted"] += len(docs)
+        docs.clear()
+        return new_task(index_uid, "documentDeletion")
+    if path == "settings" and method == "PATCH":
+        return new_task(index_uid, "settingsUpdate")
+    return None
+
+
+class Handler(BaseHTTPRequestHandler):
+    def _send(self, status, data):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/_fake":
+            return self._send(200, {**mode, **calls, "documents": len(docs)})
+        m = re.match(r"^/tasks/(\d+)$", self.path)
+        if m:
+            return self._send(200, tasks[int(m.group(1))])
+        m = re.match(r"^/indexes/([^/?]+)$", self.path)
+        if m:
+            return self._send(200, {"uid": m.group(1), "primaryKey": "id"})
+        self._send(200, {"status": "available"})
+
+    def _write(self, method):
+        length = int(self.headers.get("Content-Length") or 0)
+        data = json.loads(self.rfile.read(length) or b"{}")
+        m = re.match(r"^/indexes/([^/?]+)/([^?]+)", self.path)
+        task = write(m.group(1), m.group(2), method, data) if m else None
+        if task is None:
+            return self._send(404, {"message": "not found", "code": "not_found"})
+        self._send(202, task)
+
+    def do_PATCH(self):
+        self._write("PATCH")
+
+    def do_DELETE(self):
+        self._write("DELETE")
+
+    def do_POST(self):
+        if not self.path.endswith("/search") and self.path != "/_fake":
+            if self.path.startswith("/indexes?") or self.path == "/indexes":
+                self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                return self._send(202, new_task("cards", "indexCreation"))
+            return self._write("POST")
+        length = int(self.headers.get("Content-Length") or 0)
+        params = json.loads(self.rfile.read(length) or b"{}")
+        if self.path == "/_fake":
+            mode.update(params)
+            return self._send(200, mode)
+        if not re.match(r"^/indexes/[^/]+/search$", self.path):
+            return self._send(404, {"message": "not found", "code": "not_found"})
+        calls["search"] += 1
+        if mode["delay"]:
+            time.sleep(mode["delay"])
+        if mode["status"] != 200:
+            return self._send(mode["status"], {"message": "injected failure", "code": "internal"})
+        try:
+            self._send(200, search(params))
+        except ValueError as e:
+            self._send(400, {"message": str(e), "code": "invalid_search_filter"})
+
+    def log_message(self, fmt, *args):
+        pass
+
+
+def main():
+    global docs
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--db", default="zxcard.db")
+    parser.add_argument("--port", type=int, default=7701)
+    parser.add_argument("--delay", type=float, default=0.0)
+    parser.add_argument("--status", type=int, default=200)
+    parser.add_argument("--empty", action="store_true", help="start with no documents")
+    args = parser.parse_args()
+    docs = {} if args.empty else load(args.db)
+    mode.update(delay=args.delay, status=args.status)
+    print(f"fake Meilisearch on :{args.port} with {len(docs)} cards")
+    ThreadingHTTPServer(("127.0.0.1", args.port), Handler).serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Benchmark the bitmap filter engine against the SQL filter path.
+
+Runs on the configured database (see api/config.py), e.g.
+
+    python -m api.cli import --csv zx2_cards_full_deduped.csv
+    python -m bench.filter_engine
+"""
+import argparse
+import time
+
+from api import dataset, filters, routers
+from api.db import SessionLocal
+from api.schemas import SearchBody
+
+BODIES = [
+    {"colors": ["红"]},
+    {"colors": ["红", "蓝"], "rarities": ["SR", "UR"]},
+    {"types": ["Z/X"], "power": {"min": 5000, "max": 9000}},
+    {"colors": ["黑"], "cost": {"max": 3}, "sort": "card_number"},
+    {"rarities": ["R"], "types": ["事件"], "sort": "-rarity"},
+    {"keyword": "龙", "colors": ["绿", "白"]},
+]
+
+
+def timed(fn, repeat):
+    fn()
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        out = fn()
+    return (time.perf_counter() - t0) / repeat * 1000, out
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--page-size", type=int, default=50)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        t0 = time.perf_counter()
+        dataset.rebuild(db)
+        print(f"snapshots built in {time.perf_counter() - t0:.2f}s")
+        fidx = filters.get_index()
+        print(f"{'body':<70}{'bitmaps ms':>11}{'memory ms':>11}{'SQL ms':>9}")
+        for raw in BODIES:
+            body = SearchBody(**raw)
+            _, col, desc = routers._parse_sort(body.sort)
+            args_ = (body, db, col, desc, None, args.page_size)
+            # filter bitmaps + paging only; keyword lookup and row loading excluded
+            bits_ms, _ = timed(
+                lambda: fidx.page(fidx.resolve(fidx.clauses(body)), col.key, desc, None, args.page_size),
+                args.repeat,
+            )
+            mem_ms, mem = timed(lambda: routers._search_memory(*args_), args.repeat)
+            sql_ms, sql = timed(lambda: routers._search_sql(*args_), args.repeat)
+            assert [c.id for c in mem] == [c.id for c in sql], raw
+            print(f"{str(raw):<70}{bits_ms:>11.3f}{mem_ms:>11.3f}{sql_ms:>9.3f}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Requests/second against a running API (e.g. under uvicorn).
+
+    uvicorn api.main:app --port 8000 --workers 1
+    python -m bench.http_rps --url http://127.0.0.1:8000 --path /api/cards/{id} --threads 8
+"""
+import argparse
+import http.client
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+def worker(host, port, paths, deadline, counts, lock):
+    conn = http.client.HTTPConnection(host, port, timeout=10)
+    n = 0
+    while time.perf_counter() < deadline:
+        conn.request("GET", random.choice(paths))
+        resp = conn.getresponse()
+        resp.read()
+        if resp.status != 200:
+            raise SystemExit(f"HTTP {resp.status}")
+        n += 1
+    conn.close()
+    with lock:
+        counts.append(n)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--path", default="/api/cards/{id}", help="{id} is replaced by a random card id")
+    parser.add_argument("--max-id", type=int, default=5000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    args = parser.parse_args()
+
+    u = urlsplit(args.url)
+    paths = [args.path.replace("{id}", str(i)) for i in range(1, args.max_id + 1)]
+    counts = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.seconds
+    threads = [
+        threading.Thread(target=worker, args=(u.hostname, u.port or 80, paths, deadline, counts, lock))
+        for _ in range(args.threads)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    total = sum(counts)
+    print(f"{args.path}: {total} requests in {args.seconds:.0f}s = {total / args.seconds:.0f} req/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""In-process load test of api.main:app with the bench.workloads profiles.
+
+Requests go through httpx's ASGI transport, so there is no socket or server
+process in the measurement: each profile runs ``--concurrency`` async clients
+for ``--seconds`` after a warm-up, then reports p50/p95/p99 and requests/s.
+``--out`` writes the numbers as JSON for bench.compare.
+
+    python -m bench.loadtest --db /tmp/zx50k.db --out before.json
+    python -m bench.loadtest --db /tmp/zx50k.db --out after.json
+    python -m bench.compare before.json after.json
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import time
+
+
+def percentile(sorted_values, p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(0, math.ceil(p / 100 * len(sorted_values)) - 1)]
+
+
+def git_revision() -> str:
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True).stdout
+        return rev + ("-dirty" if dirty.strip() else "")
+    except OSError:
+        return ""
+
+
+async def run_profile(client, cls, sample, concurrency: int, seconds: float, warmup: float, seed: int):
+    from bench.workloads import Workload
+
+    latencies, errors = [], 0
+    follow = cls.feed is not Workload.feed
+
+    async def worker(n: int, deadline: float, record: bool):
+        nonlocal errors
+        wl = cls(sample, random.Random(seed * 1000 + n))
+        while time.perf_counter() < deadline:
+            method, path, body = wl.next()
+            t0 = time.perf_counter()
+            resp = await client.request(method, path, json=body)
+            elapsed = time.perf_counter() - t0
+            if record:
+                latencies.append(elapsed)
+                if resp.status_code >= 400:
+                    errors += 1
+            wl.feed(resp.json() if follow and resp.status_code == 200 else None)
+
+    if warmup > 0:
+        deadline = time.perf_counter() + warmup
+        await asyncio.gather(*(worker(n, deadline, False) for n in range(concurrency)))
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(n, start + seconds, True) for n in range(concurrency)))
+    wall = time.perf_counter() - start
+    latencies.sort()
+    ms = [v * 1000 for v in latencies]
+    return {
+        "requests": len(ms),
+        "errors": errors,
+        "rps": round(len(ms) / wall, 1),
+        "mean_ms": round(sum(ms) / len(ms), 3) if ms else 0.0,
+        "p50_ms": round(percentile(ms, 50), 3),
+        "p95_ms": round(percentile(ms, 95), 3),
+        "p99_ms": round(percentile(ms, 99), 3),
+        "max_ms": round(ms[-1], 3) if ms else 0.0,
+    }
+
+
+async def run(args):
+    import httpx
+    from sqlalchemy import func
+
+    from api.db import SessionLocal
+    from api.main import app
+    from api.models import Card
+    from bench.workloads import PROFILES, Sample
+
+    db = SessionLocal()
+    try:
+        cards = db.query(func.count(Card.id)).scalar()
+        sample = Sample(db, seed=args.seed)
+    finally:
+        db.close()
+    results = {}
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for name in args.profile or list(PROFILES):
+                results[name] = await run_profile(
+                    client, PROFILES[name], sample, args.concurrency, args.seconds, args.warmup, args.seed
+                )
+                r = results[name]
+                print(f"{name:<12}{r['requests']:>8}{r['errors']:>6}{r['rps']:>9.0f}"
+                      f"{r['p50_ms']:>9.2f}{r['p95_ms']:>9.2f}{r['p99_ms']:>9.2f}")
+    return {
+        "meta": {
+            "revision": git_revision(),
+            "cards": cards,
+            "db": os.environ.get("SQLITE_PATH", ""),
+            "search_cache": not args.no_cache,
+            "concurrency": args.concurrency,
+            "seconds": args.seconds,
+            "seed": args.seed,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--profile", action="append", help="keyword, card_number, filter, deep_page, by_id (default: all)")
+    parser.add_argument("--db", help="SQLite database to serve (sets SQLITE_PATH)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--warmup", type=float, default=2.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--no-cache", action="store_true", help="disable the search response cache")
+    parser.add_argument("--out", help="write results as JSON")
+    args = parser.parse_args()
+
+    # settings are read when api.config is first imported
+    if args.db:
+        os.environ["SQLITE_PATH"] = args.db
+    if args.no_cache:
+        os.environ["SEARCH_CACHE_ENABLED"] = "false"
+
+    print(f"{'profile':<12}{'reqs':>8}{'errs':>6}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    report = asyncio.run(run(args))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
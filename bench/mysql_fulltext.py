@@ -0,0 +1,94 @@
+"""Benchmark MySQL FULLTEXT ngram MATCH against LIKE '%kw%' on a scaled card table.
+
+Builds a scratch table ``cards_ftbench`` in the configured MySQL database
+(MYSQL_HOST, MYSQL_USER, ... as for the API) and reports p50/p99 latency:
+
+    python -m bench.mysql_fulltext --rows 500000
+    python -m bench.mysql_fulltext --reuse        # skip reloading the table
+"""
+import argparse
+import time
+
+import pymysql
+
+from api.config import settings
+from bench.ngram_search import load_rows
+
+TABLE = "cards_ftbench"
+QUERIES = ["命运的", "ドラゴン", "天使", "猎犬", "不存在的卡", "龙"]
+
+LIKE_SQL = f"SELECT id FROM {TABLE} WHERE cn_name LIKE %s OR jp_name LIKE %s ORDER BY id"
+MATCH_SQL = (
+    f"SELECT id FROM {TABLE} WHERE MATCH(cn_name, jp_name) AGAINST (%s IN BOOLEAN MODE) ORDER BY id"
+)
+RANKED_SQL = (
+    f"SELECT id, -MATCH(cn_name, jp_name) AGAINST (%s IN BOOLEAN MODE) AS rank_ FROM {TABLE} "
+    f"WHERE MATCH(cn_name, jp_name) AGAINST (%s IN BOOLEAN MODE) ORDER BY rank_, id LIMIT 20"
+)
+
+
+def load(conn, rows, batch=5000):
+    with conn.cursor() as cur:
+        cur.execute(f"DROP TABLE IF EXISTS {TABLE}")
+        cur.execute(
+            f"CREATE TABLE {TABLE} (id INT PRIMARY KEY, cn_name VARCHAR(256), jp_name VARCHAR(256), "
+            f"card_number VARCHAR(32), INDEX idx_cn_name (cn_name), INDEX idx_jp_name (jp_name)) "
+            f"ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci"
+        )
+        sql = f"INSERT INTO {TABLE} (id, cn_name, jp_name, card_number) VALUES (%s, %s, %s, %s)"
+        for i in range(0, len(rows), batch):
+            cur.executemany(sql, rows[i:i + batch])
+        conn.commit()
+        t0 = time.perf_counter()
+        cur.execute(f"CREATE FULLTEXT INDEX ft_names ON {TABLE} (cn_name, jp_name) WITH PARSER ngram")
+        print(f"FULLTEXT ngram index built in {time.perf_counter() - t0:.1f}s")
+
+
+def percentiles(conn, sql, params, repeat):
+    times = []
+    with conn.cursor() as cur:
+        cur.execute(sql, params)
+        out = [r[0] for r in cur.fetchall()]
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            cur.execute(sql, params)
+            cur.fetchall()
+            times.append((time.perf_counter() - t0) * 1000)
+    times.sort()
+    return times[len(times) // 2], times[min(len(times) - 1, int(len(times) * 0.99))], out
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--csv", default="zx2_cards_full_deduped.csv")
+    parser.add_argument("--rows", type=int, default=0, help="scale to N synthetic rows")
+    parser.add_argument("--repeat", type=int, default=100)
+    parser.add_argument("--reuse", action="store_true", help="keep an existing cards_ftbench")
+    args = parser.parse_args()
+
+    conn = pymysql.connect(
+        host=settings.mysql_host, port=settings.mysql_port, user=settings.mysql_user,
+        password=settings.mysql_password, database=settings.mysql_db, charset="utf8mb4",
+    )
+    try:
+        if not args.reuse:
+            rows = load_rows(args.csv, args.rows)
+            load(conn, rows)
+            print(f"{len(rows)} rows in {TABLE}")
+
+        print(f"{'query':<12}{'hits':>8}{'LIKE p50':>10}{'p99':>9}{'MATCH p50':>11}{'p99':>9}{'ranked p50':>12}{'p99':>9}")
+        for kw in QUERIES:
+            pat = f"%{kw}%"
+            phrase = f'"{kw}"'
+            like50, like99, expected = percentiles(conn, LIKE_SQL, (pat, pat), max(1, args.repeat // 10))
+            m50, m99, got = percentiles(conn, MATCH_SQL, (phrase,), args.repeat)
+            r50, r99, _ = percentiles(conn, RANKED_SQL, (phrase, phrase), args.repeat)
+            # ngram phrase matching is token-based, so 2+ char keywords should agree with LIKE
+            flag = "" if got == expected else "  (results differ)"
+            print(f"{kw:<12}{len(got):>8}{like50:>10.2f}{like99:>9.2f}{m50:>11.2f}{m99:>9.2f}{r50:>12.2f}{r99:>9.2f}{flag}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Benchmark api.ngram against SQLite LIKE '%kw%' on the card CSV.
+
+    python -m bench.ngram_search --rows 500000
+"""
+import argparse
+import csv
+import sqlite3
+import time
+
+from api.ngram import BASE_FIELDS, NgramIndex
+
+QUERIES = ["B01-001", "E53-", "的", "ドラゴン", "龙", "sr", "命运的猎犬", "不存在的卡"]
+
+
+def load_rows(path, target):
+    with open(path, "r", encoding="utf-8-sig") as f:
+        base = [tuple(r.get(k) or "" for k in BASE_FIELDS) for r in csv.DictReader(f)]
+    target = target or len(base)
+    rows = []
+    i = 0
+    while len(rows) < target:
+        cn, jp, number = base[i % len(base)]
+        gen = i // len(base)
+        if gen:
+            # synthetic copies get their own card numbers and name suffixes
+            number = f"X{gen:03d}{number}"
+            cn, jp = f"{cn}{gen}", f"{jp}{gen}"
+        rows.append((len(rows) + 1, cn, jp, number))
+        i += 1
+    return rows
+
+
+def timed(fn, repeat):
+    fn()
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        out = fn()
+    return (time.perf_counter() - t0) / repeat * 1000, out
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--csv", default="zx2_cards_full_deduped.csv")
+    parser.add_argument("--rows", type=int, default=0, help="scale to N synthetic rows")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    rows = load_rows(args.csv, args.rows)
+    t0 = time.perf_counter()
+    idx = NgramIndex().build(rows)
+    print(f"{len(rows)} rows, {len(idx.postings)} grams, built in {time.perf_counter() - t0:.2f}s")
+
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE cards (id INTEGER PRIMARY KEY, cn_name TEXT, jp_name TEXT, card_number TEXT)")
+    conn.executemany("INSERT INTO cards VALUES (?, ?, ?, ?)", rows)
+
+    sql = "SELECT id FROM cards WHERE cn_name LIKE ? OR jp_name LIKE ? OR card_number LIKE ? ORDER BY id"
+    print(f"{'query':<12}{'hits':>8}{'index ms':>11}{'LIKE ms':>10}")
+    for kw in QUERIES:
+        pat = f"%{kw}%"
+        like_ms, expected = timed(lambda: [r[0] for r in conn.execute(sql, (pat, pat, pat))], max(1, args.repeat // 10))
+        idx_ms, got = timed(lambda: idx.search(kw), args.repeat)
+        assert got == expected, f"mismatch for {kw!r}: {len(got)} != {len(expected)}"
+        print(f"{kw:<12}{len(got):>8}{idx_ms:>11.3f}{like_ms:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
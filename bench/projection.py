@@ -0,0 +1,50 @@
+"""Response size and latency of full vs summary search pages.
+
+Start the API with the response cache off so every request hits the DB:
+
+    SEARCH_CACHE_ENABLED=false uvicorn api.main:app --port 8000
+    python -m bench.projection --url http://127.0.0.1:8000
+"""
+import argparse
+import http.client
+import json
+import statistics
+import time
+from urllib.parse import urlsplit
+
+BODIES = [
+    {"page_size": 200},
+    {"colors": ["红", "蓝"], "page_size": 200},
+    {"keyword": "龙", "page_size": 50},
+]
+
+
+def post(conn, body):
+    payload = json.dumps(body).encode("utf-8")
+    t0 = time.perf_counter()
+    conn.request("POST", "/api/cards/search", payload, {"Content-Type": "application/json"})
+    resp = conn.getresponse()
+    data = resp.read()
+    return (time.perf_counter() - t0) * 1000, len(data)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    u = urlsplit(args.url)
+    conn = http.client.HTTPConnection(u.hostname, u.port or 80, timeout=10)
+    print(f"{'body':<48}{'view':<9}{'bytes':>9}{'p50 ms':>9}")
+    for body in BODIES:
+        for view in ("full", "summary"):
+            b = dict(body, view=view)
+            samples = [post(conn, b) for _ in range(args.repeat)]
+            size = samples[-1][1]
+            p50 = statistics.median(ms for ms, _ in samples)
+            print(f"{json.dumps(body, ensure_ascii=False):<48}{view:<9}{size:>9}{p50:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
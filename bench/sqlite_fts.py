@@ -0,0 +1,55 @@
+"""Benchmark FTS5 trigram MATCH against LIKE '%kw%' on the SQLite database.
+
+    python -m api.cli fts
+    python -m bench.sqlite_fts
+"""
+import argparse
+import time
+
+from sqlalchemy import or_
+
+from api import fts
+from api.db import SessionLocal
+from api.models import Card
+from api.ngram import BASE_FIELDS
+
+QUERIES = ["命运的", "ドラゴン", "B01-00", "天使的", "不存在的卡", "【自】"]
+
+
+def timed(fn, repeat):
+    fn()
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        out = fn()
+    return (time.perf_counter() - t0) / repeat * 1000, out
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if not fts.available(db):
+            raise SystemExit("cards_fts missing: run `python -m api.cli fts` (SQLite only)")
+        print(f"{'query':<14}{'hits':>7}{'MATCH ms':>10}{'LIKE ms':>9}")
+        for kw in QUERIES:
+            def match():
+                return sorted(r[0] for r in db.query(Card.id).filter(fts.keyword_clause(kw, BASE_FIELDS)))
+
+            def like():
+                pat = f"%{kw}%"
+                q = db.query(Card.id).filter(or_(*(getattr(Card, f).like(pat) for f in BASE_FIELDS)))
+                return sorted(r[0] for r in q)
+
+            match_ms, got = timed(match, args.repeat)
+            like_ms, expected = timed(like, args.repeat)
+            flag = "" if got == expected else "  (results differ)"
+            print(f"{kw:<14}{len(got):>7}{match_ms:>10.3f}{like_ms:>9.3f}{flag}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
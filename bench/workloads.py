@@ -0,0 +1,123 @@
+"""Traffic profiles for bench.loadtest.
+
+Each profile is a class whose instances (one per simulated client) produce
+``(method, path, json_body)`` requests; ``feed`` sees the decoded response,
+which lets deep pagination follow ``next_cursor``. Values are sampled from
+the database the app serves, so the same profile works on the scraped
+dataset and on a bench.datagen one.
+"""
+import random
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func
+
+from api.models import Card
+
+Request = Tuple[str, str, Optional[dict]]
+
+
+class Sample:
+    """Keyword, card number and filter values drawn from the cards table."""
+
+    def __init__(self, db, size: int = 2000, seed: int = 1):
+        rng = random.Random(seed)
+        lo, hi = db.query(func.min(Card.id), func.max(Card.id)).one()
+        self.min_id, self.max_id = lo or 1, hi or 1
+        ids = rng.sample(range(self.min_id, self.max_id + 1), min(size, self.max_id - self.min_id + 1))
+        rows = db.query(Card.cn_name, Card.jp_name, Card.card_number).filter(Card.id.in_(ids)).all()
+        self.names = [r[0] or r[1] for r in rows if r[0] or r[1]]
+        self.card_numbers = [r[2] for r in rows if r[2]]
+        self.facets: Dict[str, List[str]] = {}
+        for key, col in (("colors", Card.color), ("rarities", Card.rarity), ("types", Card.type)):
+            self.facets[key] = [v for (v,) in db.query(col).distinct() if v]
+
+
+class Workload:
+    def __init__(self, sample: Sample, rng: random.Random):
+        self.sample = sample
+        self.rng = rng
+
+    def next(self) -> Request:
+        raise NotImplementedError
+
+    def feed(self, data) -> None:
+        pass
+
+
+class Keyword(Workload):
+    """Substring keywords: 2-4 characters cut from a real card name."""
+
+    def next(self) -> Request:
+        name = self.rng.choice(self.sample.names).replace(" ", "")
+        n = min(len(name), self.rng.randint(2, 4))
+        start = self.rng.randint(0, len(name) - n)
+        return "POST", "/api/cards/search", {"keyword": name[start:start + n], "page_size": 20}
+
+
+class CardNumber(Workload):
+    """Exact card numbers, and set prefixes (``B01-``) a quarter of the time."""
+
+    def next(self) -> Request:
+        number = self.rng.choice(self.sample.card_numbers)
+        if self.rng.random() < 0.25 and "-" in number:
+            number = number.split("-", 1)[0] + "-"
+        return "POST", "/api/cards/search", {"keyword": number, "page_size": 20}
+
+
+class FilterOnly(Workload):
+    """One or two facet filters, sometimes a cost range, no keyword."""
+
+    def next(self) -> Request:
+        body = {"page_size": 20, "view": "summary"}
+        for key in self.rng.sample(sorted(self.sample.facets), self.rng.randint(1, 2)):
+            values = self.sample.facets[key]
+            body[key] = self.rng.sample(values, min(len(values), self.rng.randint(1, 2)))
+        if self.rng.random() < 0.3:
+            lo = self.rng.randint(0, 6)
+            body["cost"] = {"min": lo, "max": lo + 2}
+        return "POST", "/api/cards/search", body
+
+
+class DeepPagination(Workload):
+    """Walks one filtered listing page by page via next_cursor, up to ``depth`` pages."""
+
+    depth = 50
+
+    def __init__(self, sample: Sample, rng: random.Random):
+        super().__init__(sample, rng)
+        self.body: Optional[dict] = None
+        self.pages = 0
+
+    def next(self) -> Request:
+        if self.body is None:
+            color = self.rng.choice(self.sample.facets["colors"])
+            self.body = {"colors": [color], "sort": self.rng.choice(["id", "card_number"]), "page_size": 50}
+            self.pages = 0
+        return "POST", "/api/cards/search", dict(self.body)
+
+    def feed(self, data) -> None:
+        self.pages += 1
+        cursor = (data or {}).get("next_cursor")
+        if cursor and self.pages < self.depth:
+            self.body["cursor"] = cursor
+        else:
+            self.body = None
+
+
+class ById(Workload):
+    """Detail pages, plus a batch of 20 ids (deck view) one time in five."""
+
+    def next(self) -> Request:
+        s = self.sample
+        if self.rng.random() < 0.2:
+            return "POST", "/api/cards/batch", {"ids": [self.rng.randint(s.min_id, s.max_id) for _ in range(20)]}
+        return "GET", f"/api/cards/{self.rng.randint(s.min_id, s.max_id)}", None
+
+
+PROFILES = {
+    "keyword": Keyword,
+    "card_number": CardNumber,
+    "filter": FilterOnly,
+    "deep_page": DeepPagination,
+    "by_id": ById,
+}
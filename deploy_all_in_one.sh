@@ -276,6 +276,7 @@ MYSQL_DB=${MYSQL_DATABASE}
 USE_SQLITE=false
 MEILI_DISABLED=true
 REDIS_DISABLED=true
+CURSOR_SECRET=$(openssl rand -hex 32)
 WECHAT_APPID=${WECHAT_APPID}
 WECHAT_SECRET=${WECHAT_SECRET}
 EOF
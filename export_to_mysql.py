@@ -2,12 +2,25 @@
 """
 将 SQLite 数据库导出到 MySQL
 用于腾讯云部署前的数据迁移
+
+线上 cards 表在迁移期间照常提供服务：
+1. 从 SQLite 按 id 顺序 fetchmany 流式读取，按 id 窗口分块；
+2. 多个连接并行把各窗口用多行 INSERT 写入影子表 cards_new（先不建二级索引），
+   每个窗口与其进度记录（cards_new_progress）在同一事务中提交，中断后重跑会跳过已完成的窗口；
+3. 数据写完后一次性建立索引和 FULLTEXT 索引；
+4. 比对 SQLite 与影子表的行数和校验和，一致后用一条 RENAME TABLE 原子切换，旧表保存为 cards_old 后删除。
 """
+import argparse
+import queue
+import re
 import sqlite3
-import pymysql
-from pymysql.cursors import DictCursor
 import sys
-from typing import Optional
+import threading
+import time
+import zlib
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import pymysql
 
 # 配置
 SQLITE_PATH = "zxcard.db"
@@ -22,123 +35,290 @@ MYSQL_CONFIG = {
     "charset": "utf8mb4",
 }
 
+TABLE = "cards"
+SHADOW = "cards_new"
+OLD = "cards_old"
+PROGRESS = "cards_new_progress"
+
+# 复制的列（保留 id，收藏、搜索同步等按 id 引用的数据在迁移后仍然有效）
+COLUMNS = (
+    "id", "color", "card_number", "series", "rarity", "type", "jp_name", "cn_name",
+    "cost", "power", "cost_num", "power_num", "race", "note", "text_full",
+    "image_url", "detail_url", "content_hash",
+)
+
+COLUMNS_DDL = """
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    color VARCHAR(16),
+    card_number VARCHAR(32),
+    series VARCHAR(16),
+    rarity VARCHAR(32),
+    type VARCHAR(32),
+    jp_name VARCHAR(256),
+    cn_name VARCHAR(256),
+    cost VARCHAR(16),
+    power VARCHAR(16),
+    cost_num INT NULL,
+    power_num INT NULL,
+    race VARCHAR(128),
+    note TEXT,
+    text_full TEXT,
+    image_url VARCHAR(512),
+    detail_url VARCHAR(512),
+    content_hash VARCHAR(40),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+"""
+
+INDEXES = {
+    "idx_card_number": "INDEX idx_card_number (card_number)",
+    "idx_cn_name": "INDEX idx_cn_name (cn_name)",
+    "idx_jp_name": "INDEX idx_jp_name (jp_name)",
+    "idx_series": "INDEX idx_series (series)",
+    "idx_rarity": "INDEX idx_rarity (rarity)",
+    "idx_type": "INDEX idx_type (type)",
+    "idx_color": "INDEX idx_color (color)",
+    "idx_cost_num": "INDEX idx_cost_num (cost_num)",
+    "idx_power_num": "INDEX idx_power_num (power_num)",
+    "idx_detail_url": "INDEX idx_detail_url (detail_url)",
+    "idx_color_cost": "INDEX idx_color_cost (color, cost_num)",
+    "idx_color_power": "INDEX idx_color_power (color, power_num)",
+    "idx_type_cost": "INDEX idx_type_cost (type, cost_num)",
+    "idx_type_power": "INDEX idx_type_power (type, power_num)",
+}
+# InnoDB 每条 ALTER TABLE 只能新建一个 FULLTEXT 索引
+FULLTEXT = {
+    "ft_cards_names": "FULLTEXT INDEX ft_cards_names (cn_name, jp_name) WITH PARSER ngram",
+    "ft_cards_names_text": "FULLTEXT INDEX ft_cards_names_text (cn_name, jp_name, text_full) WITH PARSER ngram",
+}
+
+_INT_RE = re.compile(r"^-?\d+$")
+
+
+def create_mysql_schema(cursor, table: str = TABLE, indexes: bool = True):
+    """创建 MySQL 数据库表结构；影子表不带二级索引，数据写完后由 add_indexes 补齐"""
+    print(f"创建表 {table}...")
+    body = COLUMNS_DDL
+    if indexes:
+        body += ",\n    " + ",\n    ".join(list(INDEXES.values()) + list(FULLTEXT.values()))
+    cursor.execute(
+        f"CREATE TABLE IF NOT EXISTS {table} ({body}) "
+        "ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci"
+    )
+
+
+def add_indexes(cursor, table: str):
+    """补齐 table 上缺少的索引（中断后重跑只建剩下的）"""
+    cursor.execute(
+        "SELECT DISTINCT INDEX_NAME FROM information_schema.STATISTICS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+        (table,),
+    )
+    existing = {r[0] for r in cursor.fetchall()}
+    missing = [ddl for name, ddl in INDEXES.items() if name not in existing]
+    if missing:
+        start = time.perf_counter()
+        cursor.execute(f"ALTER TABLE {table} " + ", ".join("ADD " + ddl for ddl in missing))
+        print(f"建立 {len(missing)} 个索引: {time.perf_counter() - start:.1f}s")
+    for name, ddl in FULLTEXT.items():
+        if name not in existing:
+            start = time.perf_counter()
+            cursor.execute(f"ALTER TABLE {table} ADD {ddl}")
+            print(f"建立 FULLTEXT 索引 {name}: {time.perf_counter() - start:.1f}s")
+
+
+def parse_int(value) -> Optional[int]:
+    v = (value or "").strip()
+    return int(v) if _INT_RE.match(v) else None
+
+
+def row_checksum(row: Tuple) -> int:
+    """与 checksum_sql 相同的 CRC32：各列转为字符串（NULL 为空串）后以 | 连接"""
+    return zlib.crc32("|".join("" if v is None else str(v) for v in row).encode("utf-8"))
+
+
+def checksum_sql(table: str) -> str:
+    cols = ", ".join(f"COALESCE({c}, '')" for c in COLUMNS)
+    return f"SELECT COUNT(*), COALESCE(SUM(CRC32(CONCAT_WS('|', {cols}))), 0) FROM {table}"
+
+
+def read_windows(sqlite_path: str, window: int, fetch: int) -> Iterator[Tuple[int, List[Tuple]]]:
+    """按 id 顺序流式读取 SQLite，产出 (窗口号 id // window, 该窗口的行)"""
+    conn = sqlite3.connect(sqlite_path)
+    try:
+        present = {r[1] for r in conn.execute("PRAGMA table_info(cards)")}
+        derive = "cost_num" not in present  # 早期的库没有数值列
+        select = ", ".join(c if c in present else "NULL" for c in COLUMNS)
+        cursor = conn.execute(f"SELECT {select} FROM cards ORDER BY id")
+        i_cost, i_power = COLUMNS.index("cost"), COLUMNS.index("power")
+        current, rows = None, []
+        while True:
+            batch = cursor.fetchmany(fetch)
+            if not batch:
+                break
+            for row in batch:
+                if derive:
+                    row = row[:10] + (parse_int(row[i_cost]), parse_int(row[i_power])) + row[12:]
+                w = row[0] // window
+                if w != current and rows:
+                    yield current, rows
+                    rows = []
+                current = w
+                rows.append(row)
+        if rows:
+            yield current, rows
+    finally:
+        conn.close()
+
 
-def create_mysql_schema(cursor):
-    """创建 MySQL 数据库表结构"""
-    print("创建数据库表结构...")
-    
-    # 创建 cards 表
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS cards (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            color VARCHAR(16),
-            card_number VARCHAR(32),
-            series VARCHAR(16),
-            rarity VARCHAR(32),
-            type VARCHAR(32),
-            jp_name VARCHAR(256),
-            cn_name VARCHAR(256),
-            cost VARCHAR(16),
-            power VARCHAR(16),
-            race VARCHAR(128),
-            note TEXT,
-            text_full TEXT,
-            image_url VARCHAR(512),
-            detail_url VARCHAR(512),
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-            INDEX idx_card_number (card_number),
-            INDEX idx_cn_name (cn_name),
-            INDEX idx_jp_name (jp_name),
-            INDEX idx_series (series),
-            INDEX idx_rarity (rarity),
-            INDEX idx_type (type),
-            INDEX idx_color (color)
-        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
-    """)
-    print("表结构创建完成")
-
-
-def export_data(sqlite_path: str, mysql_config: dict, batch_size: int = 500):
-    """导出 SQLite 数据到 MySQL"""
-    
-    # 连接 SQLite
-    print(f"连接 SQLite 数据库: {sqlite_path}")
-    sqlite_conn = sqlite3.connect(sqlite_path)
-    sqlite_conn.row_factory = sqlite3.Row
-    sqlite_cursor = sqlite_conn.cursor()
-    
-    # 连接 MySQL
+def _load_worker(mysql_config: dict, jobs: "queue.Queue", rows_per_insert: int, errors: list):
+    """从队列取窗口，多行 INSERT 写入影子表；窗口和进度记录同一事务提交"""
+    placeholders = "(" + ", ".join(["%s"] * len(COLUMNS)) + ")"
+    head = f"INSERT INTO {SHADOW} ({', '.join(COLUMNS)}) VALUES "
+    conn = cursor = None
+    try:
+        conn = pymysql.connect(**mysql_config)
+        cursor = conn.cursor()
+    except pymysql.MySQLError as e:
+        errors.append(f"连接失败: {e}")
+    try:
+        while True:
+            job = jobs.get()
+            if job is None:
+                return
+            if errors:
+                continue  # 出错后只消费队列，让读取线程结束
+            w, rows, checksum = job
+            try:
+                for i in range(0, len(rows), rows_per_insert):
+                    part = rows[i:i + rows_per_insert]
+                    cursor.execute(head + ", ".join([placeholders] * len(part)), [v for row in part for v in row])
+                cursor.execute(
+                    f"INSERT INTO {PROGRESS} (window_id, row_count, checksum) VALUES (%s, %s, %s)",
+                    (w, len(rows), checksum),
+                )
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                errors.append(f"窗口 {w}: {e}")
+    finally:
+        if conn is not None:
+            cursor.close()
+            conn.close()
+
+
+def table_exists(cursor, table: str) -> bool:
+    cursor.execute(
+        "SELECT COUNT(*) FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+        (table,),
+    )
+    return cursor.fetchone()[0] > 0
+
+
+def export_data(
+    sqlite_path: str,
+    mysql_config: dict,
+    batch_size: int = 5000,
+    workers: int = 4,
+    rows_per_insert: int = 500,
+    restart: bool = False,
+    keep_old: bool = False,
+):
+    """导出 SQLite 数据到 MySQL 影子表，校验后原子切换为 cards"""
     print(f"连接 MySQL 数据库: {mysql_config['host']}")
+    conn = pymysql.connect(**mysql_config)
+    cursor = conn.cursor()
     try:
-        mysql_conn = pymysql.connect(**mysql_config)
-        mysql_cursor = mysql_conn.cursor()
-        
-        # 创建表结构
-        create_mysql_schema(mysql_cursor)
-        mysql_conn.commit()
-        
-        # 清空现有数据（可选）
-        print("清空现有数据...")
-        mysql_cursor.execute("TRUNCATE TABLE cards")
-        mysql_conn.commit()
-        
-        # 读取所有数据
-        print("读取 SQLite 数据...")
-        sqlite_cursor.execute("SELECT * FROM cards")
-        rows = sqlite_cursor.fetchall()
-        total = len(rows)
-        print(f"共 {total} 条数据")
-        
-        # 批量插入 MySQL
-        print("开始导入 MySQL...")
-        sql = """
-            INSERT INTO cards (
-                color, card_number, series, rarity, type,
-                jp_name, cn_name, cost, power, race,
-                note, text_full, image_url, detail_url
-            ) VALUES (
-                %s, %s, %s, %s, %s,
-                %s, %s, %s, %s, %s,
-                %s, %s, %s, %s
+        if restart:
+            cursor.execute(f"DROP TABLE IF EXISTS {SHADOW}, {PROGRESS}")
+        create_mysql_schema(cursor, SHADOW, indexes=False)
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS {PROGRESS} ("
+            "window_id INT PRIMARY KEY, row_count INT NOT NULL, checksum BIGINT UNSIGNED NOT NULL, "
+            "finished_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP) ENGINE=InnoDB"
+        )
+        conn.commit()
+        cursor.execute(f"SELECT window_id, row_count, checksum FROM {PROGRESS}")
+        done: Dict[int, Tuple[int, int]] = {w: (n, int(c)) for w, n, c in cursor.fetchall()}
+        if done:
+            print(f"从检查点继续：已完成 {len(done)} 个窗口，{sum(n for n, _ in done.values())} 条")
+
+        # 读取线程（当前线程）流式读 SQLite，写入线程并行导入
+        print(f"读取 SQLite 数据库: {sqlite_path}，{workers} 个连接并行写入 {SHADOW}...")
+        jobs: "queue.Queue" = queue.Queue(maxsize=workers * 2)
+        errors: List[str] = []
+        threads = [
+            threading.Thread(target=_load_worker, args=(mysql_config, jobs, rows_per_insert, errors), daemon=True)
+            for _ in range(workers)
+        ]
+        for t in threads:
+            t.start()
+        total = total_checksum = loaded = queued = 0
+        start = time.perf_counter()
+        try:
+            for w, rows in read_windows(sqlite_path, batch_size, batch_size):
+                checksum = sum(row_checksum(row) for row in rows)
+                total += len(rows)
+                total_checksum += checksum
+                if errors:
+                    break
+                if w in done:
+                    if done[w] != (len(rows), checksum):
+                        errors.append(f"窗口 {w} 的源数据在上次中断后有变化，请使用 --restart 重新迁移")
+                        break
+                    continue
+                jobs.put((w, rows, checksum))
+                loaded += len(rows)
+                queued += 1
+                if queued % 10 == 0:
+                    print(f"已读取 {total} 条，本次导入 {loaded} 条 ({loaded / (time.perf_counter() - start):.0f} 条/秒)")
+        finally:
+            for _ in threads:
+                jobs.put(None)
+            for t in threads:
+                t.join()
+        if errors:
+            for e in errors[:10]:
+                print(f"✗ {e}")
+            print("迁移中断，线上 cards 表未改动；修复后重新运行将从检查点继续")
+            sys.exit(1)
+        seconds = time.perf_counter() - start
+        print(f"写入完成：共 {total} 条，本次导入 {loaded} 条，用时 {seconds:.1f}s")
+
+        add_indexes(cursor, SHADOW)
+
+        # 校验行数和校验和，不一致则不切换
+        cursor.execute(checksum_sql(SHADOW))
+        count, checksum = cursor.fetchone()
+        if (count, int(checksum)) != (total, total_checksum):
+            print(f"✗ 校验失败：SQLite {total} 条 / {total_checksum}，{SHADOW} {count} 条 / {checksum}")
+            print("线上 cards 表未改动；请使用 --restart 重新迁移")
+            sys.exit(1)
+        print(f"✓ 校验通过：{count} 条，校验和 {checksum}")
+
+        # 原子切换
+        if table_exists(cursor, TABLE):
+            cursor.execute(f"DROP TABLE IF EXISTS {OLD}")
+            cursor.execute(f"RENAME TABLE {TABLE} TO {OLD}, {SHADOW} TO {TABLE}")
+        else:
+            cursor.execute(f"RENAME TABLE {SHADOW} TO {TABLE}")
+        cursor.execute(f"DROP TABLE {PROGRESS}")
+        if not keep_old:
+            cursor.execute(f"DROP TABLE IF EXISTS {OLD}")
+        # 运行中的 API 进程看到新版本后重建内存索引、丢弃缓存
+        if table_exists(cursor, "meta"):
+            cursor.execute(
+                "INSERT INTO meta (`key`, value) VALUES ('dataset_version', '1') "
+                "ON DUPLICATE KEY UPDATE value = CAST(value AS UNSIGNED) + 1"
             )
-        """
-        
-        inserted = 0
-        for i in range(0, total, batch_size):
-            batch = rows[i:i + batch_size]
-            values = [
-                (
-                    row['color'], row['card_number'], row['series'],
-                    row['rarity'], row['type'], row['jp_name'],
-                    row['cn_name'], row['cost'], row['power'],
-                    row['race'], row['note'], row['text_full'],
-                    row['image_url'], row['detail_url']
-                )
-                for row in batch
-            ]
-            
-            mysql_cursor.executemany(sql, values)
-            mysql_conn.commit()
-            inserted += len(batch)
-            print(f"已导入 {inserted}/{total} 条 ({inserted*100//total}%)")
-        
-        # 验证数据
-        mysql_cursor.execute("SELECT COUNT(*) as count FROM cards")
-        count = mysql_cursor.fetchone()[0]
-        print(f"\n✓ 导入完成！MySQL 中共有 {count} 条记录")
-        
-        if count != total:
-            print(f"⚠️  警告：数据数量不匹配！SQLite: {total}, MySQL: {count}")
-        
-    except Exception as e:
+        conn.commit()
+        print(f"\n✓ 导入完成！已切换 {TABLE}，MySQL 中共有 {count} 条记录" + (f"（旧表保留为 {OLD}）" if keep_old else ""))
+    except pymysql.MySQLError as e:
         print(f"✗ 错误: {e}")
         sys.exit(1)
     finally:
-        mysql_cursor.close()
-        mysql_conn.close()
-        sqlite_cursor.close()
-        sqlite_conn.close()
+        cursor.close()
+        conn.close()
 
 
 def test_connection(mysql_config: dict) -> bool:
@@ -159,38 +339,41 @@ def test_connection(mysql_config: dict) -> bool:
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SQLite 到 MySQL 数据迁移工具（请先在脚本中配置 MYSQL_CONFIG）")
+    parser.add_argument("--test", action="store_true", help="测试 MySQL 连接")
+    parser.add_argument("--sqlite", default=SQLITE_PATH, help="SQLite 数据库路径")
+    parser.add_argument("--batch", type=int, default=5000, help="每个事务（id 窗口）的行数")
+    parser.add_argument("--workers", type=int, default=4, help="并行写入连接数")
+    parser.add_argument("--rows-per-insert", type=int, default=500, help="每条多行 INSERT 的行数")
+    parser.add_argument("--restart", action="store_true", help="丢弃影子表和检查点，从头迁移")
+    parser.add_argument("--keep-old", action="store_true", help=f"切换后保留旧表 {OLD}")
+    parser.add_argument("--yes", action="store_true", help="不再确认")
+    args = parser.parse_args()
+
     print("=" * 60)
     print("SQLite 到 MySQL 数据迁移工具")
     print("=" * 60)
     print()
-    
-    # 检查参数
-    if len(sys.argv) > 1:
-        if sys.argv[1] == "--test":
-            test_connection(MYSQL_CONFIG)
-            sys.exit(0)
-        elif sys.argv[1] == "--help":
-            print("使用方法:")
-            print("  python export_to_mysql.py           # 执行数据迁移")
-            print("  python export_to_mysql.py --test    # 测试 MySQL 连接")
-            print("  python export_to_mysql.py --help    # 显示帮助")
-            print()
-            print("注意: 请先在脚本中配置 MYSQL_CONFIG")
-            sys.exit(0)
-    
+
+    if args.test:
+        test_connection(MYSQL_CONFIG)
+        sys.exit(0)
+
     # 确认执行
-    print("⚠️  警告: 此操作将清空 MySQL 中的现有数据！")
-    print(f"SQLite 源: {SQLITE_PATH}")
+    print(f"数据先写入影子表 {SHADOW}，校验通过后替换 MySQL 中现有的 {TABLE} 表")
+    print(f"SQLite 源: {args.sqlite}")
     print(f"MySQL 目标: {MYSQL_CONFIG['host']}/{MYSQL_CONFIG['database']}")
     print()
-    confirm = input("确认继续？(yes/no): ")
-    
-    if confirm.lower() != "yes":
-        print("已取消")
-        sys.exit(0)
-    
+    if not args.yes:
+        confirm = input("确认继续？(yes/no): ")
+        if confirm.lower() != "yes":
+            print("已取消")
+            sys.exit(0)
+
     # 执行迁移
-    export_data(SQLITE_PATH, MYSQL_CONFIG)
+    export_data(
+        args.sqlite, MYSQL_CONFIG, args.batch, args.workers, args.rows_per_insert, args.restart, args.keep_old
+    )
     print()
     print("=" * 60)
     print("迁移完成！")
@@ -3,14 +3,31 @@
 """
 Z/X Card Database Import Script
 Imports card data from CSV into MySQL database
+
+Lookup tables (rarities, card_types, colors) are read once into dicts, cards
+are inserted with executemany in batches of ``--batch`` rows, one transaction
+per batch. When ``cards`` is empty its secondary indexes are dropped before
+the load and rebuilt once by ``create_indexes`` afterwards, also when the
+load fails; a failed import or index build exits with status 1. ``--dry-run``
+parses and validates the whole CSV without writing anything. With
+``--workers`` > 1 the CSV is parsed by worker processes (api.pipeline) while
+this process validates and writes.
+
+    python import_to_mysql.py zx_cards.csv --batch 1000 --workers 4
+    python import_to_mysql.py zx_cards.csv --dry-run
 """
 
+import argparse
 import csv
+import functools
 import mysql.connector
 from mysql.connector import Error
-import re
 import os
-from typing import Dict, List, Optional, Tuple
+import sys
+import time
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from api.pipeline import parallel_chunks
 
 # Database configuration
 DB_CONFIG = {
@@ -22,11 +39,45 @@ DB_CONFIG = {
     'collation': 'utf8mb4_unicode_ci'
 }
 
+# Insert column order
+CARD_COLUMNS = (
+    'card_id', 'card_number', 'name', 'furi', 'rarity_id', 'type_id',
+    'race', 'cost', 'power', 'life', 'illustrator', 'text', 'image_url', 'color_id',
+)
+
+# Column sizes from zx_database_schema.sql; card_id, card_number and name are NOT NULL
+MAX_LENGTHS = {
+    'card_id': 20, 'card_number': 20, 'name': 200, 'furi': 200, 'race': 100,
+    'cost': 10, 'power': 10, 'life': 10, 'illustrator': 100, 'image_url': 500,
+}
+REQUIRED = ('card_id', 'card_number', 'name')
+
+# Secondary indexes built after the load. idx_rarity/idx_type/idx_color back
+# the foreign keys and cannot be dropped, so they are maintained during the load.
+INDEXES = {
+    'idx_card_number': 'INDEX idx_card_number (card_number)',
+    'idx_name': 'INDEX idx_name (name)',
+    'idx_cost': 'INDEX idx_cost (cost)',
+    'idx_power': 'INDEX idx_power (power)',
+    'idx_cards_rarity_type': 'INDEX idx_cards_rarity_type (rarity_id, type_id)',
+    'idx_cards_cost_power': 'INDEX idx_cards_cost_power (cost, power)',
+}
+FULLTEXT_INDEXES = {
+    'idx_cards_text_search': 'FULLTEXT INDEX idx_cards_text_search (text)',
+}
+
+
 class ZXCardImporter:
-    def __init__(self):
+    def __init__(self, batch_size: int = 1000, dry_run: bool = False, workers: int = 1):
         self.connection = None
         self.cursor = None
-        
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.workers = workers
+        # table -> {code: id}, filled by load_lookups
+        self.lookups: Dict[str, Dict[str, int]] = {}
+        self.unresolved: Dict[str, Set[str]] = {}
+
     def connect(self):
         """Connect to MySQL database"""
         try:
@@ -37,7 +88,7 @@ class ZXCardImporter:
         except Error as e:
             print(f"Error connecting to MySQL: {e}")
             return False
-    
+
     def disconnect(self):
         """Disconnect from MySQL database"""
         if self.cursor:
@@ -45,56 +96,63 @@ class ZXCardImporter:
         if self.connection:
             self.connection.close()
         print("Disconnected from MySQL database")
-    
+
+    def load_lookups(self):
+        """Read the lookup tables into memory once"""
+        for table in ('rarities', 'card_types', 'colors'):
+            self.cursor.execute(f"SELECT code, id FROM {table}")
+            self.lookups[table] = dict(self.cursor.fetchall())
+        print("Loaded lookups: " + ", ".join(f"{t} {len(v)}" for t, v in self.lookups.items()))
+
     def get_lookup_id(self, table: str, code: str) -> Optional[int]:
         """Get ID from lookup table by code"""
-        try:
-            query = f"SELECT id FROM {table} WHERE code = %s"
-            self.cursor.execute(query, (code,))
-            result = self.cursor.fetchone()
-            return result[0] if result else None
-        except Error as e:
-            print(f"Error getting {table} ID for code {code}: {e}")
-            return None
-    
+        found = self.lookups.get(table, {}).get(code)
+        if found is None:
+            self.unresolved.setdefault(table, set()).add(code)
+        return found
+
     def parse_card_data(self, row: Dict[str, str]) -> Dict[str, any]:
         """Parse and clean card data from CSV row"""
+        def clean(key: str) -> Optional[str]:
+            value = (row.get(key) or '').strip()
+            return value or None
+
         # Clean and prepare data
         card_data = {
-            'card_id': row['card_id'].strip(),
-            'card_number': row['card_number'].strip(),
-            'name': row['name'].strip(),
-            'furi': row['furi'].strip() if row['furi'] else None,
-            'race': row['race'].strip() if row['race'] else None,
-            'cost': row['cost'].strip() if row['cost'] else None,
-            'power': row['power'].strip() if row['power'] else None,
-            'life': row['life'].strip() if row['life'] else None,
-            'illustrator': row['illustrator'].strip() if row['illustrator'] else None,
-            'text': row['text'].strip() if row['text'] else None,
-            'image_url': row['image_url'].strip() if row['image_url'] else None,
+            'card_id': (row.get('card_id') or '').strip(),
+            'card_number': (row.get('card_number') or '').strip(),
+            'name': (row.get('name') or '').strip(),
+            'furi': clean('furi'),
+            'race': clean('race'),
+            'cost': clean('cost'),
+            'power': clean('power'),
+            'life': clean('life'),
+            'illustrator': clean('illustrator'),
+            'text': clean('text'),
+            'image_url': clean('image_url'),
         }
-        
+
         # Determine rarity
-        rarity_code = self.determine_rarity(row['rarity'])
+        rarity_code = self.determine_rarity(row.get('rarity'))
         card_data['rarity_id'] = self.get_lookup_id('rarities', rarity_code) if rarity_code else None
-        
+
         # Determine card type
-        type_code = self.determine_card_type(row['type'])
+        type_code = self.determine_card_type(row.get('type'))
         card_data['type_id'] = self.get_lookup_id('card_types', type_code) if type_code else None
-        
+
         # Determine color (this would need to be extracted from card data or text)
         color_code = self.determine_color(row)
         card_data['color_id'] = self.get_lookup_id('colors', color_code) if color_code else None
-        
+
         return card_data
-    
+
     def determine_rarity(self, rarity_text: str) -> Optional[str]:
         """Determine rarity code from rarity text"""
         if not rarity_text:
             return None
-            
+
         rarity_text = rarity_text.strip().upper()
-        
+
         # Map common rarity patterns
         rarity_mapping = {
             'N': 'n',
@@ -114,25 +172,25 @@ class ZXCardImporter:
             '日本一R': 'nipponichiR',
             'R（隐藏）': 'R-secret',
         }
-        
+
         # Check for exact matches first
         for key, value in rarity_mapping.items():
             if key in rarity_text:
                 return value
-        
+
         # Check for single character rarities
         if len(rarity_text) == 1 and rarity_text.isalpha():
             return rarity_text.lower()
-        
+
         return None
-    
+
     def determine_card_type(self, type_text: str) -> Optional[str]:
         """Determine card type code from type text"""
         if not type_text:
             return None
-            
+
         type_text = type_text.strip()
-        
+
         type_mapping = {
             '玩家': 'player',
             '玩家EX': 'player-ex',
@@ -148,15 +206,15 @@ class ZXCardImporter:
             '标记': 'marker',
             '链结': 'link',
         }
-        
+
         return type_mapping.get(type_text)
-    
+
     def determine_color(self, row: Dict[str, str]) -> Optional[str]:
         """Determine color from card data"""
         # This is a simplified approach - in reality, you might need to parse
         # the card text or use other methods to determine color
-        text = (row.get('text', '') + ' ' + row.get('name', '')).lower()
-        
+        text = ((row.get('text') or '') + ' ' + (row.get('name') or '')).lower()
+
         color_keywords = {
             'red': ['红', '赤', 'red'],
             'blue': ['蓝', '青', 'blue'],
@@ -164,157 +222,265 @@ class ZXCardImporter:
             'black': ['黑', 'black'],
             'green': ['绿', 'green'],
         }
-        
+
         for color, keywords in color_keywords.items():
             if any(keyword in text for keyword in keywords):
                 return color
-        
+
         return 'none'  # Default to no color
-    
-    def insert_card(self, card_data: Dict[str, any]) -> Optional[int]:
-        """Insert card into database and return card ID"""
+
+    def validate_card(self, card_data: Dict[str, any], seen: Set[str]) -> List[str]:
+        """Problems that would make the INSERT fail; empty if the card is valid"""
+        problems = [f"missing {key}" for key in REQUIRED if not card_data[key]]
+        for key, limit in MAX_LENGTHS.items():
+            value = card_data[key]
+            if value and len(value) > limit:
+                problems.append(f"{key} longer than {limit}")
+        if card_data['card_id'] in seen:
+            problems.append(f"duplicate card_id {card_data['card_id']}")
+        return problems
+
+    def existing_card_ids(self) -> Set[str]:
+        self.cursor.execute("SELECT card_id FROM cards")
+        return {r[0] for r in self.cursor.fetchall()}
+
+    def insert_cards(self, batch: List[Tuple]) -> int:
+        """Insert a batch in one transaction; returns the number of rows written.
+
+        If the multi-row insert fails the batch is rolled back and retried row
+        by row, so one bad card only costs itself.
+        """
+        query = (
+            f"INSERT INTO cards ({', '.join(CARD_COLUMNS)}) "
+            f"VALUES ({', '.join(['%s'] * len(CARD_COLUMNS))})"
+        )
         try:
-            query = """
-            INSERT INTO cards (
-                card_id, card_number, name, furi, rarity_id, type_id, 
-                race, cost, power, life, illustrator, text, image_url, color_id
-            ) VALUES (
-                %(card_id)s, %(card_number)s, %(name)s, %(furi)s, %(rarity_id)s, %(type_id)s,
-                %(race)s, %(cost)s, %(power)s, %(life)s, %(illustrator)s, %(text)s, %(image_url)s, %(color_id)s
-            )
-            """
-            
-            self.cursor.execute(query, card_data)
+            self.cursor.executemany(query, batch)
             self.connection.commit()
-            
-            # Get the inserted card ID
-            card_id = self.cursor.lastrowid
-            return card_id
-            
+            return len(batch)
         except Error as e:
-            print(f"Error inserting card {card_data['card_id']}: {e}")
+            print(f"Batch insert failed ({e}), retrying {len(batch)} cards one by one")
             self.connection.rollback()
-            return None
-    
-    def import_cards_from_csv(self, csv_file: str):
-        """Import all cards from CSV file"""
-        if not os.path.exists(csv_file):
-            print(f"CSV file {csv_file} not found")
+        inserted = 0
+        for values in batch:
+            try:
+                self.cursor.execute(query, values)
+                inserted += 1
+            except Error as e:
+                print(f"Error inserting card {values[0]}: {e}")
+        self.connection.commit()
+        return inserted
+
+    def parsed_cards(self, csv_file: str) -> Iterator:
+        """card_data dict, or the exception raised parsing it, per CSV row in order"""
+        if self.workers > 1:
+            parse = functools.partial(parse_chunk, self.lookups)
+            for parsed, unresolved in parallel_chunks(csv_file, parse, self.workers):
+                for table, codes in unresolved.items():
+                    self.unresolved.setdefault(table, set()).update(codes)
+                yield from parsed
             return
-        
-        print(f"Starting import from {csv_file}")
-        
-        imported_count = 0
-        error_count = 0
-        
-        with open(csv_file, 'r', encoding='utf-8-sig') as file:
-            reader = csv.DictReader(file)
-            
-            for row_num, row in enumerate(reader, 1):
+        with open(csv_file, 'r', encoding='utf-8-sig', newline='') as file:
+            for row in csv.DictReader(file):
                 try:
-                    # Parse card data
-                    card_data = self.parse_card_data(row)
-                    
-                    # Insert card
-                    card_db_id = self.insert_card(card_data)
-                    
-                    if card_db_id:
-                        imported_count += 1
-                        if imported_count % 100 == 0:
-                            print(f"Imported {imported_count} cards...")
-                    else:
-                        error_count += 1
-                        print(f"Failed to import card {row['card_id']} at row {row_num}")
-                        
+                    yield self.parse_card_data(row)
                 except Exception as e:
-                    error_count += 1
-                    print(f"Error processing row {row_num}: {e}")
-        
-        print(f"Import completed!")
-        print(f"Successfully imported: {imported_count} cards")
-        print(f"Errors: {error_count} cards")
-    
+                    yield e
+
+    def read_batches(self, csv_file: str, stats: Dict[str, int], seen: Set[str]) -> Iterator[List[Tuple]]:
+        """Parsed, validated cards as insert tuples, ``batch_size`` at a time"""
+        batch = []
+        for row_num, card_data in enumerate(self.parsed_cards(csv_file), 1):
+            stats['rows'] += 1
+            if isinstance(card_data, Exception):
+                stats['errors'] += 1
+                print(f"Error processing row {row_num}: {card_data}")
+                continue
+            problems = self.validate_card(card_data, seen)
+            if problems:
+                stats['errors'] += 1
+                print(f"Invalid card at row {row_num}: {'; '.join(problems)}")
+                continue
+            seen.add(card_data['card_id'])
+            batch.append(tuple(card_data[c] for c in CARD_COLUMNS))
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def import_cards_from_csv(self, csv_file: str) -> Dict[str, int]:
+        """Import all cards from CSV file"""
+        stats = {'rows': 0, 'imported': 0, 'errors': 0}
+        if not os.path.exists(csv_file):
+            print(f"CSV file {csv_file} not found")
+            return stats
+
+        print(f"Starting {'dry run' if self.dry_run else 'import'} from {csv_file}")
+        seen = self.existing_card_ids() if self.connection else set()
+        if seen:
+            print(f"{len(seen)} cards already in the database")
+        dropped = not self.dry_run and not seen
+        if dropped:
+            self.drop_indexes()
+
+        start = time.perf_counter()
+        try:
+            for batch in self.read_batches(csv_file, stats, seen):
+                if self.dry_run:
+                    stats['imported'] += len(batch)
+                    continue
+                before = stats['imported']
+                stats['imported'] += self.insert_cards(batch)
+                if stats['imported'] // 10000 != before // 10000:
+                    elapsed = time.perf_counter() - start
+                    print(f"Imported {stats['imported']} cards ({stats['imported'] / elapsed:.0f} cards/s)...")
+        except BaseException:
+            if dropped:
+                # a failed load must not leave cards without its indexes
+                print("Import failed, rebuilding the dropped indexes...")
+                self.connection.rollback()
+                self.create_indexes()
+            raise
+        elapsed = time.perf_counter() - start
+
+        print(f"{'Dry run' if self.dry_run else 'Import'} completed in {elapsed:.1f}s!")
+        label = 'Valid' if self.dry_run else 'Successfully imported'
+        print(f"{label}: {stats['imported']} cards ({stats['imported'] / elapsed if elapsed else 0:.0f} cards/s)")
+        print(f"Errors: {stats['errors']} cards")
+        for table, codes in self.unresolved.items():
+            if self.lookups:
+                print(f"Codes missing from {table} (stored as NULL): {', '.join(sorted(codes))}")
+        return stats
+
+    def _index_names(self) -> Set[str]:
+        self.cursor.execute(
+            "SELECT DISTINCT INDEX_NAME FROM information_schema.STATISTICS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'cards'"
+        )
+        return {r[0] for r in self.cursor.fetchall()}
+
+    def drop_indexes(self):
+        """Drop the secondary indexes create_indexes rebuilds, before loading an empty table"""
+        existing = self._index_names()
+        names = [n for n in list(INDEXES) + list(FULLTEXT_INDEXES) if n in existing]
+        if names:
+            self.cursor.execute("ALTER TABLE cards " + ", ".join(f"DROP INDEX {n}" for n in names))
+            print(f"Dropped {len(names)} indexes for the load")
+
     def create_indexes(self):
-        """Create additional indexes for better performance"""
-        indexes = [
-            "CREATE INDEX idx_cards_name_search ON cards(name)",
-            "CREATE INDEX idx_cards_number_search ON cards(card_number)",
-            "CREATE INDEX idx_cards_rarity_type ON cards(rarity_id, type_id)",
-            "CREATE INDEX idx_cards_cost_power ON cards(cost, power)",
-            "CREATE FULLTEXT INDEX idx_cards_text_search ON cards(text)",
-        ]
-        
-        for index_query in indexes:
-            try:
-                self.cursor.execute(index_query)
-                print(f"Created index: {index_query.split()[2]}")
-            except Error as e:
-                print(f"Error creating index: {e}")
-        
+        """Create the secondary indexes that are missing, in one pass per kind"""
+        existing = self._index_names()
+        missing = [ddl for name, ddl in INDEXES.items() if name not in existing]
+        try:
+            if missing:
+                start = time.perf_counter()
+                self.cursor.execute("ALTER TABLE cards " + ", ".join("ADD " + ddl for ddl in missing))
+                print(f"Created {len(missing)} indexes in {time.perf_counter() - start:.1f}s")
+            # InnoDB adds one FULLTEXT index per ALTER TABLE
+            for name, ddl in FULLTEXT_INDEXES.items():
+                if name not in existing:
+                    start = time.perf_counter()
+                    self.cursor.execute(f"ALTER TABLE cards ADD {ddl}")
+                    print(f"Created index: {name} in {time.perf_counter() - start:.1f}s")
+        except Error as e:
+            print(f"Error creating index: {e}")
+            print("cards is missing indexes; rerun the import to create them")
+            raise
+
         self.connection.commit()
-    
+
     def verify_import(self):
         """Verify the import was successful"""
         try:
             # Count total cards
             self.cursor.execute("SELECT COUNT(*) FROM cards")
             total_cards = self.cursor.fetchone()[0]
-            
+
             # Count by rarity
             self.cursor.execute("""
-                SELECT r.name_jp, COUNT(*) as count 
-                FROM cards c 
-                LEFT JOIN rarities r ON c.rarity_id = r.id 
-                GROUP BY c.rarity_id, r.name_jp 
+                SELECT r.name_jp, COUNT(*) as count
+                FROM cards c
+                LEFT JOIN rarities r ON c.rarity_id = r.id
+                GROUP BY c.rarity_id, r.name_jp
                 ORDER BY count DESC
             """)
             rarity_counts = self.cursor.fetchall()
-            
+
             # Count by type
             self.cursor.execute("""
-                SELECT ct.name_jp, COUNT(*) as count 
-                FROM cards c 
-                LEFT JOIN card_types ct ON c.type_id = ct.id 
-                GROUP BY c.type_id, ct.name_jp 
+                SELECT ct.name_jp, COUNT(*) as count
+                FROM cards c
+                LEFT JOIN card_types ct ON c.type_id = ct.id
+                GROUP BY c.type_id, ct.name_jp
                 ORDER BY count DESC
             """)
             type_counts = self.cursor.fetchall()
-            
+
             print(f"\n=== Import Verification ===")
             print(f"Total cards imported: {total_cards}")
-            
+
             print(f"\nCards by Rarity:")
             for rarity, count in rarity_counts:
                 print(f"  {rarity or 'Unknown'}: {count}")
-            
+
             print(f"\nCards by Type:")
             for card_type, count in type_counts:
                 print(f"  {card_type or 'Unknown'}: {count}")
-                
+
         except Error as e:
             print(f"Error verifying import: {e}")
 
+def parse_chunk(lookups: Dict[str, Dict[str, int]], header: List[str], rows: List[List[str]]):
+    """Worker step of the parallel pipeline: parsed cards (or exceptions) of
+    ``rows``, and the lookup codes that were not found"""
+    importer = ZXCardImporter()
+    importer.lookups = lookups
+    parsed = []
+    for values in rows:
+        if not values:
+            continue  # blank line, skipped like csv.DictReader does
+        try:
+            parsed.append(importer.parse_card_data(dict(zip(header, values))))
+        except Exception as e:
+            parsed.append(e)
+    return parsed, importer.unresolved
+
 def main():
     """Main function"""
-    importer = ZXCardImporter()
-    
+    parser = argparse.ArgumentParser()
+    parser.add_argument('csv_file', nargs='?', default='zx_cards.csv')
+    parser.add_argument('--batch', type=int, default=1000, help='cards per INSERT transaction')
+    parser.add_argument('--dry-run', action='store_true', help='parse and validate without writing')
+    parser.add_argument('--workers', type=int, default=min(4, os.cpu_count() or 1), help='processes parsing the CSV')
+    args = parser.parse_args()
+
+    importer = ZXCardImporter(args.batch, args.dry_run, args.workers)
+
     try:
         # Connect to database
         if not importer.connect():
-            return
-        
+            if not args.dry_run:
+                return
+            print("Dry run without database: lookups and existing card_ids not checked")
+        else:
+            importer.load_lookups()
+
         # Import cards from CSV
-        importer.import_cards_from_csv('zx_cards.csv')
-        
+        importer.import_cards_from_csv(args.csv_file)
+        if args.dry_run:
+            return
+
         # Create additional indexes
         print("\nCreating additional indexes...")
         importer.create_indexes()
-        
+
         # Verify import
         importer.verify_import()
-        
+
     except Exception as e:
         print(f"Unexpected error: {e}")
+        sys.exit(1)
     finally:
         importer.disconnect()
 
@@ -113,6 +113,7 @@ MYSQL_DB=$mysql_db
 USE_SQLITE=false
 MEILI_DISABLED=true
 REDIS_DISABLED=true
+CURSOR_SECRET=$(openssl rand -hex 32)
 EOF
     
     # 构建并启动
@@ -191,6 +192,7 @@ MYSQL_DB=$mysql_db
 USE_SQLITE=false
 MEILI_DISABLED=true
 REDIS_DISABLED=true
+CURSOR_SECRET=$(openssl rand -hex 32)
 EOF
     
     # 创建 systemd 服务
@@ -0,0 +1,80 @@
+import csv
+import random
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from api import dataset
+from api.config import settings
+from api.db import Base
+from api.importer import import_csv
+
+HEADER = ["color", "card_number", "series", "rarity", "type", "jp_name", "cn_name", "cost", "power",
+          "race", "note", "text_full", "image_url", "detail_url"]
+
+SERIES = ["B01", "B02", "E53", "SD07", "MB01"]  # MB01 ends in B01: "B01-001" also matches it
+COLORS = ["红", "蓝", "白", "黑", "绿", "无"]
+RARITIES = ["C", "UC", "R", "SR", "PR"]
+TYPES = ["Z/X", "Z/X EX", "事件", "玩家"]
+COSTS = ["1", "2", "3", "5", "-"]
+POWERS = ["2500", "3000", "4500", "7500", "-"]
+NAMES = [("命运的猎犬", "運命の猟犬"), ("刀职人", "刀職人"), ("黄金雄孔雀", "ゴールドピーコク"),
+         ("狩猎的女神", "狩猟の女神"), ("煤炭犰狳", "コールアルマジロ")]
+
+
+def card_rows(n, seed=0):
+    """``n`` CSV rows of made-up cards, five series with the same numbers."""
+    rng = random.Random(seed)
+    rows = []
+    for i in range(n):
+        number = f"{SERIES[i % len(SERIES)]}-{i // len(SERIES) + 1:03d}"
+        cn, jp = rng.choice(NAMES)
+        rows.append({
+            "color": rng.choice(COLORS), "card_number": number, "series": "",
+            "rarity": rng.choice(RARITIES), "type": rng.choice(TYPES),
+            "jp_name": f"{jp}{i}", "cn_name": f"{cn} {i}",
+            "cost": rng.choice(COSTS), "power": rng.choice(POWERS),
+            "race": "", "note": "", "text_full": f"【自】 效果{i}",
+            "image_url": f"https://img/{number}.png", "detail_url": f"https://x/Cards/{number}",
+        })
+    return rows
+
+
+def write_csv(path, rows):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, HEADER)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """Session on a fresh SQLite database holding ``card_rows(120)``, with the
+    dataset snapshots built from it and the response caches off."""
+    monkeypatch.setattr(settings, "sqlite_path", str(tmp_path / "cards.db"))
+    monkeypatch.setattr(settings, "similar_index_enabled", False)
+    monkeypatch.setattr(settings, "search_cache_enabled", False)
+    monkeypatch.setattr(settings, "card_cache_enabled", False)
+    monkeypatch.setattr(settings, "index_refresh_interval", 0.0)
+    engine = create_engine(f"sqlite:///{settings.sqlite_path}")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine, autoflush=False)()
+    write_csv(tmp_path / "cards.csv", card_rows(120))
+    import_csv(str(tmp_path / "cards.csv"), session)
+    dataset.rebuild(session)
+    yield session
+    session.close()
+    engine.dispose()
+
+
+@pytest.fixture
+def client(db):
+    from fastapi.testclient import TestClient
+
+    from api.db import get_db
+    from api.main import app
+
+    app.dependency_overrides[get_db] = lambda: db
+    yield TestClient(app)
+    app.dependency_overrides.clear()
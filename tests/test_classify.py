@@ -0,0 +1,68 @@
+import pytest
+from sqlalchemy import or_
+
+from api.classify import CARD_NUMBER, CARD_PREFIX, NAME_PREFIX, SUBSTRING, classify, key_ranges, sql_clause
+from api.models import Card
+from api.ngram import keyword_fields
+from api.routers import _parse_sort, _search_memory, _search_sql
+from api.schemas import SearchBody
+
+
+def _like(db, keyword):
+    clause = or_(*(getattr(Card, f).like(f"%{keyword}%") for f in keyword_fields()))
+    return sorted(i for i, in db.query(Card.id).filter(clause))
+
+
+def _ranges(db, kw):
+    numbers = db.query(Card.id, Card.card_number)
+    return sorted(i for i, number in numbers if any(lo <= number < hi for lo, hi in key_ranges(kw)))
+
+
+def _search(search, db, keyword):
+    items = search(SearchBody(keyword=keyword), db, *_parse_sort("id")[1:], None, 1000)
+    return None if items is None else [c.id for c in items]
+
+
+@pytest.mark.parametrize("keyword, kind", [
+    ("B01-001", CARD_NUMBER),  # also MB01-001
+    ("b01-001", CARD_NUMBER),
+    ("SD07-010", CARD_NUMBER),
+    ("B01", CARD_PREFIX),  # also MB01-...
+    ("e53-", CARD_PREFIX),
+    ("SD07-00", CARD_PREFIX),
+])
+def test_card_number_classes_match_like(db, keyword, kind):
+    kw = classify(keyword)
+    assert kw.kind == kind
+    expected = _like(db, keyword)
+    assert expected
+    assert _ranges(db, kw) == expected
+    assert sorted(i for i, in db.query(Card.id).filter(sql_clause(kw))) == expected
+    assert _search(_search_sql, db, keyword) == expected
+    assert _search(_search_memory, db, keyword) == expected
+
+
+def test_card_number_keyword_keeps_suffix_matches(db):
+    numbers = {n for n, in db.query(Card.card_number).filter(Card.id.in_(_like(db, "B01-001")))}
+    assert numbers == {"B01-001", "MB01-001"}
+
+
+def test_name_prefix_matches_like_prefix(db):
+    kw = classify("命运*")
+    assert (kw.kind, kw.value) == (NAME_PREFIX, "命运")
+    expected = sorted(i for i, in db.query(Card.id).filter(
+        or_(Card.cn_name.like("命运%"), Card.jp_name.like("命运%"))))
+    assert expected
+    assert sorted(i for i, in db.query(Card.id).filter(sql_clause(kw))) == expected
+    assert _search(_search_sql, db, "命运*") == expected
+
+
+@pytest.mark.parametrize("keyword", ["  B01  ", " B01-001", "B01-001 ", "命运* ", "B0_-001", "B01%"])
+def test_other_keywords_are_substring_searches(db, keyword):
+    assert classify(keyword).kind == SUBSTRING
+    assert _search(_search_sql, db, keyword) == _like(db, keyword)
+
+
+def test_padded_keyword_is_not_stripped(db):
+    assert _like(db, "  B01  ") == []
+    assert _search(_search_sql, db, "  B01  ") == []
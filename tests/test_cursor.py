@@ -0,0 +1,114 @@
+import pytest
+
+from api import dataset
+from api.config import settings
+from api.cursor import CursorError, check_secret, decode_cursor, encode_cursor, query_fingerprint
+from api.models import Card
+from api.schemas import SearchBody
+
+SORTS = ["id", "-id", "card_number", "-card_number", "rarity", "-rarity", "relevance"]
+
+
+def test_cursor_round_trip():
+    body = SearchBody(colors=["红"], sort="card_number")
+    cursor = encode_cursor(body, "card_number", "B01-003", 12)
+    data = decode_cursor(body, "card_number", cursor)
+    assert (data["k"], data["i"]) == ("B01-003", 12)
+    # page size and the cursor itself are not part of the query
+    assert decode_cursor(SearchBody(colors=["红"], sort="card_number", page_size=5, cursor=cursor),
+                         "card_number", cursor) == data
+    assert query_fingerprint(SearchBody(colors=["红", "蓝"])) == query_fingerprint(SearchBody(colors=["蓝", "红"]))
+
+
+@pytest.mark.parametrize("other, sort", [
+    (SearchBody(colors=["蓝"], sort="card_number"), "card_number"),
+    (SearchBody(colors=["红"], keyword="B01", sort="card_number"), "card_number"),
+    (SearchBody(colors=["红"], sort="-card_number"), "-card_number"),
+])
+def test_cursor_rejected_for_another_query(other, sort):
+    cursor = encode_cursor(SearchBody(colors=["红"], sort="card_number"), "card_number", "B01-003", 12)
+    with pytest.raises(CursorError):
+        decode_cursor(other, sort, cursor)
+
+
+def test_tampered_cursor_rejected():
+    body = SearchBody(sort="id")
+    cursor = encode_cursor(body, "id", 12, 12)
+    payload, sig = cursor.split(".")
+    forged = encode_cursor(body, "id", 99, 99).split(".")[0]
+    for bad in (f"{forged}.{sig}", f"{payload}.{sig[:-1]}A" if sig[-1] != "A" else f"{payload}.{sig[:-1]}B",
+                payload, "x.y"):
+        with pytest.raises(CursorError):
+            decode_cursor(body, "id", bad)
+
+
+def test_api_rejects_foreign_cursor(client):
+    first = client.post("/api/cards/search", json={"colors": ["红"], "page_size": 2}).json()
+    resp = client.post("/api/cards/search", json={"colors": ["蓝"], "page_size": 2, "cursor": first["next_cursor"]})
+    assert resp.status_code == 400
+
+
+def _walk(client, body, page_size=7, between=None):
+    ids, cursor, pages = [], None, 0
+    while True:
+        resp = client.post("/api/cards/search", json=dict(body, page_size=page_size, cursor=cursor))
+        assert resp.status_code == 200, resp.text
+        data = resp.json()
+        ids += [c["id"] for c in data["items"]]
+        assert len(ids) <= 1000, "pages do not advance"
+        cursor = data["next_cursor"]
+        if cursor is None:
+            return ids
+        pages += 1
+        if between is not None:
+            between(pages)
+
+
+@pytest.fixture(params=["memory", "sql"])
+def engine_client(request, client, db, monkeypatch):
+    """The API served by the bitmap engine, or by SQL alone."""
+    monkeypatch.setattr("api.config.settings.filter_index_enabled", request.param == "memory")
+    dataset.rebuild(db)
+    return client
+
+
+@pytest.mark.parametrize("sort", SORTS)
+@pytest.mark.parametrize("filters", [{}, {"colors": ["红", "蓝"]}, {"keyword": "B01"}])
+def test_keyset_pages_cover_every_row_once(engine_client, db, sort, filters):
+    body = dict(filters, sort=sort)
+    expected = _walk(engine_client, body, page_size=1000)
+    assert len(expected) == len(set(expected)) > 7
+    ids = _walk(engine_client, body)
+    assert ids == expected
+
+
+@pytest.mark.parametrize("sort", SORTS)
+def test_keyset_pages_with_inserts_between_pages(engine_client, db, sort):
+    before = {c.id for c in db.query(Card.id)}
+    added = []
+
+    def insert(page):
+        # numbers and rarities that sort before, among and after the rows served so far
+        for number, rarity in ((f"A00-{page:03d}", "A"), (f"B01-{page:03d}", "R"), (f"Z99-{page:03d}", "ZZ")):
+            card = Card(card_number=number, rarity=rarity, color="红", cn_name=f"新卡 {number}")
+            db.add(card)
+            db.commit()
+            added.append(card.id)
+
+    ids = _walk(engine_client, {"sort": sort}, between=insert)
+    assert added
+    assert len(ids) == len(set(ids))
+    assert before <= set(ids) <= before | set(added)
+
+
+def test_default_secret_refused_on_mysql(monkeypatch):
+    monkeypatch.setattr(settings, "use_sqlite", False)
+    for secret in ("change-me", ""):
+        monkeypatch.setattr(settings, "cursor_secret", secret)
+        with pytest.raises(RuntimeError):
+            check_secret()
+    monkeypatch.setattr(settings, "cursor_secret", "0f3a9c")
+    check_secret()
+    monkeypatch.setattr(settings, "use_sqlite", True)
+    monkeypatch.setattr(settings, "cursor_secret", "change-me")
+    check_secret()
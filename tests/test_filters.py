@@ -0,0 +1,65 @@
+import pytest
+
+from api import filters
+from api.models import Card
+from api.routers import _facets_memory, _facets_sql, _parse_sort, _search_memory, _search_sql
+from api.schemas import SearchBody
+
+BODIES = [
+    {},
+    {"colors": ["红"]},
+    {"colors": ["蓝", "白"], "types": ["Z/X", "事件"]},
+    {"rarities": ["R", "SR"], "cost": {"min": 2, "max": 3}},
+    {"power": {"min": 3000}},
+    {"cost": {"max": 2}, "power": {"min": 2500, "max": 4500}, "colors": ["黑", "绿", "无"]},
+    {"types": ["玩家"], "rarities": ["PR"], "series": ["B01", "MB01"]},
+    {"colors": ["不存在"]},
+    {"keyword": "B01-00"},
+]
+SORTS = ["id", "-id", "card_number", "-card_number", "rarity", "-rarity"]
+
+
+def _pages(search, body, db, sort, size):
+    """Every id of ``body`` in ``sort`` order, fetched ``size`` at a time."""
+    _, col, desc = _parse_sort(sort)
+    ids, position = [], None
+    while True:
+        items = search(body, db, col, desc, position, size)
+        ids += [c.id for c in items]
+        assert len(ids) <= 1000, "pages do not advance"
+        if len(items) < size:
+            return ids
+        position = {"k": getattr(items[-1], col.key), "i": items[-1].id}
+
+
+@pytest.fixture(params=["sparse", "walk"])
+def strategy(request, monkeypatch):
+    # sorts other than id sort small results directly and walk the sort order otherwise
+    if request.param == "walk":
+        monkeypatch.setattr(filters, "_SPARSE", 0)
+    return request.param
+
+
+@pytest.mark.parametrize("sort", SORTS)
+@pytest.mark.parametrize("fields", BODIES)
+def test_memory_pages_match_sql(db, strategy, fields, sort):
+    body = SearchBody(**fields)
+    expected = _pages(_search_sql, body, db, sort, 1000)
+    assert expected == [c.id for c in _search_sql(body, db, *_parse_sort(sort)[1:], None, 1000)]
+    for size in (1, 7, 1000):
+        assert _pages(_search_memory, body, db, sort, size) == expected
+
+
+def test_memory_matches_sql_on_null_numbers(db):
+    # "-" cost/power is NULL and falls outside every range
+    assert db.query(Card).filter(Card.cost_num.is_(None)).count()
+    body = SearchBody(cost={"min": 0})
+    assert _pages(_search_memory, body, db, "id", 10) == _pages(_search_sql, body, db, "id", 10)
+
+
+@pytest.mark.parametrize("fields", BODIES)
+def test_memory_facets_match_sql(db, fields):
+    body = SearchBody(**fields)
+    memory = _facets_memory(body)
+    assert memory is not None
+    assert memory == _facets_sql(body, db)
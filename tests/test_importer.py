@@ -0,0 +1,23 @@
+import csv
+
+from api.importer import read_chunks
+
+HEADER = ["color", "card_number", "series", "rarity", "type", "jp_name", "cn_name", "cost", "power",
+          "race", "note", "text_full", "image_url", "detail_url"]
+
+
+def test_blank_lines_are_skipped(tmp_path):
+    path = tmp_path / "cards.csv"
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write(",".join(HEADER) + "\r\n")
+        for i in range(4):
+            csv.writer(f).writerow(["红", f"B01-00{i}", "", "R", "Z/X", "", f"卡{i}", "2", "3000",
+                                    "", "", "", "", f"https://x/{i}"])
+            if i % 2:
+                f.write("\r\n" if i == 1 else ",,,,,,,,,,,,,\r\n")
+    with open(path, encoding="utf-8", newline="") as f:
+        expected = [r["card_number"] for r in csv.DictReader(f) if any(r.values())]
+
+    for workers in (1, 2):
+        rows = [row for chunk in read_chunks(str(path), 3, workers) for row in chunk]
+        assert [row[1] for row in rows] == expected == ["B01-000", "B01-001", "B01-002", "B01-003"]
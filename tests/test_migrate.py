@@ -0,0 +1,16 @@
+from sqlalchemy import update
+
+from api.migrate import backfill_numeric
+from api.models import Card
+
+
+def test_backfill_counts_only_rows_given_a_number(db):
+    db.execute(update(Card).values(cost_num=None, power_num=None))
+    # non-numeric strings that stay NULL ("-" is stored as "")
+    db.execute(update(Card).where(Card.id % 4 == 0).values(cost="∞", power="-"))
+    db.commit()
+    numeric = db.query(Card).filter(Card.cost.op("GLOB")("[0-9]*") | Card.power.op("GLOB")("[0-9]*")).count()
+
+    assert backfill_numeric(db, batch=7) == numeric
+    assert backfill_numeric(db, batch=7) == 0
+    assert db.query(Card).filter(Card.cost == "3", Card.cost_num != 3).count() == 0
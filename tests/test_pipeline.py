@@ -0,0 +1,46 @@
+import csv
+import functools
+
+import pytest
+
+from api import importer, pipeline
+
+HEADER = ["color", "card_number", "cn_name", "text_full", "detail_url"]
+
+
+def _write(path):
+    """Rows whose quoted fields hold newlines, commas and escaped quotes."""
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        for i in range(40):
+            text = f"【自】 效果{i}" if i % 3 else f'【自】 第一行,\n"引用{i}"，第二行\r\n,,第三行\n'
+            writer.writerow(["红", f"B01-{i:03d}", f"名,字 {i}" if i % 2 else f"名字{i}", text, f"https://x/{i}"])
+    with open(path, encoding="utf-8", newline="") as f:
+        return list(csv.DictReader(f))
+
+
+def test_split_cuts_only_between_rows(tmp_path):
+    path = tmp_path / "cards.csv"
+    expected = [list(r.values()) for r in _write(path)]
+    size = path.stat().st_size
+    for chunk_bytes in (1, 7, 50, 99, 200, size):
+        header, ranges = pipeline.split(str(path), chunk_bytes)
+        assert header == HEADER
+        # contiguous, and every range parses to whole rows
+        assert all(a[1] == b[0] for a, b in zip(ranges, ranges[1:]))
+        assert ranges[-1][1] == size
+        rows = [row for start, end in ranges for row in pipeline.read_range(str(path), start, end)]
+        assert rows == expected
+
+
+@pytest.mark.parametrize("workers", [1, 2, 4])
+def test_read_chunks_matches_dictreader(tmp_path, monkeypatch, workers):
+    path = tmp_path / "cards.csv"
+    expected = _write(path)
+    # byte ranges far smaller than a row, so cuts fall inside quoted fields
+    monkeypatch.setattr(importer, "parallel_chunks", functools.partial(pipeline.parallel_chunks, chunk_bytes=64))
+    rows = [row for chunk in importer.read_chunks(str(path), 3, workers) for row in chunk]
+    cols = importer.COLUMNS
+    assert [(r[cols.index("card_number")], r[cols.index("cn_name")], r[cols.index("text_full")]) for r in rows] == \
+        [(r["card_number"], r["cn_name"], r["text_full"]) for r in expected]
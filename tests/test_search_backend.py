@@ -0,0 +1,61 @@
+import pytest
+
+from api import search
+from api.models import Card
+
+
+class FakeBackend:
+    """Substring hits in id order, with ids of cards deleted after indexing mixed in."""
+
+    def __init__(self, docs, deleted):
+        self.docs = docs
+        self.deleted = deleted
+        self.keywords = []
+
+    def page(self, body, sort, desc, offset, limit, fields):
+        self.keywords.append(body.keyword)
+        hits = []
+        for card_id, text in self.docs:
+            if body.keyword in text:
+                hits.append(card_id)
+                if card_id in self.deleted:
+                    hits.extend(self.deleted[card_id])
+        return hits[offset:offset + limit]
+
+
+@pytest.fixture
+def backend(db, monkeypatch):
+    docs = [(i, f"{n} {cn}") for i, n, cn in db.query(Card.id, Card.card_number, Card.cn_name).order_by(Card.id)]
+    hits = [i for i, text in docs if "猎犬" in text]
+    # a gap of deleted hits long enough to empty whole pages
+    fake = FakeBackend(docs, {hits[2]: [9001], hits[10]: [9002, 9003, 9004, 9005, 9006, 9007]})
+    monkeypatch.setattr(search, "backend", lambda: fake)
+    return fake
+
+
+def _walk(client, body):
+    ids, cursor = [], None
+    while True:
+        data = client.post("/api/cards/search", json=dict(body, cursor=cursor)).json()
+        ids += [c["id"] for c in data["items"]]
+        assert len(ids) <= 1000, "pages do not advance"
+        cursor = data["next_cursor"]
+        if cursor is None:
+            return ids
+
+
+@pytest.mark.parametrize("page_size", [1, 3, 5, 50])
+def test_pages_continue_past_deleted_hits(client, db, backend, page_size):
+    expected = [i for i, text in backend.docs if "猎犬" in text]
+    assert _walk(client, {"keyword": "猎犬", "page_size": page_size}) == expected
+    assert set(backend.keywords) == {"猎犬"}
+
+
+@pytest.mark.parametrize("keyword", ["猎%", "B0_-001"])
+def test_wildcard_keywords_stay_local(client, db, backend, keyword):
+    data = client.post("/api/cards/search", json={"keyword": keyword, "page_size": 200}).json()
+    like = db.query(Card.id).filter(Card.cn_name.like(f"%{keyword}%") | Card.card_number.like(f"%{keyword}%")
+                                    | Card.jp_name.like(f"%{keyword}%"))
+    assert [c["id"] for c in data["items"]] == sorted(i for i, in like)
+    assert data["items"]
+    assert backend.keywords == []
@@ -0,0 +1,17 @@
+from api.models import Card
+from api.similar import SimilarIndex
+
+
+def test_csv_rows_get_the_api_signatures(db):
+    idx = SimilarIndex()
+    idx.update(db)
+    cards = db.query(Card.id, Card.text_full).order_by(Card.id).all()
+    texts = [text for _, text in cards] + ["【自】 效果7", "一张还没有导入的卡的效果文本"]
+
+    lsh = idx.sign_texts(texts)
+    for n, (card_id, _) in enumerate(cards):
+        assert lsh.sigs[n] == idx.sigs[card_id]
+    # an imported text is signed the same way by a fresh index with no cards
+    fresh = SimilarIndex().sign_texts(texts)
+    assert all(fresh.sigs[n] == sig for n, sig in lsh.sigs.items())
+    assert (7, len(cards), 1.0) in set(lsh.pairs(0.9))
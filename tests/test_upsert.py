@@ -0,0 +1,59 @@
+import json
+import sys
+
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+
+from api import cli, constants, dataset
+from api.importer import COLUMNS, content_hash, upsert_csv
+from api.models import Card
+
+from conftest import card_rows, write_csv
+
+
+def _cards(db):
+    return {c.detail_url: c for c in db.query(Card)}
+
+
+def test_upsert_updates_in_place_and_bumps_version_once(db, tmp_path, monkeypatch):
+    before = {url: (c.id, c.cn_name, c.content_hash) for url, c in _cards(db).items()}
+    db.execute(text("CREATE TABLE written (card_id INTEGER)"))
+    db.execute(text("CREATE TRIGGER log_update AFTER UPDATE ON cards BEGIN INSERT INTO written VALUES (new.id); END"))
+    db.commit()
+
+    rows = card_rows(120)
+    rows[5]["cn_name"] += " 改"
+    rows[6]["power"] = "9999"
+    rows.append(dict(rows[0], card_number="E99-001", detail_url="https://x/Cards/E99-001", series=""))
+    path = tmp_path / "changed.csv"
+    write_csv(path, rows)
+    version = dataset.read_version(db)
+    monkeypatch.setattr(cli, "SessionLocal", sessionmaker(bind=db.get_bind()))
+    monkeypatch.setattr(sys, "argv", ["cli", "import", "--csv", str(path), "--upsert", "--workers", "1"])
+    cli.main()
+
+    db.expire_all()
+    after = _cards(db)
+    assert dataset.read_version(db) == version + 1
+    changed = {rows[5]["detail_url"], rows[6]["detail_url"]}
+    for url, (card_id, _, old_hash) in before.items():
+        card = after[url]
+        assert card.id == card_id
+        if url not in changed:
+            assert card.content_hash == old_hash
+    assert after[rows[5]["detail_url"]].cn_name == rows[5]["cn_name"]
+    assert after[rows[6]["detail_url"]].power_num == 9999
+    # only the changed rows were written
+    written = {i for i, in db.execute(text("SELECT card_id FROM written"))}
+    assert written == {before[url][0] for url in changed}
+    new = after["https://x/Cards/E99-001"]
+    assert new.id > max(card_id for card_id, _, _ in before.values())
+    assert new.series == "E99"
+    assert new.content_hash == content_hash(getattr(new, c) for c in COLUMNS[:-1])
+    series = json.loads(constants.update(db).payload)["series"]
+    assert series["E99"] == {"first": "E99-001", "last": "E99-001", "count": 1}
+
+    # the same CSV again changes nothing and keeps the version
+    cli.main()
+    assert dataset.read_version(db) == version + 1
+    assert upsert_csv(str(path), db)["unchanged"] == len(rows)
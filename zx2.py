@@ -654,6 +654,31 @@ def dedupe_csv_file(in_path: str, out_path: str, strategy: str = "auto") -> Tupl
     return kept, total
 
 
+def flag_near_duplicates(in_path: str, report_path: str, threshold: float = 0.9) -> int:
+    """Write row pairs whose effect text looks near-identical (MinHash/LSH).
+
+    Same signatures as /api/cards/{id}/similar: the API's ``similar_*``
+    settings, and its persisted ``<db>.minhash`` for texts already imported.
+    """
+    from api.similar import SimilarIndex, index_path
+
+    with open(in_path, "r", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    idx = SimilarIndex.load(index_path()) or SimilarIndex()
+    lsh = idx.sign_texts(row.get("text_full", "") or "" for row in rows)
+    flagged = 0
+    with open(report_path, "w", encoding="utf-8", newline="") as f_out:
+        writer = csv.writer(f_out)
+        writer.writerow(["row", "card_number", "cn_name", "dup_row", "dup_card_number", "dup_cn_name", "similarity"])
+        for a, b, sim in sorted(lsh.pairs(threshold)):
+            ra, rb = rows[a], rows[b]
+            # rows are numbered as in the CSV, header = line 1
+            writer.writerow([a + 2, ra.get("card_number", ""), ra.get("cn_name", ""),
+                             b + 2, rb.get("card_number", ""), rb.get("cn_name", ""), f"{sim:.2f}"])
+            flagged += 1
+    return flagged
+
+
 def build_detail_queue_from_list(max_pages: Optional[int] = None) -> List[Dict[str, str]]:
     files = sorted(glob.glob(os.path.join(DEBUG_DIR, "yimieji_page_*.html")), key=lambda p: int(re.search(r"(\d+)", p).group(1)))
     if max_pages:
@@ -1220,6 +1245,7 @@ def main():
     parser.add_argument("--in", dest="in_path", help="input CSV for dedupe, default to zx2_cards_full.csv")
     parser.add_argument("--out", dest="out_path", help="output CSV for dedupe, default to zx2_cards_full_deduped.csv")
     parser.add_argument("--key", dest="dedupe_key", choices=["auto", "detail_url", "image_url", "card"], default="auto", help="dedupe key strategy")
+    parser.add_argument("--near-dup", dest="near_dup", type=float, help="also report row pairs at or above this MinHash similarity (e.g. 0.9)")
     args = parser.parse_args()
 
     if args.mode == "package":
@@ -1264,6 +1290,10 @@ def main():
         key_strategy = args.dedupe_key
         deduped, total = dedupe_csv_file(in_path, out_path, key_strategy)
         print(f"Dedupe done: kept {deduped}/{total} → {out_path}")
+        if args.near_dup is not None and deduped:
+            report_path = os.path.splitext(out_path)[0] + "_near_dups.csv"
+            flagged = flag_near_duplicates(out_path, report_path, args.near_dup)
+            print(f"Near-duplicate pairs (>= {args.near_dup}): {flagged} → {report_path}")
         return
 
 